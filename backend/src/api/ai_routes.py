@@ -1,8 +1,22 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+from contextlib import aclosing
 
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from research_stocks.analysis import stream_analysis
+from research_stocks.market_calendar import SUPPORTED_EXCHANGES, market_session
 from research_stocks.news import get_complete_news, get_multi_source_news
-from research_stocks.schemas import AnalysisRequest, AnalysisResponse
-from services.stock_manager import stock_manager
+from research_stocks.schemas import AnalysisJobResponse, AnalysisRequest, AnalysisResponse
+from services.analysis_jobs import AnalysisJob, JobGoneError, JobStatus, QueueFullError, analysis_jobs
+from services.popularity import popularity
+from services.prewarm import prewarmer
+from services.stock_manager import AnalysisUnavailable, stock_manager
+from utils.cancellation import ClientDisconnected, cancel_on_disconnect, shared_streams, shared_work
+from utils.hedging import hedger
+from utils.llm_dispatcher import LLMDeadlineExceeded, llm_dispatcher
+from utils.llm_usage import llm_usage
 
 router = APIRouter(tags=["ai"])
 
@@ -12,33 +26,117 @@ async def root():
         "message": "Stock & ETF Analysis API",
         "endpoints": {
             "analyze": "/analyze",
-            "health": "/health"
+            "analyze_stream": "/analyze/stream",
+            "analyze_jobs": "/analyze/jobs",
+            "health": "/health",
+            "ready": "/ready",
+            "llm_metrics": "/metrics/llm",
+            "llm_usage": "/metrics/llm/usage",
+            "job_metrics": "/metrics/jobs",
+            "hedging_metrics": "/metrics/hedging",
+            "cancellation_metrics": "/metrics/cancellation",
+            "leader": "/metrics/leader",
+            "refresh_metrics": "/metrics/refresh",
+            "market_session": "/market/session"
         }
     }
 
 @router.get("/health")
 async def health_check():
-    return {"status": "healthy", "model": "gemini-2.0-flash"}
+    return {
+        "status": "healthy",
+        "model": "gemini-2.0-flash",
+        "ready": prewarmer.ready,
+        "warmup": prewarmer.progress()
+    }
+
+@router.get("/ready")
+async def readiness_check():
+    """
+    200 solo cuando la watchlist quedó precalentada (ver prewarm_ready_fraction);
+    503 mientras tanto o si fallaron demasiados tickers.
+    """
+    progress = prewarmer.progress()
+    content = {
+        key: progress[key]
+        for key in ("ready", "finished", "warmed", "required", "total", "failed", "in_progress")
+    }
+    if not prewarmer.ready:
+        return JSONResponse(status_code=503, content=content)
+    return content
+
+@router.get("/metrics/llm")
+async def llm_metrics():
+    """Estado del dispatcher LLM: colas, slots activos y tiempos de espera por prioridad."""
+    return llm_dispatcher.metrics()
+
+@router.get("/metrics/llm/usage")
+async def llm_usage_metrics():
+    """
+    Tokens (prompt/completion) y latencia del LLM en ventanas de 5m, 1h y 24h,
+    desglosados por ticker, tipo de llamada y origen (user / scheduler).
+    """
+    return llm_usage.snapshot()
+
+@router.get("/metrics/jobs")
+async def job_metrics():
+    """Estado de la cola de jobs de análisis."""
+    return analysis_jobs.metrics()
+
+@router.get("/metrics/hedging")
+async def hedging_metrics():
+    """Hedged requests por fuente: llamadas, duplicados, victorias del duplicado, p50/p90 y presupuesto."""
+    return hedger.metrics()
+
+@router.get("/metrics/cancellation")
+async def cancellation_metrics():
+    """Trabajo compartido entre requests: completado, cancelado por desconexión y tiempo desperdiciado."""
+    return {**shared_work.metrics(), "streams": shared_streams.metrics()}
+
+def _client_gone(ticker: str) -> HTTPException:
+    """499 (client closed request): nadie la va a leer, pero cierra el handler limpio."""
+    return HTTPException(status_code=499, detail=f"Cliente desconectado ({ticker})")
+
+@router.get("/metrics/leader")
+async def leader_status():
+    """Qué worker tiene el lease del scheduler y si es este proceso."""
+    return await asyncio.to_thread(stock_manager.leadership)
+
+@router.get("/metrics/refresh")
+async def refresh_metrics():
+    """Reparto del presupuesto de refresh por popularidad (solo tiene datos en el worker líder)."""
+    return {**stock_manager.refresh_metrics(), "is_leader": stock_manager.is_leader}
+
+@router.get("/market/session")
+async def get_market_session(exchange: str = "NASDAQ"):
+    """Fase actual de la sesión (pre / regular / post / closed) que usa la cadencia de refresh."""
+    if exchange.upper() not in SUPPORTED_EXCHANGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Exchange {exchange} no soportado (usar {', '.join(SUPPORTED_EXCHANGES)})"
+        )
+    return market_session(exchange)
 
 @router.get("/data/{ticker}")
-async def get_instrument_data(ticker: str):
+async def get_instrument_data(ticker: str, request: Request):
     """
     Retorna todos los datos de un instrumento (Stock o ETF).
     Usa el cache si existe, si no genera los datos nuevos.
+    
+    Cada fetcher tiene un deadline: si alguno no llega a tiempo la respuesta sale
+    con lo que haya y esas secciones aparecen en `pending`; se completan en el
+    cache y una nueva request las recoge.
     """
     try:
         ticker = ticker.upper()
         
+        popularity.record(ticker)
+        
         # Verificar si está en cache
-        if ticker in stock_manager.instruments:
-            entry = stock_manager.instruments[ticker]
-            instrument_data = entry["data"]
-            instrument_type = entry["type"]
-            cached = True
-        else:
-            # No está en cache, crear nuevo
-            instrument_data, _, instrument_type = await stock_manager.get_or_create_instrument(ticker)
-            cached = False
+        cached = stock_manager.is_cached(ticker)
+        instrument_data, instrument_type = await cancel_on_disconnect(
+            request, stock_manager.fetch_instrument_data(ticker, partial=True)
+        )
         
         # Convertir a schema
         instrument_schema = instrument_data.to_schema()
@@ -47,9 +145,13 @@ async def get_instrument_data(ticker: str):
             "ticker": ticker,
             "instrument_type": instrument_type,
             "cached": cached,
+            "pending": instrument_data.pending_sections,
+            "sections": instrument_data.section_status(),
             "data": instrument_schema.model_dump()
         }
         
+    except ClientDisconnected:
+        raise _client_gone(ticker)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -92,54 +194,252 @@ async def get_instrument_news(ticker: str, include_articles: bool = True):
 
 
 @router.post("/analyze", response_model=AnalysisResponse)
-async def analyze_instrument_endpoint(request: AnalysisRequest):
+async def analyze_instrument_endpoint(request: AnalysisRequest, http_request: Request):
     """
     Analiza una acción o ETF y retorna un informe completo.
     Detecta automáticamente el tipo de instrumento.
+    Si el cliente se desconecta, se cancela el trabajo que nadie más esté esperando.
     """
     try:
         ticker = request.ticker.upper()
+        popularity.record(ticker)
         
         # Usar el manager unificado
-        instrument_data, analysis, instrument_type = await stock_manager.get_or_create_instrument(ticker)
+        instrument_data, analysis, instrument_type = await cancel_on_disconnect(
+            http_request, stock_manager.get_or_create_instrument(ticker)
+        )
         
         # Convertir a schema según tipo
         instrument_schema = instrument_data.to_schema()
         
-        # Construir raw_data según el tipo
-        if instrument_type == "ETF":
-            raw_data = {
-                "info": instrument_schema.info.model_dump(),
-                "holdings": {
-                    "top_holdings": [h.model_dump() for h in instrument_schema.holdings.holdings[:5]],
-                    "total_count": instrument_schema.holdings.total_holdings_fetched
-                },
-                "sectors": instrument_schema.sector_allocation.sectors,
-                # "sentiment": {
-                #     "bullish": instrument_schema.sentiment_analysis.distribution.bullish,
-                #     "bearish": instrument_schema.sentiment_analysis.distribution.bearish,
-                #     "neutral": instrument_schema.sentiment_analysis.distribution.neutral
-                # },
-                "options": instrument_schema.options_volatility.model_dump()
-            }
-        else:
-            raw_data = {
-                # "sentiment": {
-                #     "bullish": instrument_schema.sentiment_analysis.distribution.bullish,
-                #     "bearish": instrument_schema.sentiment_analysis.distribution.bearish,
-                #     "neutral": instrument_schema.sentiment_analysis.distribution.neutral
-                # },
-                "options": instrument_schema.options_volatility.model_dump()
-            }
+        raw_data = _build_raw_data(instrument_schema, instrument_type)
         
         return AnalysisResponse(
             ticker=ticker,
             instrument_type=instrument_type,
             analysis=analysis,
-            raw_data=raw_data
+            raw_data=raw_data,
+            **stock_manager.analysis_freshness(ticker)
         )
         
+    except ClientDisconnected:
+        raise _client_gone(ticker)
+    except (LLMDeadlineExceeded, AnalysisUnavailable) as e:
+        # El LLM está saturado o falló: no hay análisis vigente que devolver (ni que cachear)
+        raise HTTPException(status_code=503, detail=f"Análisis de {ticker} no disponible: {e}", headers={"Retry-After": "30"})
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error analizando {ticker}: {str(e)}")
+
+
+def _build_raw_data(instrument_schema, instrument_type: str) -> dict:
+    """Construye raw_data según el tipo de instrumento."""
+    if instrument_type == "ETF":
+        return {
+            "info": instrument_schema.info.model_dump(),
+            "holdings": {
+                "top_holdings": [h.model_dump() for h in instrument_schema.holdings.holdings[:5]],
+                "total_count": instrument_schema.holdings.total_holdings_fetched
+            },
+            "sectors": instrument_schema.sector_allocation.sectors,
+            # "sentiment": {
+            #     "bullish": instrument_schema.sentiment_analysis.distribution.bullish,
+            #     "bearish": instrument_schema.sentiment_analysis.distribution.bearish,
+            #     "neutral": instrument_schema.sentiment_analysis.distribution.neutral
+            # },
+            "options": instrument_schema.options_volatility.model_dump()
+        }
+    return {
+        # "sentiment": {
+        #     "bullish": instrument_schema.sentiment_analysis.distribution.bullish,
+        #     "bearish": instrument_schema.sentiment_analysis.distribution.bearish,
+        #     "neutral": instrument_schema.sentiment_analysis.distribution.neutral
+        # },
+        "options": instrument_schema.options_volatility.model_dump()
+    }
+
+
+def _sse(event: str, data: dict) -> str:
+    """Formatea un evento Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/analyze/stream")
+async def analyze_instrument_stream_endpoint(request: AnalysisRequest, http_request: Request):
+    """
+    Igual que /analyze pero vía Server-Sent Events.
+    
+    Con un análisis cacheado (aunque esté stale) o un /analyze en curso para el
+    ticker se usa get_or_create_instrument (stale-while-revalidate, single-flight)
+    y el análisis llega en un solo token. Si no, la generación es una sola por
+    ticker: los streams concurrentes reciben los mismos tokens.
+    
+    Eventos:
+        raw_data: datos del instrumento (se envía apenas termina la descarga)
+        token: fragmento del análisis a medida que lo genera el LLM
+        done: fin del stream ({"cached": bool})
+        error: error durante la generación
+    """
+    ticker = request.ticker.upper()
+    popularity.record(ticker)
+    
+    try:
+        instrument_data, instrument_type = await cancel_on_disconnect(
+            http_request, stock_manager.fetch_instrument_data(ticker)
+        )
+        raw_data = _build_raw_data(instrument_data.to_schema(), instrument_type)
+    except ClientDisconnected:
+        raise _client_gone(ticker)
     except Exception as e:
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error analizando {ticker}: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error analizando {ticker}: {str(e)}")
+    
+    async def generate():
+        chunks = []
+        async for delta in stream_analysis(instrument_data, instrument_type):
+            chunks.append(delta)
+            yield delta
+        # Guardar el análisis completo en el cache del StockManager
+        await stock_manager.store_instrument(ticker, instrument_data, instrument_type, "".join(chunks))
+    
+    async def event_stream():
+        yield _sse("raw_data", {"ticker": ticker, "instrument_type": instrument_type, "raw_data": raw_data})
+        
+        cached_analysis = stock_manager.get_fresh_analysis(ticker)
+        if cached_analysis is not None:
+            yield _sse("token", {"text": cached_analysis})
+            yield _sse("done", {"cached": True})
+            return
+        
+        try:
+            if await stock_manager.adopt_shared(ticker) or shared_work.in_flight(f"analyze:{ticker}"):
+                _, analysis, _ = await cancel_on_disconnect(
+                    http_request, stock_manager.get_or_create_instrument(ticker)
+                )
+                yield _sse("token", {"text": analysis})
+                yield _sse("done", {"cached": True, "stale": stock_manager.analysis_freshness(ticker)["stale"]})
+                return
+            
+            async with aclosing(shared_streams.subscribe(f"stream:{ticker}", generate)) as deltas:
+                async for delta in deltas:
+                    if await http_request.is_disconnected():
+                        # Al cerrar la suscripción se cancela la generación si nadie más la lee
+                        shared_work.record_disconnect()
+                        return
+                    yield _sse("token", {"text": delta})
+        except ClientDisconnected:
+            return
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield _sse("error", {"detail": f"Error analizando {ticker}: {str(e)}"})
+            return
+        
+        yield _sse("done", {"cached": False})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _job_response(job: AnalysisJob, deduplicated: bool = False) -> AnalysisJobResponse:
+    """Estado del job; incluye el resultado completo si ya terminó."""
+    result = None
+    # Un job de otro worker puede no tener datos si el ticker ya salió del cache
+    if job.status == JobStatus.COMPLETED and job.data is not None:
+        result = AnalysisResponse(
+            ticker=job.ticker,
+            instrument_type=job.instrument_type,
+            analysis=job.analysis,
+            raw_data=_build_raw_data(job.data.to_schema(), job.instrument_type),
+            **stock_manager.analysis_freshness(job.ticker)
+        )
+    return AnalysisJobResponse(
+        job_id=job.id,
+        ticker=job.ticker,
+        status=job.status.value,
+        deduplicated=deduplicated,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        error=job.error,
+        result=result
+    )
+
+
+async def _get_job_or_404(job_id: str) -> AnalysisJob:
+    job = await analysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} no encontrado")
+    return job
+
+
+@router.post("/analyze/jobs", response_model=AnalysisJobResponse, status_code=202)
+async def submit_analysis_job(request: AnalysisRequest):
+    """
+    Encola el análisis y retorna el job_id de inmediato.
+    Si ya hay un job en curso para el ticker, retorna ese mismo job.
+    """
+    popularity.record(request.ticker)
+    try:
+        job, deduplicated = await analysis_jobs.submit(request.ticker)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return _job_response(job, deduplicated)
+
+
+@router.get("/analyze/jobs/{job_id}", response_model=AnalysisJobResponse)
+async def get_analysis_job(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    """
+    Estado (y resultado) de un job.
+    
+    Query params:
+        wait: segundos a esperar a que el job termine antes de responder (long-polling).
+    """
+    job = await _get_job_or_404(job_id)
+    if wait:
+        try:
+            job = await analysis_jobs.wait_finished(job, timeout=wait)
+        except JobGoneError:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} no encontrado")
+    return _job_response(job)
+
+
+@router.get("/analyze/jobs/{job_id}/events")
+async def subscribe_analysis_job(job_id: str):
+    """
+    Suscripción vía Server-Sent Events a los cambios de estado de un job.
+    
+    Eventos:
+        status: estado actual ({"status": ...}); se emite en cada cambio
+        result: resultado final (mismo formato que GET /analyze/jobs/{job_id})
+        gone: el job dejó de existir en el store (fin del stream)
+    """
+    job = await _get_job_or_404(job_id)
+    
+    async def event_stream():
+        current = job
+        try:
+            while True:
+                yield _sse("status", {"job_id": current.id, "status": current.status.value})
+                if current.finished:
+                    yield _sse("result", _job_response(current).model_dump(mode="json"))
+                    return
+                # Comentario SSE como keep-alive mientras no haya cambios
+                status = current.status
+                current = await analysis_jobs.wait_for_change(current, timeout=15)
+                while current.status == status:
+                    yield ": keep-alive\n\n"
+                    current = await analysis_jobs.wait_for_change(current, timeout=15)
+        except JobGoneError as e:
+            yield _sse("gone", {"job_id": current.id, "detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
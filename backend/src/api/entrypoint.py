@@ -1,26 +1,33 @@
+import asyncio
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import mlflow
 from settings.env_config import env_settings
 from api.ai_routes import router as ai_router
 from contextlib import asynccontextmanager
 from services.stock_manager import stock_manager 
-
-app = FastAPI()
-
-mlflow.set_tracking_uri(uri=env_settings.mlflow_tracking_uri)
-mlflow.llama_index.autolog()
+from services.analysis_jobs import analysis_jobs
+from services.prewarm import prewarmer
+from utils.models import warm_up
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # --- STARTUP ---
     print("🟢 Iniciando servicios...")
-    stock_manager.start() # ✅ Aquí sí hay event loop corriendo
+    if env_settings.ingestion_mode == "embedded":
+        stock_manager.start() # ✅ Aquí sí hay event loop corriendo
+    else:
+        stock_manager.start_local_eviction()  # Sin scheduler, pero el cache local igual se desaloja
+    analysis_jobs.start()
+    prewarmer.start()  # Carga la watchlist en background; /ready responde 200 cuando termina
+    warmup = asyncio.create_task(warm_up())  # Clientes LLM en un thread: la primera request no bloquea el loop
     yield
     # --- SHUTDOWN ---
     print("🔴 Deteniendo servicios...")
-    # stock_manager.scheduler.shutdown() # Opcional
+    warmup.cancel()
+    await prewarmer.stop()
+    await analysis_jobs.stop()
+    await stock_manager.stop()  # Libera el lease del scheduler para que otro worker lo tome
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -0,0 +1,102 @@
+"""
+Benchmark de tiempo de arranque: mide cuánto tarda un proceso nuevo en
+importar el entrypoint (lo que paga cada worker de uvicorn al arrancar o
+recargar) y falla si supera el presupuesto.
+
+Uso (desde backend/src):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module ingestion.entrypoint --budget-ms 800 --runs 5
+    python -m benchmarks.import_time --top 15   # además lista los imports más lentos
+
+Sale con código 1 si la mediana supera --budget-ms (útil en CI).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULE = "api.entrypoint"
+DEFAULT_BUDGET_MS = 1500.0
+
+# Módulos que no deberían cargarse solo por importar el entrypoint
+HEAVY_MODULES = [
+    "mlflow", "llama_index.core", "llama_index.llms.google_genai",
+    "llama_index.embeddings.vertex", "google.oauth2.service_account",
+    "yfinance", "pandas", "tradingview_ta", "GoogleNews", "tiktoken",
+]
+
+_PROBE = """
+import sys, time
+started = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - started) * 1000
+loaded = [m for m in {heavy!r} if m in sys.modules and type(sys.modules[m]).__name__ != "_LazyModule"]
+print(f"{{elapsed:.1f}}")
+print(",".join(loaded))
+"""
+
+
+def _run_once(module: str) -> tuple[float, list[str]]:
+    code = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=os.getcwd(),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    elapsed, loaded = result.stdout.splitlines()[-2:]
+    return float(elapsed), [m for m in loaded.split(",") if m]
+
+
+def _slowest_imports(module: str, top: int) -> list[tuple[int, str]]:
+    """Top imports por tiempo acumulado según `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.getcwd(),
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="Módulo a importar")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Presupuesto para la mediana")
+    parser.add_argument("--runs", type=int, default=3, help="Procesos nuevos a medir")
+    parser.add_argument("--top", type=int, default=0, help="Listar los N imports más lentos")
+    args = parser.parse_args()
+
+    timings = []
+    loaded: set[str] = set()
+    for _ in range(args.runs):
+        elapsed, heavy = _run_once(args.module)
+        timings.append(elapsed)
+        loaded.update(heavy)
+
+    median = statistics.median(timings)
+    print(f"import {args.module}: median {median:.0f} ms "
+          f"(min {min(timings):.0f}, max {max(timings):.0f}, runs {args.runs}), budget {args.budget_ms:.0f} ms")
+    if loaded:
+        print(f"⚠️ Heavy modules loaded at import: {', '.join(sorted(loaded))}")
+
+    if args.top:
+        print()
+        print(f"{'cumulative_ms':>14}  module")
+        for cumulative_us, name in _slowest_imports(args.module, args.top):
+            print(f"{cumulative_us / 1000:>14.1f}  {name}")
+
+    if median > args.budget_ms:
+        print(f"❌ Startup over budget by {median - args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
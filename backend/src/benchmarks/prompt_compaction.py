@@ -0,0 +1,81 @@
+"""
+Benchmark de prompts compactos vs completos.
+
+Para cada ticker descarga los datos una vez, arma ambos prompts y reporta
+tokens (tokenizer de utils.models) y, con --generate, la latencia de generación.
+
+Uso (desde backend/src):
+    python -m benchmarks.prompt_compaction
+    python -m benchmarks.prompt_compaction --tickers AAPL SPY --generate
+"""
+
+import argparse
+import asyncio
+import time
+
+from research_stocks.analysis import build_etf_prompt, build_stock_prompt
+from services.stock_manager import stock_manager
+from utils.llm_dispatcher import llm_dispatcher
+from utils.models import tokenizer
+
+# Set fijo de tickers: acciones de distintos sectores/tamaños y ETFs
+FIXTURE_TICKERS = ["AAPL", "MSFT", "NVDA", "JPM", "KO", "SPY", "QQQ", "VNQ"]
+
+
+async def _measure(ticker: str, generate: bool) -> list[dict]:
+    data, instrument_type = await stock_manager.fetch_instrument_data(ticker)
+    build = build_etf_prompt if instrument_type == "ETF" else build_stock_prompt
+
+    rows = []
+    for mode, compact in (("full", False), ("compact", True)):
+        prompt = build(data, compact=compact)
+        row = {"ticker": ticker, "mode": mode, "chars": len(prompt), "tokens": len(tokenizer(prompt))}
+        if generate:
+            started = time.monotonic()
+            response = await llm_dispatcher.acomplete(prompt, ticker=ticker, call_type="benchmark")
+            row["latency_s"] = round(time.monotonic() - started, 2)
+            row["output_tokens"] = len(tokenizer(response.text))
+        rows.append(row)
+    return rows
+
+
+def _print_table(rows: list[dict], generate: bool):
+    header = f"{'ticker':<8}{'mode':<10}{'chars':>9}{'tokens':>9}"
+    if generate:
+        header += f"{'latency_s':>11}{'out_tok':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        line = f"{row['ticker']:<8}{row['mode']:<10}{row['chars']:>9}{row['tokens']:>9}"
+        if generate:
+            line += f"{row['latency_s']:>11}{row['output_tokens']:>9}"
+        print(line)
+
+    print()
+    for mode in ("full", "compact"):
+        subset = [r for r in rows if r["mode"] == mode]
+        if not subset:
+            continue
+        avg_tokens = sum(r["tokens"] for r in subset) / len(subset)
+        summary = f"{mode:<8} avg tokens: {avg_tokens:,.0f}"
+        if generate:
+            summary += f" | avg latency: {sum(r['latency_s'] for r in subset) / len(subset):.2f}s"
+        print(summary)
+
+
+async def main(tickers: list[str], generate: bool):
+    rows = []
+    for ticker in tickers:
+        try:
+            rows.extend(await _measure(ticker.upper(), generate))
+        except Exception as e:
+            print(f"⚠️ {ticker}: {e}")
+    _print_table(rows, generate)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara el prompt compacto con el completo")
+    parser.add_argument("--tickers", nargs="+", default=FIXTURE_TICKERS)
+    parser.add_argument("--generate", action="store_true", help="También mide la latencia de generación del LLM")
+    args = parser.parse_args()
+    asyncio.run(main(args.tickers, args.generate))
@@ -0,0 +1,42 @@
+"""
+Servicio de ingesta: corre los refresh del StockManager (datos, noticias,
+sentimiento y regeneración de análisis) en un proceso aparte de la API.
+
+Publica los resultados en el store compartido (SQLite) del que leen los
+workers de la API. Para usarlo, la API debe correr con INGESTION_MODE=external.
+Se pueden levantar varias instancias: una sola es líder y el resto queda en espera.
+"""
+
+import asyncio
+import signal
+
+from services.stock_manager import stock_manager
+from settings.env_config import env_settings
+from utils.logger import setup_logging
+
+_logger = setup_logging()
+
+
+async def run():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    _logger.info("🟢 Iniciando servicio de ingesta...")
+    stock_manager.start()
+    await stop.wait()
+
+    _logger.info("🔴 Deteniendo servicio de ingesta...")
+    await stock_manager.stop()
+
+
+def main():
+    if env_settings.ingestion_mode != "external":
+        _logger.warning("⚠️ INGESTION_MODE is not 'external': API workers will also compete for the scheduler lease")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,47 @@
-from utils.models import Settings
-from research_stocks.prompts import get_stock_analysis_prompt, get_etf_analysis_prompt
+from typing import AsyncIterator
+
+from settings.env_config import env_settings
+from utils.llm_dispatcher import llm_dispatcher
+from research_stocks.prompts import (
+    get_stock_analysis_prompt,
+    get_etf_analysis_prompt,
+    get_stock_analysis_prompt_compact,
+    get_etf_analysis_prompt_compact,
+)
 from utils.logger import setup_logging
 
 _logger = setup_logging()
 
+# Prefijo con el que se guardaban los errores como análisis (puede quedar en el store compartido)
+ANALYSIS_ERROR_PREFIX = "Error generating analysis"
+
 
-async def analyze_stock(stock_data) -> str:
-    """Genera un análisis completo de una acción usando el LLM."""
+def _format_news_delta(news_delta: dict) -> str:
+    """Bloque extra del prompt con los artículos nuevos desde el último análisis."""
+    added = (news_delta or {}).get("added", [])
+    if not added:
+        return ""
     
-    prompt = get_stock_analysis_prompt(
+    lines = [
+        "",
+        "NOTICIAS NUEVAS DESDE EL ÚLTIMO ANÁLISIS",
+        "(Presta especial atención a si cambian la recomendación anterior)",
+    ]
+    for article in added[:10]:
+        lines.append(f"• {article.get('title', '')} ({article.get('publisher', '')}, {article.get('date', '')})")
+    return "\n".join(lines) + "\n"
+
+
+def _use_compact(compact: bool = None) -> bool:
+    return env_settings.analysis_prompt_compact if compact is None else compact
+
+
+def build_stock_prompt(stock_data, news_delta: dict = None, compact: bool = None) -> str:
+    """
+    Arma el prompt de análisis de una acción.
+    `compact=None` respeta settings.analysis_prompt_compact.
+    """
+    kwargs = dict(
         ticker=stock_data.ticker,
         info=stock_data.info or {},
         technical=stock_data.technical_analysis or {},
@@ -16,19 +49,18 @@ async def analyze_stock(stock_data) -> str:
         options=stock_data.options_volatility or {},
         news=stock_data.news or "No hay noticias disponibles."
     )
-    
-    try:
-        response = await Settings.llm.acomplete(prompt)
-        return response.text
-    except Exception as e:
-        _logger.error(f"Error generating stock analysis for {stock_data.ticker}: {e}")
-        return f"Error generating analysis: {str(e)}"
+    if _use_compact(compact):
+        prompt = get_stock_analysis_prompt_compact(
+            **kwargs, token_budget=env_settings.analysis_prompt_token_budget
+        )
+    else:
+        prompt = get_stock_analysis_prompt(**kwargs)
+    return prompt + _format_news_delta(news_delta)
 
 
-async def analyze_etf(etf_data) -> str:
-    """Genera un análisis completo de un ETF usando el LLM."""
-    
-    prompt = get_etf_analysis_prompt(
+def build_etf_prompt(etf_data, news_delta: dict = None, compact: bool = None) -> str:
+    """Arma el prompt de análisis de un ETF (ver build_stock_prompt)."""
+    kwargs = dict(
         ticker=etf_data.ticker,
         info=etf_data.info or {},
         holdings=etf_data.holdings or {},
@@ -38,10 +70,62 @@ async def analyze_etf(etf_data) -> str:
         options=etf_data.options_volatility or {},
         news=etf_data.news or "No hay noticias disponibles."
     )
+    if _use_compact(compact):
+        prompt = get_etf_analysis_prompt_compact(
+            **kwargs, token_budget=env_settings.analysis_prompt_token_budget
+        )
+    else:
+        prompt = get_etf_analysis_prompt(**kwargs)
+    return prompt + _format_news_delta(news_delta)
+
+
+async def analyze_stock(stock_data, news_delta: dict = None) -> str:
+    """
+    Genera un análisis completo de una acción usando el LLM.
+    Los errores del LLM (incluido LLMDeadlineExceeded) se propagan: un error
+    no debe quedar cacheado como si fuera el análisis.
+    """
+    
+    prompt = build_stock_prompt(stock_data, news_delta)
     
     try:
-        response = await Settings.llm.acomplete(prompt)
+        response = await llm_dispatcher.acomplete(
+            prompt, ticker=stock_data.ticker, call_type="stock_analysis"
+        )
+        return response.text
+    except Exception as e:
+        _logger.error(f"Error generating stock analysis for {stock_data.ticker}: {e}")
+        raise
+
+
+async def analyze_etf(etf_data, news_delta: dict = None) -> str:
+    """Genera un análisis completo de un ETF usando el LLM (los errores se propagan)."""
+    
+    prompt = build_etf_prompt(etf_data, news_delta)
+    
+    try:
+        response = await llm_dispatcher.acomplete(
+            prompt, ticker=etf_data.ticker, call_type="etf_analysis"
+        )
         return response.text
     except Exception as e:
         _logger.error(f"Error generating ETF analysis for {etf_data.ticker}: {e}")
-        return f"Error generating analysis: {str(e)}"
\ No newline at end of file
+        raise
+
+
+async def stream_analysis(instrument_data, instrument_type: str) -> AsyncIterator[str]:
+    """
+    Genera el análisis (Stock o ETF) token a token con astream_complete.
+    Los errores se propagan: quien consume el stream decide cómo informarlos.
+    """
+    if instrument_type == "ETF":
+        prompt = build_etf_prompt(instrument_data)
+    else:
+        prompt = build_stock_prompt(instrument_data)
+    
+    call_type = "etf_analysis" if instrument_type == "ETF" else "stock_analysis"
+    async for chunk in llm_dispatcher.astream_complete(
+        prompt, ticker=instrument_data.ticker, call_type=call_type
+    ):
+        if chunk.delta:
+            yield chunk.delta
@@ -0,0 +1,66 @@
+"""
+Cadencia adaptativa de refresh: escala el TTL base de cada sección según la
+fase de la sesión del exchange y los eventos del instrumento.
+
+- Mercado cerrado (noches, fines de semana, feriados): TTLs mucho más largos.
+- Pre/post-market: intermedio (las noticias siguen al ritmo normal).
+- Cerca de earnings o con un movimiento fuerte del precio: TTLs más cortos.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from research_stocks.market_calendar import SessionPhase, session_phase
+from settings.env_config import env_settings
+
+# Multiplicador del TTL base por sección y fase (las que no figuran usan 1)
+PHASE_MULTIPLIERS: dict[str, dict[SessionPhase, float]] = {
+    "price": {SessionPhase.PRE: 5, SessionPhase.POST: 5, SessionPhase.CLOSED: 120},
+    "technical": {SessionPhase.PRE: 4, SessionPhase.POST: 4, SessionPhase.CLOSED: 32},
+    "mtf": {SessionPhase.PRE: 4, SessionPhase.POST: 4, SessionPhase.CLOSED: 24},
+    "options": {SessionPhase.PRE: 4, SessionPhase.POST: 4, SessionPhase.CLOSED: 24},
+    "news": {SessionPhase.CLOSED: 4},
+    "sentiment": {SessionPhase.PRE: 2, SessionPhase.POST: 2, SessionPhase.CLOSED: 8},
+}
+
+# Secciones que se aceleran ante eventos (earnings, movimientos fuertes)
+EVENT_SENSITIVE = ("price", "technical", "options", "news", "sentiment")
+
+
+def _earnings_soon(info: Optional[dict], now: datetime) -> bool:
+    timestamp = (info or {}).get("earnings_timestamp")
+    if not timestamp:
+        return False
+    try:
+        earnings = datetime.fromtimestamp(float(timestamp))
+    except (TypeError, ValueError, OverflowError, OSError):
+        return False
+    return abs(earnings - now) <= timedelta(hours=env_settings.cadence_earnings_window_hours)
+
+
+def _volatility_spike(info: Optional[dict]) -> bool:
+    info = info or {}
+    price, previous = info.get("price"), info.get("previous_close")
+    if not isinstance(price, (int, float)) or not isinstance(previous, (int, float)) or not previous:
+        return False
+    return abs(price / previous - 1) * 100 >= env_settings.cadence_volatility_threshold_pct
+
+
+def cadence_reasons(exchange: Optional[str], info: Optional[dict], now: Optional[datetime] = None) -> dict:
+    """Fase de la sesión y eventos activos que definen la cadencia del instrumento."""
+    now = now or datetime.now()
+    return {
+        "phase": session_phase(exchange).value,
+        "earnings_window": _earnings_soon(info, now),
+        "volatility_spike": _volatility_spike(info),
+    }
+
+
+def ttl_multiplier(section: str, reasons: dict) -> float:
+    """Factor a aplicar al TTL base de `section` según `cadence_reasons`."""
+    multiplier = PHASE_MULTIPLIERS.get(section, {}).get(SessionPhase(reasons["phase"]), 1)
+    if section in EVENT_SENSITIVE and (reasons["earnings_window"] or reasons["volatility_spike"]):
+        factor = env_settings.cadence_event_factor
+        # Con el mercado cerrado se acorta el backoff, pero sin bajar del TTL base
+        multiplier = max(1, multiplier * factor) if multiplier > 1 else multiplier * factor
+    return multiplier
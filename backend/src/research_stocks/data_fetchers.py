@@ -1,10 +1,14 @@
-import numpy as np
-import pandas as pd
-import requests
-import yfinance as yf
-from GoogleNews import GoogleNews 
-from utils.logger import setup_logging
-from tradingview_ta import TA_Handler, Interval
+from utils.hedging import hedger
+from utils.lazy_imports import lazy_import
+from utils.logger import log_fields, setup_logging
+
+# Librerías pesadas: se importan en el primer uso
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+requests = lazy_import("requests")
+yf = lazy_import("yfinance")
+google_news = lazy_import("GoogleNews")
+tradingview_ta = lazy_import("tradingview_ta")
 
 _logger = setup_logging()
 
@@ -59,7 +63,9 @@ def check_options_volatility(ticker: str) -> dict:
         atm_iv_values = []
         
         for expiry in expirations[:min(3, len(expirations))]:
-            opt_chain = stock.option_chain(expiry)
+            # Ticker nuevo por intento: el original y el duplicado corren en threads distintos
+            # y el caché interno de yf.Ticker no es thread-safe
+            opt_chain = hedger.call("yahoo_options", lambda e=expiry: yf.Ticker(ticker).option_chain(e))
             
             calls = opt_chain.calls.assign(type="CALL")
             puts = opt_chain.puts.assign(type="PUT")
@@ -155,7 +161,7 @@ def _fetch_raw_news(ticker: str, limit: int = 5) -> list[dict]:
 
     # --- 2. Google News ---
     try:
-        googlenews = GoogleNews(lang='en', period='7d')
+        googlenews = google_news.GoogleNews(lang='en', period='7d')
         googlenews.clear()
         googlenews.search(f"{ticker} stock related news")
         g_results = googlenews.result()
@@ -194,8 +200,7 @@ def get_stock_info(ticker: str) -> dict:
     Obtiene información general y métricas financieras de una acción.
     """
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = hedger.call("yahoo_info", lambda: yf.Ticker(ticker).info)
         
         return {
             "ticker": ticker,
@@ -232,6 +237,9 @@ def get_stock_info(ticker: str) -> dict:
             "market_cap": info.get('marketCap'),
             "enterprise_value": info.get('enterpriseValue'),
             
+            # Próximos eventos
+            "earnings_timestamp": info.get('earningsTimestamp', info.get('earningsTimestampStart')),
+            
             # ===== MÉTRICAS DE RENTABILIDAD =====
             # EPS (Earnings Per Share)
             "eps_trailing": info.get('trailingEps'),
@@ -322,6 +330,35 @@ def get_stock_info(ticker: str) -> dict:
         _logger.error(f"Error fetching stock info for {ticker}: {e}")
         return {"ticker": ticker, "error": str(e)}
 
+def get_quote(ticker: str) -> dict:
+    """
+    Cotización liviana (fast_info) para refrescar solo el precio sin pedir todo `info`.
+    Las claves coinciden con las de get_stock_info / get_etf_info.
+    """
+    fields = {
+        "price": "last_price",
+        "previous_close": "previous_close",
+        "open": "open",
+        "day_high": "day_high",
+        "day_low": "day_low",
+        "volume": "last_volume",
+        "market_cap": "market_cap",
+    }
+    try:
+        fast_info = yf.Ticker(ticker).fast_info
+        quote = {}
+        for key, fast_key in fields.items():
+            try:
+                quote[key] = fast_info[fast_key]
+            except Exception:
+                quote[key] = None
+        if quote["price"] is None:
+            return {"ticker": ticker, "error": "No price available."}
+        return quote
+    except Exception as e:
+        _logger.error(f"Error fetching quote for {ticker}: {e}")
+        return {"ticker": ticker, "error": str(e)}
+
 def get_tradingview_analysis(ticker: str, exchange: str = "NASDAQ") -> dict:
     """
     Obtiene análisis técnico de TradingView.
@@ -334,14 +371,14 @@ def get_tradingview_analysis(ticker: str, exchange: str = "NASDAQ") -> dict:
         dict con indicadores técnicos y recomendaciones
     """
     try:
-        handler = TA_Handler(
+        handler = tradingview_ta.TA_Handler(
             symbol=ticker.upper(),
             screener="america",
             exchange=exchange,
-            interval=Interval.INTERVAL_1_DAY
+            interval=tradingview_ta.Interval.INTERVAL_1_DAY
         )
         
-        analysis = handler.get_analysis()
+        analysis = hedger.call("tradingview", handler.get_analysis)
         
         return {
             "ticker": ticker,
@@ -444,27 +481,27 @@ def get_tradingview_multi_timeframe(ticker: str, exchange: str = "NASDAQ") -> di
     Obtiene análisis técnico en múltiples timeframes.
     """
     intervals = {
-        "1m": Interval.INTERVAL_1_MINUTE,
-        "5m": Interval.INTERVAL_5_MINUTES,
-        "15m": Interval.INTERVAL_15_MINUTES,
-        "1h": Interval.INTERVAL_1_HOUR,
-        "4h": Interval.INTERVAL_4_HOURS,
-        "1d": Interval.INTERVAL_1_DAY,
-        "1w": Interval.INTERVAL_1_WEEK,
-        "1M": Interval.INTERVAL_1_MONTH,
+        "1m": tradingview_ta.Interval.INTERVAL_1_MINUTE,
+        "5m": tradingview_ta.Interval.INTERVAL_5_MINUTES,
+        "15m": tradingview_ta.Interval.INTERVAL_15_MINUTES,
+        "1h": tradingview_ta.Interval.INTERVAL_1_HOUR,
+        "4h": tradingview_ta.Interval.INTERVAL_4_HOURS,
+        "1d": tradingview_ta.Interval.INTERVAL_1_DAY,
+        "1w": tradingview_ta.Interval.INTERVAL_1_WEEK,
+        "1M": tradingview_ta.Interval.INTERVAL_1_MONTH,
     }
     
     results = {"ticker": ticker, "timeframes": {}}
     
     for name, interval in intervals.items():
         try:
-            handler = TA_Handler(
+            handler = tradingview_ta.TA_Handler(
                 symbol=ticker.upper(),
                 screener="america",
                 exchange=exchange,
                 interval=interval
             )
-            analysis = handler.get_analysis()
+            analysis = hedger.call("tradingview", handler.get_analysis)
             
             results["timeframes"][name] = {
                 "recommendation": analysis.summary["RECOMMENDATION"],
@@ -484,13 +521,9 @@ def detect_exchange(ticker: str) -> str:
     """
     Detecta el exchange basado en el ticker.
     """
-    import yfinance as yf
-    
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = hedger.call("yahoo_info", lambda: yf.Ticker(ticker).info)
         exchange = info.get('exchange', '')
-        _logger.info(f"Exchange detected: {exchange}")
         
         exchange_map = {
             'NMS': 'NASDAQ',
@@ -502,7 +535,9 @@ def detect_exchange(ticker: str) -> str:
             'ASE': 'AMEX',
             'BTS': 'NYSE',
         }
-        _logger.info(f"Exchange mapped: {exchange_map.get(exchange, 'NASDAQ')}")
+        _logger.info("Exchange detected", extra=log_fields(
+            sample="fetch", ticker=ticker, exchange=exchange, mapped=exchange_map.get(exchange, 'NASDAQ')
+        ))
         
         return exchange_map.get(exchange, 'NASDAQ')
     except Exception:
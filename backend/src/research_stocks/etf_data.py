@@ -1,3 +1,5 @@
+import asyncio
+
 from research_stocks.etf_fetchers import (
     get_etf_holdings,
     get_etf_info,
@@ -5,8 +7,10 @@ from research_stocks.etf_fetchers import (
 )
 from research_stocks.data_fetchers import (
     check_options_volatility,
+    get_quote,
     get_stocktwits_data)
 from research_stocks.news import get_complete_news
+from research_stocks.sections import SectionedData
 from research_stocks.schemas import (
     ETFDataSchema,
     ETFInfoSchema,
@@ -18,15 +22,26 @@ from research_stocks.schemas import (
     OptionsVolatilitySchema,
     OptionsMove
 )
-from utils.logger import setup_logging
+from utils.logger import log_fields, setup_logging
 
 _logger = setup_logging()
 
 
-class ETFData:
+class ETFData(SectionedData):
     """Clase para consolidar todos los datos de un ETF."""
     
+    SECTIONS = ("fundamentals", "holdings", "sectors", "price", "options", "news", "sentiment")
+    SECTION_ATTRS = {
+        "fundamentals": "_raw_info",
+        "holdings": "_raw_holdings",
+        "sectors": "_raw_sectors",
+        "options": "_raw_options",
+        "news": "_raw_news",
+        "sentiment": "_raw_sentiment",
+    }
+    
     def __init__(self, ticker: str):
+        super().__init__()
         self.ticker = ticker.upper()
         self._raw_info = None
         self._raw_holdings = None
@@ -36,84 +51,104 @@ class ETFData:
         self._raw_options = None
         
     @classmethod
-    async def create(cls, ticker: str) -> "ETFData":
-        """Factory method asíncrono para crear una instancia de ETFData."""
+    async def create(cls, ticker: str, use_deadlines: bool = False) -> "ETFData":
+        """Factory method asíncrono para crear una instancia de ETFData (ver StockData.create)."""
         instance = cls(ticker)
-        await instance._fetch_all_data()
+        await instance._fetch_all_data(use_deadlines)
         return instance
     
-    async def _fetch_all_data(self):
-        """Obtiene todos los datos del ETF."""
-        _logger.info(f"Fetching ETF data for {self.ticker}...")
-        
-        # 1. Info general del ETF
-        try:
-            self._raw_info = get_etf_info(self.ticker)
-        except Exception as e:
-            _logger.warning(f"⚠️ Error fetching ETF info for {self.ticker}: {e}")
-            self._raw_info = {"ticker": self.ticker, "error": str(e)}
-        
-        # 2. Holdings
-        try:
-            self._raw_holdings = get_etf_holdings(self.ticker)
-        except Exception as e:
-            _logger.warning(f"⚠️ Error fetching holdings for {self.ticker}: {e}")
-            self._raw_holdings = {"ticker": self.ticker, "holdings": []}
-        
-        # 3. Sector allocation
-        try:
-            self._raw_sectors = get_etf_sector_allocation(self.ticker)
-        except Exception as e:
-            _logger.warning(f"⚠️ Error fetching sectors for {self.ticker}: {e}")
-            self._raw_sectors = {"ticker": self.ticker, "sectors": {}}
-        
-        # 4. News - AHORA CON MULTI-FUENTE
-        try:
-            self._raw_news = await get_complete_news(self.ticker)
-        except Exception as e:
-            _logger.warning(f"⚠️ Error fetching news for {self.ticker}: {e}")
-            self._raw_news = {"summary": "News data unavailable.", "articles": []}
-        
-        # 5. Sentiment (StockTwits)
-        try:
-            self._raw_sentiment = get_stocktwits_data(self.ticker.lower())
-        except Exception as e:
-            _logger.warning(f"⚠️ Error fetching sentiment for {self.ticker}: {e}")
-            self._raw_sentiment = {"stock_name": self.ticker, "messages": []}
+    async def _fetch_all_data(self, use_deadlines: bool = False):
+        """Obtiene todos los datos del ETF (todas las secciones en paralelo)."""
+        _logger.info("Fetching ETF data", extra=log_fields(sample="fetch", ticker=self.ticker))
         
-        # 6. Options
-        try:
-            self._raw_options = check_options_volatility(ticker=self.ticker)
-        except Exception as e:
-            _logger.error(f"⚠️ Error fetching options for {self.ticker}: {e}")
-            self._raw_options = {
+        # El precio viene dentro de fundamentals (info completa de yfinance)
+        await self.fetch_sections(
+            ("fundamentals", "holdings", "sectors", "news", "sentiment", "options"),
+            use_deadlines
+        )
+
+    def _fallback(self, section: str, error: str):
+        if section == "holdings":
+            return {"ticker": self.ticker, "holdings": []}
+        if section == "sectors":
+            return {"ticker": self.ticker, "sectors": {}}
+        if section == "options":
+            return {
                 "ticker": self.ticker,
                 "price": 0.0,
                 "atm_iv_avg": "N/A",
                 "unusual_activity_count": 0,
                 "top_unusual_moves": [],
-                "error": str(e)
+                "error": error
             }
+        if section == "news":
+            return {"summary": "News data unavailable.", "articles": []}
+        if section == "sentiment":
+            return {"stock_name": self.ticker, "messages": []}
+        return {"ticker": self.ticker, "error": error}
+
+    # ===== Refresh por sección (ver research_stocks/sections.py) =====
+
+    async def refresh_fundamentals(self):
+        """Info completa de yfinance: costos, rendimientos y también precio."""
+        if await self._refresh_from(
+            "fundamentals",
+            lambda: get_etf_info(self.ticker)
+        ):
+            self.mark_updated("price")
+
+    async def refresh_price(self):
+        """Actualiza solo los campos de precio/volumen dentro de info."""
+        quote = await asyncio.to_thread(get_quote, self.ticker)
+        if "error" in quote:
+            self.mark_failed("price", quote["error"])
+            return
+        if self._raw_info is None or "error" in self._raw_info:
+            return await self.refresh_fundamentals()
+        quote.pop("market_cap", None)  # los ETFs usan total_assets
+        self._raw_info.update({k: v for k, v in quote.items() if v is not None})
+        self.mark_updated("price")
+
+    async def refresh_holdings(self):
+        await self._refresh_from(
+            "holdings",
+            lambda: get_etf_holdings(self.ticker)
+        )
+
+    async def refresh_sectors(self):
+        await self._refresh_from(
+            "sectors",
+            lambda: get_etf_sector_allocation(self.ticker)
+        )
+
+    async def refresh_options(self):
+        await self._refresh_from(
+            "options",
+            lambda: check_options_volatility(ticker=self.ticker)
+        )
 
     async def refresh_news(self):
         """Actualiza solo las noticias."""
-        _logger.info(f"🔄 Refreshing news for ETF {self.ticker}...")
+        _logger.info("🔄 Refreshing news for ETF %s", self.ticker, extra=log_fields(sample="refresh"))
         try:
             new_news = await get_complete_news(self.ticker)
             if new_news:
                 self._raw_news = new_news
+            self.mark_updated("news")
         except Exception as e:
             _logger.error(f"⚠️ Error refreshing news for {self.ticker}: {e}")
+            if self._raw_news is None or "news" in self._pending:
+                self._raw_news = self._fallback("news", str(e))
+            self.mark_failed("news", str(e))
 
-    def refresh_sentiment(self):
+    async def refresh_sentiment(self):
         """Actualiza solo el sentimiento."""
-        _logger.info(f"🔄 Refreshing sentiment for ETF {self.ticker}...")
-        try:
-            new_sentiment = get_stocktwits_data(self.ticker.lower())
-            if isinstance(new_sentiment, dict) and 'messages' in new_sentiment:
-                self._raw_sentiment = new_sentiment
-        except Exception as e:
-            _logger.error(f"⚠️ Error refreshing sentiment for {self.ticker}: {e}")
+        _logger.info("🔄 Refreshing sentiment for ETF %s", self.ticker, extra=log_fields(sample="refresh"))
+        await self._refresh_from(
+            "sentiment",
+            lambda: get_stocktwits_data(self.ticker.lower()),
+            is_valid=lambda data: isinstance(data, dict) and 'messages' in data
+        )
 
     def to_schema(self) -> ETFDataSchema:
         """Convierte los datos raw a un schema estructurado."""
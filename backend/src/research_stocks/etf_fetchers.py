@@ -1,6 +1,9 @@
-import yfinance as yf
+from utils.hedging import hedger
+from utils.lazy_imports import lazy_import
 from utils.logger import setup_logging
 
+yf = lazy_import("yfinance")  # Se importa en el primer uso
+
 _logger = setup_logging()
 
 
@@ -40,8 +43,7 @@ def get_etf_info(ticker: str) -> dict:
     Obtiene información general de un ETF incluyendo métricas clave.
     """
     try:
-        etf = yf.Ticker(ticker)
-        info = etf.info
+        info = hedger.call("yahoo_info", lambda: yf.Ticker(ticker).info)
         
         return {
             "ticker": ticker,
@@ -145,8 +147,7 @@ def is_etf(ticker: str) -> bool:
     Determina si un ticker es un ETF o una acción individual.
     """
     try:
-        instrument = yf.Ticker(ticker)
-        info = instrument.info
+        info = hedger.call("yahoo_info", lambda: yf.Ticker(ticker).info)
         quote_type = info.get('quoteType', '').upper()
         return quote_type == 'ETF'
     except Exception:
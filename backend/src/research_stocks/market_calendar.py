@@ -0,0 +1,151 @@
+"""
+Calendario de sesiones de los exchanges a los que mapea `detect_exchange`
+(NASDAQ, NYSE, AMEX): pre-market, regular, post-market y cerrado, con los
+feriados y cierres anticipados de la bolsa de EE.UU.
+"""
+
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+
+class SessionPhase(str, Enum):
+    PRE = "pre"
+    REGULAR = "regular"
+    POST = "post"
+    CLOSED = "closed"
+
+
+# Los tres exchanges comparten horario y calendario
+_EXCHANGE_TZ = {
+    "NASDAQ": ZoneInfo("America/New_York"),
+    "NYSE": ZoneInfo("America/New_York"),
+    "AMEX": ZoneInfo("America/New_York"),
+}
+SUPPORTED_EXCHANGES = tuple(_EXCHANGE_TZ)
+_PRE_OPEN = time(4, 0)
+_REGULAR_OPEN = time(9, 30)
+_REGULAR_CLOSE = time(16, 0)
+_EARLY_CLOSE = time(13, 0)
+_POST_CLOSE = time(20, 0)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-ésimo `weekday` (0=lunes) del mes; n=-1 para el último."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    """Domingo de Pascua (algoritmo anónimo gregoriano)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+
+def _observed(day: date) -> date:
+    """Sábado se observa el viernes, domingo el lunes."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=16)
+def us_holidays(year: int) -> frozenset[date]:
+    """Feriados de NYSE/NASDAQ del año."""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),   # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),   # Presidents' Day
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _observed(date(year, 7, 4)),   # Independence Day
+        _nth_weekday(year, 9, 0, 1),   # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25)),  # Christmas
+    }
+    # Año Nuevo en sábado no se observa el viernes anterior (regla NYSE)
+    if date(year, 1, 1).weekday() != 5:
+        holidays.add(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return frozenset(holidays)
+
+
+@lru_cache(maxsize=16)
+def us_early_closes(year: int) -> frozenset[date]:
+    """Días con cierre a las 13:00 (víspera de Independencia, post Thanksgiving, Nochebuena)."""
+    candidates = {
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24),
+    }
+    return frozenset(d for d in candidates if is_trading_day(d))
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in us_holidays(day.year)
+
+
+def _tz(exchange: Optional[str]) -> ZoneInfo:
+    return _EXCHANGE_TZ.get((exchange or "NASDAQ").upper(), _EXCHANGE_TZ["NASDAQ"])
+
+
+def session_phase(exchange: Optional[str] = None, now: Optional[datetime] = None) -> SessionPhase:
+    """Fase de la sesión del exchange en `now` (por defecto, ahora)."""
+    local = (now or datetime.now(_tz(exchange))).astimezone(_tz(exchange))
+    day = local.date()
+    if not is_trading_day(day):
+        return SessionPhase.CLOSED
+
+    clock = local.time()
+    close = _EARLY_CLOSE if day in us_early_closes(day.year) else _REGULAR_CLOSE
+    if _PRE_OPEN <= clock < _REGULAR_OPEN:
+        return SessionPhase.PRE
+    if _REGULAR_OPEN <= clock < close:
+        return SessionPhase.REGULAR
+    if close <= clock < _POST_CLOSE:
+        return SessionPhase.POST
+    return SessionPhase.CLOSED
+
+
+def next_regular_open(exchange: Optional[str] = None, now: Optional[datetime] = None) -> datetime:
+    """Próxima apertura de la sesión regular (hora local del exchange)."""
+    tz = _tz(exchange)
+    local = (now or datetime.now(tz)).astimezone(tz)
+    day = local.date()
+    if local.time() >= _REGULAR_OPEN:
+        day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return datetime.combine(day, _REGULAR_OPEN, tzinfo=tz)
+
+
+def market_session(exchange: Optional[str] = None, now: Optional[datetime] = None) -> dict:
+    """Resumen de la sesión para exponer en la API."""
+    tz = _tz(exchange)
+    local = (now or datetime.now(tz)).astimezone(tz)
+    used = (exchange or "NASDAQ").upper()
+    return {
+        # Un exchange desconocido usa el calendario de NASDAQ: se informa el que se usó
+        "exchange": used if used in _EXCHANGE_TZ else "NASDAQ",
+        "phase": session_phase(exchange, local).value,
+        "holiday": local.date() in us_holidays(local.year),
+        "early_close": local.date() in us_early_closes(local.year),
+        "local_time": local.isoformat(timespec="seconds"),
+        "next_regular_open": next_regular_open(exchange, local).isoformat(timespec="seconds"),
+    }
@@ -5,20 +5,47 @@ Integra: Yahoo Finance, Google News, Finnhub, Polygon.io
 
 import os
 import asyncio
+import hashlib
+import math
 from abc import ABC, abstractmethod
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
-import aiohttp
-import yfinance as yf
-from GoogleNews import GoogleNews
 from dataclasses import dataclass
 from enum import Enum
 
-from utils.logger import setup_logging
-from utils.models import Settings
+from research_stocks.news_dedup import NewsDeduplicator
+from research_stocks.news_store import NewsStore, parse_datetime
+from research_stocks.summary_cache import SummaryCache
+from settings.env_config import env_settings
+from utils.lazy_imports import lazy_import
+from utils.llm_dispatcher import llm_dispatcher
+from utils.logger import log_fields, setup_logging
+
+# Librerías pesadas: se importan en el primer uso
+aiohttp = lazy_import("aiohttp")
+yf = lazy_import("yfinance")
+google_news = lazy_import("GoogleNews")
 
 _logger = setup_logging()
 
+# Subir la versión al cambiar el prompt de resumen invalida el cache de resúmenes
+NEWS_SUMMARY_PROMPT_VERSION = "v2"
+
+# Pool dedicado para los scrapers bloqueantes (yfinance, GoogleNews).
+# Acotado para no saturar el default executor del event loop.
+_news_executor = ThreadPoolExecutor(
+    max_workers=env_settings.news_fetch_workers,
+    thread_name_prefix="news-fetch"
+)
+
+
+async def _run_blocking(func, *args):
+    """Ejecuta una función bloqueante en el pool de noticias sin frenar el event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_news_executor, func, *args)
+
 
 class NewsSource(Enum):
     """Fuentes de noticias disponibles."""
@@ -28,6 +55,50 @@ class NewsSource(Enum):
     POLYGON = "Polygon.io"
 
 
+def article_fingerprint(url: str, title: str) -> str:
+    """
+    Fingerprint sha1 de un artículo. A diferencia de hash(), es estable entre
+    procesos y reinicios, por lo que puede persistirse y compararse entre workers.
+    """
+    key = url.strip() if url else " ".join((title or "").lower().split())
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def news_fingerprints(news) -> frozenset[str]:
+    """Conjunto de fingerprints de un resultado de get_complete_news()."""
+    if not isinstance(news, dict):
+        return frozenset()
+    return frozenset(
+        article.get("fingerprint") or article_fingerprint(article.get("url", ""), article.get("title", ""))
+        for article in news.get("articles", [])
+        if isinstance(article, dict)
+    )
+
+
+def diff_news(old_fingerprints, new_news) -> dict:
+    """
+    Compara el set de fingerprints previo con un nuevo resultado de noticias.
+    
+    Returns:
+        Dict con 'added' (artículos nuevos), 'removed' (fingerprints que ya no están)
+        y 'fingerprints' (set nuevo, para persistir)
+    """
+    old_fps = frozenset(old_fingerprints or ())
+    new_fps = news_fingerprints(new_news)
+    added_fps = new_fps - old_fps
+    
+    added = [
+        article for article in (new_news.get("articles", []) if added_fps else [])
+        if (article.get("fingerprint") or article_fingerprint(article.get("url", ""), article.get("title", ""))) in added_fps
+    ]
+    
+    return {
+        "added": added,
+        "removed": sorted(old_fps - new_fps),
+        "fingerprints": new_fps
+    }
+
+
 @dataclass
 class NewsArticle:
     """Estructura de un artículo de noticias."""
@@ -41,8 +112,14 @@ class NewsArticle:
     sentiment: Optional[str] = None
     relevance_score: Optional[float] = None
     
+    @property
+    def fingerprint(self) -> str:
+        """Identificador estable del artículo (URL o título normalizado)."""
+        return article_fingerprint(self.url, self.title)
+    
     def to_dict(self) -> dict:
         return {
+            "fingerprint": self.fingerprint,
             "title": self.title,
             "source": self.source.value,
             "publisher": self.publisher,
@@ -52,14 +129,41 @@ class NewsArticle:
             "sentiment": self.sentiment,
             "relevance_score": self.relevance_score
         }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "NewsArticle":
+        """Reconstruye un artículo desde to_dict() (usado por el NewsStore)."""
+        return cls(
+            title=data.get("title", "No Title"),
+            source=NewsSource(data.get("source", NewsSource.YAHOO_FINANCE.value)),
+            publisher=data.get("publisher", ""),
+            content=data.get("content", ""),
+            url=data.get("url", ""),
+            published_at=parse_datetime(data.get("date")),
+            sentiment=data.get("sentiment"),
+            relevance_score=data.get("relevance_score")
+        )
+
+
+def _is_newer(article: NewsArticle, since: Optional[datetime]) -> bool:
+    """True si el artículo es posterior al cursor (o si no hay forma de saberlo)."""
+    return since is None or article.published_at is None or article.published_at > since
 
 
 class NewsProvider(ABC):
     """Clase base abstracta para proveedores de noticias."""
     
     @abstractmethod
-    async def fetch_news(self, ticker: str, limit: int = 5) -> list[NewsArticle]:
-        """Obtiene noticias para un ticker específico."""
+    async def fetch_news(
+        self, 
+        ticker: str, 
+        limit: int = 5, 
+        since: Optional[datetime] = None
+    ) -> list[NewsArticle]:
+        """
+        Obtiene noticias para un ticker específico.
+        Si se indica `since`, solo retorna artículos publicados después de esa fecha.
+        """
         pass
     
     @property
@@ -86,14 +190,22 @@ class YahooFinanceProvider(NewsProvider):
     def is_configured(self) -> bool:
         return True
     
-    async def fetch_news(self, ticker: str, limit: int = 5) -> list[NewsArticle]:
+    async def fetch_news(
+        self, 
+        ticker: str, 
+        limit: int = 5, 
+        since: Optional[datetime] = None
+    ) -> list[NewsArticle]:
         articles = []
         try:
-            stock = yf.Ticker(ticker)
-            news_data = stock.news
+            # Yahoo no admite filtro por fecha: se filtra localmente
+            news_data = await _run_blocking(self._download, ticker)
             
             if news_data:
-                for item in news_data[:limit]:
+                for item in news_data:
+                    if len(articles) >= limit:
+                        break
+
                     content = (
                         item.get('summary', '') or 
                         item.get('description', '') or 
@@ -107,21 +219,28 @@ class YahooFinanceProvider(NewsProvider):
                         except (ValueError, TypeError):
                             pass
                     
-                    articles.append(NewsArticle(
+                    article = NewsArticle(
                         title=item.get('title', 'No Title'),
                         source=self.source,
                         publisher=item.get('publisher', 'Yahoo Finance'),
                         content=content,
                         url=item.get('link', ''),
                         published_at=published_at
-                    ))
+                    )
+                    if _is_newer(article, since):
+                        articles.append(article)
                     
-            _logger.info(f"✅ Yahoo Finance: {len(articles)} articles for {ticker}")
+            _logger.info("✅ Yahoo Finance news fetched", extra=log_fields(sample="news_fetch", source="yahoo", ticker=ticker, articles=len(articles)))
         except Exception as e:
             _logger.error(f"❌ Yahoo Finance error for {ticker}: {e}")
         
         return articles
 
+    @staticmethod
+    def _download(ticker: str) -> list[dict]:
+        """Llamada bloqueante a yfinance (se ejecuta en el pool de noticias)."""
+        return yf.Ticker(ticker).news
+
 
 class GoogleNewsProvider(NewsProvider):
     """Proveedor de noticias de Google News."""
@@ -134,16 +253,21 @@ class GoogleNewsProvider(NewsProvider):
     def is_configured(self) -> bool:
         return True
     
-    async def fetch_news(self, ticker: str, limit: int = 10) -> list[NewsArticle]:
+    async def fetch_news(
+        self, 
+        ticker: str, 
+        limit: int = 10, 
+        since: Optional[datetime] = None
+    ) -> list[NewsArticle]:
         articles = []
         try:
-            googlenews = GoogleNews(lang='en', period='7d')
-            googlenews.clear()
-            googlenews.search(f"{ticker} stock news")
-            results = googlenews.result()
+            results = await _run_blocking(self._download, ticker, self._period(since))
             
             if results:
-                for item in results[:limit]:
+                for item in results:
+                    if len(articles) >= limit:
+                        break
+
                     published_at = None
                     date_str = item.get('date', '')
                     if date_str:
@@ -155,21 +279,43 @@ class GoogleNewsProvider(NewsProvider):
                         except (ValueError, TypeError):
                             pass
                     
-                    articles.append(NewsArticle(
+                    article = NewsArticle(
                         title=item.get('title', 'No Title'),
                         source=self.source,
                         publisher=item.get('media', 'Unknown'),
                         content=item.get('desc', '') or item.get('description', ''),
                         url=item.get('link', ''),
                         published_at=published_at
-                    ))
+                    )
+                    if _is_newer(article, since):
+                        articles.append(article)
             
-            _logger.info(f"✅ Google News: {len(articles)} articles for {ticker}")
+            _logger.info("✅ Google News news fetched", extra=log_fields(sample="news_fetch", source="google_news", ticker=ticker, articles=len(articles)))
         except Exception as e:
             _logger.error(f"❌ Google News error for {ticker}: {e}")
         
         return articles
 
+    @staticmethod
+    def _period(since: Optional[datetime]) -> str:
+        """Traduce el cursor a un período de Google News ('12h', '3d', máximo '7d')."""
+        if since is None:
+            return '7d'
+        hours = math.ceil((datetime.now() - since).total_seconds() / 3600)
+        if hours < 1:
+            return '1h'
+        if hours < 24:
+            return f'{hours}h'
+        return f'{min(math.ceil(hours / 24), 7)}d'
+
+    @staticmethod
+    def _download(ticker: str, period: str = '7d') -> list[dict]:
+        """Scraping bloqueante de GoogleNews (se ejecuta en el pool de noticias)."""
+        googlenews = google_news.GoogleNews(lang='en', period=period)
+        googlenews.clear()
+        googlenews.search(f"{ticker} stock news")
+        return googlenews.result()
+
 
 class FinnhubProvider(NewsProvider):
     """
@@ -190,14 +336,21 @@ class FinnhubProvider(NewsProvider):
     def is_configured(self) -> bool:
         return bool(self.api_key)
     
-    async def fetch_news(self, ticker: str, limit: int = 10) -> list[NewsArticle]:
+    async def fetch_news(
+        self, 
+        ticker: str, 
+        limit: int = 10, 
+        since: Optional[datetime] = None
+    ) -> list[NewsArticle]:
         if not self.is_configured:
             _logger.warning("⚠️ Finnhub not configured (missing FINNHUB_API_KEY)")
             return []
         
         articles = []
         try:
-            from_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+            # Finnhub filtra por día: el resto se filtra localmente contra el cursor
+            from_dt = since or (datetime.now() - timedelta(days=7))
+            from_date = from_dt.strftime('%Y-%m-%d')
             to_date = datetime.now().strftime('%Y-%m-%d')
             
             url = f"{self.base_url}/company-news"
@@ -213,7 +366,9 @@ class FinnhubProvider(NewsProvider):
                     if response.status == 200:
                         data = await response.json()
                         
-                        for item in data[:limit]:
+                        for item in data:
+                            if len(articles) >= limit:
+                                break
                             published_at = None
                             if item.get('datetime'):
                                 try:
@@ -221,18 +376,20 @@ class FinnhubProvider(NewsProvider):
                                 except (ValueError, TypeError):
                                     pass
                             
-                            articles.append(NewsArticle(
+                            article = NewsArticle(
                                 title=item.get('headline', 'No Title'),
                                 source=self.source,
                                 publisher=item.get('source', 'Finnhub'),
                                 content=item.get('summary', ''),
                                 url=item.get('url', ''),
                                 published_at=published_at
-                            ))
+                            )
+                            if _is_newer(article, since):
+                                articles.append(article)
                     else:
                         _logger.error(f"❌ Finnhub returned {response.status}")
             
-            _logger.info(f"✅ Finnhub: {len(articles)} articles for {ticker}")
+            _logger.info("✅ Finnhub news fetched", extra=log_fields(sample="news_fetch", source="finnhub", ticker=ticker, articles=len(articles)))
         except Exception as e:
             _logger.error(f"❌ Finnhub error for {ticker}: {e}")
         
@@ -258,7 +415,12 @@ class PolygonProvider(NewsProvider):
     def is_configured(self) -> bool:
         return bool(self.api_key)
     
-    async def fetch_news(self, ticker: str, limit: int = 10) -> list[NewsArticle]:
+    async def fetch_news(
+        self, 
+        ticker: str, 
+        limit: int = 10, 
+        since: Optional[datetime] = None
+    ) -> list[NewsArticle]:
         if not self.is_configured:
             _logger.warning("⚠️ Polygon not configured (missing POLYGON_API_KEY)")
             return []
@@ -273,6 +435,8 @@ class PolygonProvider(NewsProvider):
                 "sort": "published_utc",
                 "apiKey": self.api_key
             }
+            if since is not None:
+                params["published_utc.gt"] = since.astimezone().isoformat()
             
             async with aiohttp.ClientSession() as session:
                 async with session.get(url, params=params) as response:
@@ -282,12 +446,9 @@ class PolygonProvider(NewsProvider):
                         for item in data.get('results', []):
                             published_at = None
                             if item.get('published_utc'):
-                                try:
-                                    published_at = datetime.fromisoformat(
-                                        item['published_utc'].replace('Z', '+00:00')
-                                    )
-                                except (ValueError, TypeError):
-                                    pass
+                                published_at = parse_datetime(
+                                    item['published_utc'].replace('Z', '+00:00')
+                                )
                             
                             articles.append(NewsArticle(
                                 title=item.get('title', 'No Title'),
@@ -300,7 +461,7 @@ class PolygonProvider(NewsProvider):
                     else:
                         _logger.error(f"❌ Polygon returned {response.status}")
             
-            _logger.info(f"✅ Polygon: {len(articles)} articles for {ticker}")
+            _logger.info("✅ Polygon news fetched", extra=log_fields(sample="news_fetch", source="polygon", ticker=ticker, articles=len(articles)))
         except Exception as e:
             _logger.error(f"❌ Polygon error for {ticker}: {e}")
         
@@ -336,6 +497,21 @@ class MultiSourceNewsFetcher:
             FinnhubProvider(),
             PolygonProvider(),
         ]
+        self.deduplicator = NewsDeduplicator(
+            threshold=env_settings.news_dedup_threshold,
+            window_hours=env_settings.news_dedup_window_hours
+        )
+        self.store = NewsStore(
+            base_dir=env_settings.news_store_dir,
+            retention_days=env_settings.news_store_retention_days
+        )
+        self._store_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.summary_cache = SummaryCache(
+            max_entries=env_settings.news_summary_cache_size,
+            base_dir=env_settings.news_summary_cache_dir
+        )
+        self._summary_state: dict[str, dict] = {}
+        self._llm_semaphore = asyncio.Semaphore(env_settings.news_summary_llm_concurrency)
         self._log_provider_status()
     
     def _log_provider_status(self):
@@ -355,7 +531,13 @@ class MultiSourceNewsFetcher:
         limit_per_source: int = 5,
         sources: Optional[list[NewsSource]] = None
     ) -> list[NewsArticle]:
-        """Obtiene noticias de todas las fuentes configuradas."""
+        """
+        Obtiene noticias de todas las fuentes configuradas.
+        
+        Es incremental: cada proveedor recibe su cursor (fecha del artículo más
+        reciente ya almacenado) y solo se descargan artículos nuevos, que se
+        fusionan con el NewsStore persistente del ticker.
+        """
         providers = self.get_active_providers()
         
         if sources:
@@ -365,24 +547,59 @@ class MultiSourceNewsFetcher:
             _logger.warning("⚠️ No news providers available!")
             return []
         
-        _logger.info(f"📰 Fetching news for {ticker} from {len(providers)} sources...")
-        
-        tasks = [provider.fetch_news(ticker, limit_per_source) for provider in providers]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        all_articles = []
-        for result in results:
-            if isinstance(result, list):
-                all_articles.extend(result)
-            elif isinstance(result, Exception):
-                _logger.error(f"❌ Provider error: {result}")
+        async with self._store_locks[ticker]:
+            stored = await _run_blocking(self.store.load, ticker)
+            cursors = {
+                source: parse_datetime(value)
+                for source, value in stored["cursors"].items()
+            }
+            
+            _logger.info("📰 Fetching news", extra=log_fields(sample="news_fetch", ticker=ticker, sources=len(providers)))
+            
+            tasks = [
+                provider.fetch_news(ticker, limit_per_source, self._since(cursors.get(provider.source.value)))
+                for provider in providers
+            ]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            
+            fresh_articles = []
+            for provider, result in zip(providers, results):
+                if isinstance(result, list):
+                    fresh_articles.extend(result)
+                    dates = [a.published_at for a in result if a.published_at]
+                    previous = cursors.get(provider.source.value)
+                    if dates and (previous is None or max(dates) > previous):
+                        stored["cursors"][provider.source.value] = max(dates).isoformat()
+                elif isinstance(result, Exception):
+                    _logger.error(f"❌ Provider error: {result}")
+            
+            # Los artículos almacenados van primero para que sean la versión canónica
+            known = [NewsArticle.from_dict(a) for a in stored["articles"].values()]
+            new_articles = [a for a in fresh_articles if a.fingerprint not in stored["articles"]]
+            merged = self._deduplicate_articles(ticker, known + new_articles)
+            
+            now = datetime.now().isoformat()
+            stored["articles"] = {
+                a.fingerprint: {**a.to_dict(), "stored_at": stored["articles"].get(a.fingerprint, {}).get("stored_at", now)}
+                for a in merged
+            }
+            await _run_blocking(self.store.save, ticker, stored)
         
-        deduplicated = self._deduplicate_articles(all_articles)
-        deduplicated.sort(key=lambda x: x.published_at or datetime.min, reverse=True)
+        if sources:
+            merged = [a for a in merged if a.source in sources]
+        merged.sort(key=lambda x: x.published_at or datetime.min, reverse=True)
         
-        _logger.info(f"📰 Total: {len(all_articles)} articles, {len(deduplicated)} after deduplication")
+        _logger.info("📰 News merged", extra=log_fields(
+            sample="news_fetch", ticker=ticker, fetched=len(fresh_articles), new=len(new_articles), stored=len(merged)
+        ))
         
-        return deduplicated
+        return merged
+    
+    def _since(self, cursor: Optional[datetime]) -> Optional[datetime]:
+        """Cursor con un pequeño solapamiento para tolerar artículos indexados tarde."""
+        if cursor is None:
+            return None
+        return cursor - timedelta(minutes=env_settings.news_cursor_overlap_minutes)
     
     async def fetch_complete(
         self, 
@@ -425,20 +642,9 @@ class MultiSourceNewsFetcher:
             fetch_timestamp=datetime.now()
         )
     
-    def _deduplicate_articles(self, articles: list[NewsArticle]) -> list[NewsArticle]:
-        """Elimina artículos duplicados basándose en similitud de títulos."""
-        seen_titles = set()
-        unique_articles = []
-        
-        for article in articles:
-            normalized = article.title.lower().strip()
-            key = ' '.join(normalized.split()[:8])
-            
-            if key not in seen_titles:
-                seen_titles.add(key)
-                unique_articles.append(article)
-        
-        return unique_articles
+    def _deduplicate_articles(self, ticker: str, articles: list[NewsArticle]) -> list[NewsArticle]:
+        """Elimina artículos duplicados o casi duplicados (MinHash + LSH sobre título y contenido)."""
+        return self.deduplicator.deduplicate(ticker, articles)
     
     async def fetch_and_summarize(
         self, 
@@ -474,10 +680,145 @@ class MultiSourceNewsFetcher:
         return "\n".join(formatted)
     
     async def _generate_llm_summary(self, ticker: str, articles: list[NewsArticle]) -> str:
-        """Genera un resumen usando el LLM."""
-        news_text = f"News articles for {ticker}:\n\n"
+        """
+        Genera un resumen usando el LLM.
+        Se cachea por (ticker, fingerprints de los artículos, versión del prompt):
+        si el set de noticias no cambió, no se vuelve a llamar al LLM.
+        
+        Si ya existe un resumen previo reciente, se actualiza de forma incremental
+        enviando solo los artículos nuevos; el resumen completo se reconstruye al
+        superar el límite de antigüedad o de actualizaciones incrementales.
+        
+        Los sets grandes se resumen en modo map-reduce (ver _map_reduce_summary).
+        """
+        selected = articles[:env_settings.news_summary_max_articles]
+        fingerprints = frozenset(a.fingerprint for a in selected)
+        cache_key = SummaryCache.make_key(ticker, fingerprints, NEWS_SUMMARY_PROMPT_VERSION)
+        cached = await _run_blocking(self.summary_cache.get, cache_key)
+        if cached is not None:
+            _logger.debug("📦 News summary cache hit for %s", ticker)
+            self._remember_summary(ticker, cached, fingerprints, incremental=False, keep_age=True)
+            return cached
+        
+        batch_size = env_settings.news_summary_batch_size
+        state = self._summary_state.get(ticker)
+        incremental = self._can_update_incrementally(state)
+        new_articles = []
+        if incremental:
+            new_articles = [a for a in selected if a.fingerprint not in state["fingerprints"]]
+            if not new_articles:
+                # Solo salieron artículos de la ventana: el resumen previo sigue siendo válido
+                self._remember_summary(ticker, state["summary"], fingerprints, incremental=False, keep_age=True)
+                return state["summary"]
+            # Demasiadas novedades: sale más barato reconstruir en paralelo
+            incremental = len(new_articles) <= batch_size
+        
+        partial = False
+        try:
+            if incremental:
+                _logger.info(
+                    "🧩 Incremental news summary for %s (%d new articles)", ticker, len(new_articles),
+                    extra=log_fields(sample="news_summary")
+                )
+                summary = await self._complete(
+                    ticker,
+                    self._build_delta_summary_prompt(ticker, state["summary"], new_articles)
+                )
+            elif len(selected) > batch_size:
+                summary, partial = await self._map_reduce_summary(ticker, selected, batch_size)
+            else:
+                summary = await self._complete(ticker, self._build_full_summary_prompt(ticker, selected))
+        except Exception as e:
+            _logger.error(f"Error generating news summary: {e}")
+            return self._format_articles(articles)
+        
+        if partial:
+            # No cubre todos los artículos: no se cachea para reintentar en el próximo refresh
+            return summary
+        
+        self._remember_summary(ticker, summary, fingerprints, incremental=incremental)
+        await _run_blocking(
+            lambda: self.summary_cache.set(cache_key, summary, ticker=ticker, articles=len(selected))
+        )
+        return summary
+    
+    async def _complete(self, ticker: str, prompt: str) -> str:
+        """Llamada al LLM respetando el límite de concurrencia de resúmenes."""
+        async with self._llm_semaphore:
+            response = await llm_dispatcher.acomplete(prompt, ticker=ticker, call_type="news_summary")
+        return response.text
+    
+    async def _map_reduce_summary(
+        self, ticker: str, articles: list[NewsArticle], batch_size: int
+    ) -> tuple[str, bool]:
+        """
+        Resume lotes de artículos en paralelo (map) y luego combina los
+        resúmenes parciales en el resumen ejecutivo final (reduce).
+        Retorna (resumen, partial); partial es True si falló algún lote.
+        """
+        batches = [articles[i:i + batch_size] for i in range(0, len(articles), batch_size)]
+        _logger.info(
+            "🗂️ Map-reduce news summary for %s: %d articles in %d batches", ticker, len(articles), len(batches),
+            extra=log_fields(sample="news_summary")
+        )
+        
+        results = await asyncio.gather(
+            *(self._complete(ticker, self._build_map_prompt(ticker, batch)) for batch in batches),
+            return_exceptions=True
+        )
+        partials = [r for r in results if isinstance(r, str)]
+        for result in results:
+            if isinstance(result, Exception):
+                _logger.warning(f"⚠️ Partial news summary failed for {ticker}: {result}")
+        
+        if not partials:
+            raise RuntimeError(f"All {len(batches)} partial summaries failed")
+        
+        summary = await self._complete(ticker, self._build_reduce_prompt(ticker, partials))
+        return summary, len(partials) < len(batches)
+    
+    def _can_update_incrementally(self, state: Optional[dict]) -> bool:
+        """True si hay un resumen previo y aún no toca reconstruirlo completo."""
+        if not env_settings.news_summary_incremental or not state:
+            return False
+        age = datetime.now() - state["full_rebuild_at"]
+        return (
+            age < timedelta(hours=env_settings.news_summary_full_rebuild_hours)
+            and state["incremental_updates"] < env_settings.news_summary_max_incremental_updates
+        )
+    
+    def _remember_summary(
+        self, 
+        ticker: str, 
+        summary: str, 
+        fingerprints: frozenset[str], 
+        incremental: bool,
+        keep_age: bool = False
+    ):
+        """Guarda el último resumen por ticker (base para el modo incremental)."""
+        previous = self._summary_state.get(ticker)
+        if keep_age and previous:
+            full_rebuild_at = previous["full_rebuild_at"]
+            updates = previous["incremental_updates"]
+        elif incremental and previous:
+            full_rebuild_at = previous["full_rebuild_at"]
+            updates = previous["incremental_updates"] + 1
+        else:
+            full_rebuild_at = datetime.now()
+            updates = 0
         
-        for i, article in enumerate(articles[:15], 1):
+        self._summary_state[ticker] = {
+            "summary": summary,
+            "fingerprints": fingerprints,
+            "full_rebuild_at": full_rebuild_at,
+            "incremental_updates": updates
+        }
+    
+    @staticmethod
+    def _format_articles_for_prompt(articles: list[NewsArticle]) -> str:
+        """Texto de los artículos tal como se envía al LLM."""
+        news_text = ""
+        for i, article in enumerate(articles, 1):
             news_text += f"--- Article {i} ---\n"
             news_text += f"Title: {article.title}\n"
             news_text += f"Source: {article.publisher} ({article.source.value})\n"
@@ -487,26 +828,67 @@ class MultiSourceNewsFetcher:
             if content:
                 news_text += f"Content: {content[:500]}\n"
             news_text += "\n"
+        return news_text
+    
+    def _build_full_summary_prompt(self, ticker: str, articles: list[NewsArticle]) -> str:
+        news_text = f"News articles for {ticker}:\n\n" + self._format_articles_for_prompt(articles)
+        
+        return f"""Analiza las siguientes noticias sobre {ticker} y genera un resumen ejecutivo en español:
+
+{news_text}
+
+{_SUMMARY_FORMAT}
+"""
+    
+    def _build_map_prompt(self, ticker: str, articles: list[NewsArticle]) -> str:
+        news_text = self._format_articles_for_prompt(articles)
+        
+        return f"""Extrae en español los puntos clave de estas noticias sobre {ticker}:
+
+{news_text}
+
+Responde con viñetas breves: eventos, cifras relevantes y el tono de cada noticia.
+No agregues introducción ni conclusiones.
+"""
+    
+    def _build_reduce_prompt(self, ticker: str, partials: list[str]) -> str:
+        partials_text = "\n\n".join(
+            f"--- Resumen parcial {i} ---\n{partial}" for i, partial in enumerate(partials, 1)
+        )
         
-        prompt = f"""Analiza las siguientes noticias sobre {ticker} y genera un resumen ejecutivo en español:
+        return f"""Combina los siguientes resúmenes parciales de noticias sobre {ticker} en un resumen ejecutivo en español.
+Elimina repeticiones entre resúmenes y da prioridad a lo más reciente:
+
+{partials_text}
+
+{_SUMMARY_FORMAT}
+"""
+    
+    def _build_delta_summary_prompt(self, ticker: str, previous_summary: str, new_articles: list[NewsArticle]) -> str:
+        news_text = self._format_articles_for_prompt(new_articles)
+        
+        return f"""Este es el resumen ejecutivo actual de las noticias sobre {ticker}:
+
+{previous_summary}
+
+Han llegado las siguientes noticias nuevas:
 
 {news_text}
 
-Incluye:
+Actualiza el resumen ejecutivo en español incorporando las noticias nuevas.
+Mantén la información previa que siga siendo relevante y da prioridad a lo más reciente.
+
+{_SUMMARY_FORMAT}
+"""
+
+
+_SUMMARY_FORMAT = """Incluye:
 1. **Resumen General**: 5-6 oraciones con los puntos más importantes.
 2. **Eventos Clave**: Lista de eventos relevantes.
 3. **Sentimiento del Mercado**: Positivo, negativo o neutral.
 4. **Impacto Potencial**: Cómo podrían afectar el precio.
 
-Sé conciso y enfócate en información accionable.
-"""
-        
-        try:
-            response = await Settings.llm.acomplete(prompt)
-            return response.text
-        except Exception as e:
-            _logger.error(f"Error generating news summary: {e}")
-            return self._format_articles(articles)
+Sé conciso y enfócate en información accionable."""
 
 
 # Singleton
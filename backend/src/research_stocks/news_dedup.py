@@ -0,0 +1,223 @@
+"""
+Detección de noticias casi duplicadas con MinHash + LSH.
+Reemplaza la comparación de las primeras 8 palabras del título, que dejaba pasar
+notas sindicadas con pequeñas ediciones.
+"""
+
+import hashlib
+import random
+import re
+import time
+from collections import defaultdict
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"[a-z0-9áéíóúñü$%.]+")
+
+
+def _stable_hash(value: str) -> int:
+    """Hash de 32 bits estable entre procesos (a diferencia de hash())."""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=4).digest(), "big")
+
+
+def _shingles(text: str, size: int) -> set[str]:
+    """Genera shingles de `size` palabras sobre el texto normalizado."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _lsh_bands(num_perm: int, threshold: float) -> tuple[int, int]:
+    """
+    Elige (bandas, filas) tal que el umbral del LSH, (1/b)^(1/r),
+    quede lo más cerca posible del umbral de similitud sin superarlo
+    (preferimos candidatos de más antes que perder duplicados).
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+class MinHasher:
+    """Calcula firmas MinHash con permutaciones deterministas."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingles: set[str]) -> tuple[int, ...]:
+        if not shingles:
+            return ()
+        hashes = [_stable_hash(s) for s in shingles]
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+    @staticmethod
+    def similarity(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+        """Estimación de Jaccard entre dos firmas."""
+        if not sig_a or not sig_b:
+            return 0.0
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class _LSHIndex:
+    """Índice LSH por bandas con expiración de entradas (ventana móvil)."""
+
+    def __init__(self, bands: int, rows: int, window_seconds: float):
+        self.bands = bands
+        self.rows = rows
+        self.window_seconds = window_seconds
+        self._buckets: dict[tuple, set[str]] = defaultdict(set)
+        self._entries: dict[str, dict] = {}
+
+    def _band_keys(self, kind: str, sig: tuple[int, ...]) -> list[tuple]:
+        if not sig:
+            return []
+        return [
+            (kind, i, sig[i * self.rows:(i + 1) * self.rows])
+            for i in range(self.bands)
+        ]
+
+    def _keys_for(self, entry: dict) -> list[tuple]:
+        return self._band_keys("t", entry["title_sig"]) + self._band_keys("c", entry["text_sig"])
+
+    def expire(self, now: float):
+        cutoff = now - self.window_seconds
+        for article_id in [k for k, e in self._entries.items() if e["seen_at"] < cutoff]:
+            self.remove(article_id)
+
+    def remove(self, article_id: str):
+        entry = self._entries.pop(article_id, None)
+        if entry is None:
+            return
+        for key in self._keys_for(entry):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(article_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def add(self, article_id: str, entry: dict):
+        self.remove(article_id)
+        self._entries[article_id] = entry
+        for key in self._keys_for(entry):
+            self._buckets[key].add(article_id)
+
+    def candidates(self, entry: dict) -> set[str]:
+        found = set()
+        for key in self._keys_for(entry):
+            found |= self._buckets.get(key, set())
+        return found
+
+    def get(self, article_id: str) -> dict:
+        return self._entries[article_id]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class NewsDeduplicator:
+    """
+    Deduplicador de noticias basado en MinHash + LSH.
+
+    Mantiene un índice móvil por ticker, de modo que una nota sindicada que
+    llega en un refresh posterior también se descarta si ya vimos otra
+    versión de la misma historia dentro de la ventana.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.6,
+        num_perm: int = 64,
+        window_hours: float = 72,
+        title_shingle_size: int = 2,
+        text_shingle_size: int = 3,
+        max_content_chars: int = 1000
+    ):
+        self.threshold = threshold
+        self.window_seconds = window_hours * 3600
+        self.title_shingle_size = title_shingle_size
+        self.text_shingle_size = text_shingle_size
+        self.max_content_chars = max_content_chars
+        self._hasher = MinHasher(num_perm)
+        self._bands, self._rows = _lsh_bands(num_perm, threshold)
+        self._indexes: dict[str, _LSHIndex] = {}
+
+    @staticmethod
+    def article_id(article) -> str:
+        """Identidad del artículo: URL si existe, si no el título normalizado."""
+        return article.url or " ".join(article.title.lower().split())
+
+    def _index_for(self, ticker: str) -> _LSHIndex:
+        ticker = ticker.upper()
+        if ticker not in self._indexes:
+            self._indexes[ticker] = _LSHIndex(self._bands, self._rows, self.window_seconds)
+        return self._indexes[ticker]
+
+    def _build_entry(self, article, now: float) -> dict:
+        content = (article.content or article.summary or "")[:self.max_content_chars]
+        text_sig = ()
+        if content:
+            text_sig = self._hasher.signature(
+                _shingles(f"{article.title} {content}", self.text_shingle_size)
+            )
+        return {
+            "title_sig": self._hasher.signature(_shingles(article.title, self.title_shingle_size)),
+            "text_sig": text_sig,
+            "seen_at": now,
+        }
+
+    def _is_similar(self, a: dict, b: dict) -> bool:
+        if MinHasher.similarity(a["title_sig"], b["title_sig"]) >= self.threshold:
+            return True
+        return MinHasher.similarity(a["text_sig"], b["text_sig"]) >= self.threshold
+
+    def deduplicate(self, ticker: str, articles: list) -> list:
+        """
+        Filtra duplicados y casi duplicados, conservando la primera aparición.
+        Un artículo que ya estaba en el índice (misma URL) no se considera repetido.
+        """
+        index = self._index_for(ticker)
+        now = time.time()
+        index.expire(now)
+
+        unique = []
+        accepted_ids = set()
+
+        for article in articles:
+            article_id = self.article_id(article)
+            if article_id in accepted_ids:
+                continue
+
+            entry = self._build_entry(article, now)
+            duplicate = any(
+                candidate != article_id and self._is_similar(entry, index.get(candidate))
+                for candidate in index.candidates(entry)
+            )
+            if duplicate:
+                continue
+
+            index.add(article_id, entry)
+            accepted_ids.add(article_id)
+            unique.append(article)
+
+        return unique
+
+    def reset(self, ticker: str = None):
+        """Limpia el índice de un ticker (o de todos)."""
+        if ticker is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(ticker.upper(), None)
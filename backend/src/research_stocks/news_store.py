@@ -0,0 +1,93 @@
+"""
+Almacén persistente de noticias por ticker.
+Guarda los artículos ya vistos (por fingerprint) y un cursor (high-water mark)
+por proveedor, para que cada refresh pida solo lo publicado después del cursor.
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Optional
+
+from utils.logger import setup_logging
+
+_logger = setup_logging()
+
+
+class NewsStore:
+    """Store en disco (un JSON por ticker) con escrituras atómicas."""
+
+    def __init__(self, base_dir: str = "data/news", retention_days: int = 7, max_articles: int = 200):
+        self.base_dir = base_dir
+        self.retention = timedelta(days=retention_days)
+        self.max_articles = max_articles
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.base_dir, f"{ticker.upper()}.json")
+
+    def load(self, ticker: str) -> dict:
+        """
+        Retorna {'articles': {fingerprint: article_dict}, 'cursors': {source: iso_date}}.
+        Si no existe (o está corrupto) retorna un store vacío.
+        """
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return {"articles": {}, "cursors": {}}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            data.setdefault("articles", {})
+            data.setdefault("cursors", {})
+            return data
+        except (OSError, ValueError) as e:
+            _logger.warning(f"⚠️ Corrupted news store for {ticker}, starting fresh: {e}")
+            return {"articles": {}, "cursors": {}}
+
+    def save(self, ticker: str, data: dict):
+        """Persiste el store aplicando retención y límite de artículos."""
+        data = self._prune(data)
+        os.makedirs(self.base_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.base_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(ticker))
+        except OSError as e:
+            _logger.error(f"❌ Error saving news store for {ticker}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _prune(self, data: dict) -> dict:
+        """Descarta artículos fuera de la ventana de retención y recorta a max_articles."""
+        cutoff = datetime.now() - self.retention
+        kept = {}
+        for fingerprint, article in data["articles"].items():
+            published = parse_datetime(article.get("date"))
+            stored = parse_datetime(article.get("stored_at"))
+            reference = published or stored
+            if reference is None or reference >= cutoff:
+                kept[fingerprint] = article
+
+        if len(kept) > self.max_articles:
+            newest = sorted(
+                kept.items(),
+                key=lambda kv: kv[1].get("date") or kv[1].get("stored_at") or "",
+                reverse=True
+            )[:self.max_articles]
+            kept = dict(newest)
+
+        return {"articles": kept, "cursors": data["cursors"]}
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parsea un ISO string a datetime naive (hora local)."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
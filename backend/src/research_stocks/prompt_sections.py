@@ -0,0 +1,61 @@
+"""
+Renderizado de prompts por secciones memoizadas.
+Cada sección se identifica por un hash de los datos que usa, así que un cambio
+solo en las noticias vuelve a renderizar solo la sección de noticias.
+Las secciones que casi no cambian (empresa, fundamentales) van primero para
+que el inicio del prompt se repita entre llamadas.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class PromptSection:
+    name: str
+    key: str
+    text: str
+
+
+class PromptSectionCache:
+    """LRU de secciones renderizadas, indexado por nombre + hash de sus datos."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(name: str, inputs: dict) -> str:
+        payload = json.dumps([name, inputs], sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def render(self, name: str, renderer: Callable[..., str], **inputs) -> PromptSection:
+        """Retorna la sección cacheada o la renderiza con `renderer(**inputs)`."""
+        key = self.make_key(name, inputs)
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return PromptSection(name, key, text)
+            self.misses += 1
+
+        text = renderer(**inputs)
+        with self._lock:
+            self._entries[key] = text
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return PromptSection(name, key, text)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+prompt_sections = PromptSectionCache()
@@ -3,6 +3,8 @@ Prompts para análisis de instrumentos financieros.
 Diseñados para generar explicaciones comprensibles para usuarios no expertos.
 """
 
+from research_stocks.prompt_sections import PromptSection, prompt_sections
+
 
 def get_stock_analysis_prompt(
     ticker: str,
@@ -16,21 +18,74 @@ def get_stock_analysis_prompt(
     Genera el prompt para análisis de acciones.
     Incluye explicaciones detalladas para usuarios no expertos.
     """
-    
-    # Formatear datos técnicos
-    tv_summary = technical.get('summary', {})
-    tv_osc = technical.get('oscillators', {})
-    tv_ma = technical.get('moving_averages', {})
-    tv_vol = technical.get('volatility', {})
-    tv_trend = technical.get('trend', {})
-    tv_pivots = technical.get('pivot_points', {}).get('classic', {})
-    osc_ind = tv_osc.get('indicators', {})
-    ma_ind = tv_ma.get('indicators', {})
-    
-    # Formatear multi-timeframe
-    mtf_data = mtf.get('timeframes', {})
-    confluence = mtf.get('confluence', {})
-    
+    sections = get_stock_prompt_sections(ticker, info, technical, mtf, options, news)
+    return "".join(section.text for section in sections) + _STOCK_INSTRUCTIONS
+
+
+def get_stock_prompt_sections(
+    ticker: str,
+    info: dict,
+    technical: dict,
+    mtf: dict,
+    options: dict,
+    news: str
+) -> list[PromptSection]:
+    """
+    Secciones del prompt de acciones, cada una memoizada por el hash de sus datos.
+    Las secciones que casi no cambian van primero (el inicio del prompt se repite entre llamadas).
+    """
+    render = prompt_sections.render
+    return [
+        render("stock_header", _stock_header_section, ticker=ticker),
+        render("stock_company", _stock_company_section, info=_pick(info, _COMPANY_FIELDS)),
+        render("stock_fundamentals", _stock_fundamentals_section, info=_pick(info, _FUNDAMENTALS_FIELDS)),
+        render("stock_risk", _stock_risk_section, info=_pick(info, _RISK_FIELDS)),
+        render("stock_price", _stock_price_section, info=_pick(info, _PRICE_FIELDS)),
+        render("stock_valuation", _stock_valuation_section, info=_pick(info, _VALUATION_FIELDS)),
+        render("stock_analysts", _stock_analysts_section, info=_pick(info, _ANALYSTS_FIELDS)),
+        render("stock_technical", _stock_technical_section, technical=technical, price=info.get('price')),
+        render("stock_mtf", _stock_mtf_section, mtf=mtf),
+        render("stock_options", _stock_options_section, options=options),
+        render("stock_news", _stock_news_section, news=news),
+    ]
+
+
+def _pick(info: dict, fields: tuple) -> dict:
+    """Solo los campos que usa una sección: son los que determinan su clave."""
+    return {field: info[field] for field in fields if field in info}
+
+
+# Campos de `info` que usa cada sección
+_COMPANY_FIELDS = (
+    'country', 'description', 'employees', 'industry', 'name', 'sector',
+)
+_FUNDAMENTALS_FIELDS = (
+    'current_ratio', 'debt_to_equity', 'earnings_growth', 'earnings_quarterly_growth',
+    'eps_forward', 'eps_trailing', 'gross_margin', 'operating_margin', 'profit_margin',
+    'quick_ratio', 'revenue_growth', 'roa', 'roe', 'total_cash',
+    'total_cash_per_share', 'total_debt',
+)
+_RISK_FIELDS = (
+    'beta', 'held_percent_insiders', 'held_percent_institutions',
+    'short_percent_of_float',
+)
+_PRICE_FIELDS = (
+    'avg_volume', 'day_high', 'day_low', 'enterprise_value', 'fifty_two_week_change',
+    'fifty_two_week_high', 'fifty_two_week_low', 'market_cap', 'previous_close',
+    'price', 'volume',
+)
+_VALUATION_FIELDS = (
+    'dividend_rate', 'dividend_yield', 'ev_to_ebitda', 'payout_ratio', 'pe_forward',
+    'pe_trailing', 'peg_ratio', 'price_to_book', 'price_to_sales',
+)
+_ANALYSTS_FIELDS = (
+    'number_of_analyst_opinions', 'price', 'recommendation_key', 'target_high_price',
+    'target_low_price', 'target_mean_price',
+)
+
+
+def _stock_header_section(ticker: str) -> str:
+    """Rol del asesor y audiencia."""
     return f"""
 Eres un asesor financiero experto que explica conceptos de inversión de manera clara y sencilla.
 Tu audiencia son personas que NO son expertas en finanzas, así que debes:
@@ -41,7 +96,12 @@ Tu audiencia son personas que NO son expertas en finanzas, así que debes:
 
 Analiza la siguiente información de **{ticker}** y genera un reporte de inversión completo.
 
-═══════════════════════════════════════════════════════════════════════════════
+"""
+
+
+def _stock_company_section(info: dict) -> str:
+    """Información general de la empresa."""
+    return f"""═══════════════════════════════════════════════════════════════════════════════
 📊 INFORMACIÓN DE LA EMPRESA
 ═══════════════════════════════════════════════════════════════════════════════
 
@@ -52,32 +112,12 @@ Analiza la siguiente información de **{ticker}** y genera un reporte de inversi
 • Empleados: {_format_number(info.get('employees'))}
 • Descripción: {info.get('description', 'N/A')[:600]}...
 
-═══════════════════════════════════════════════════════════════════════════════
-💰 PRECIO Y MERCADO
-═══════════════════════════════════════════════════════════════════════════════
-
-PRECIO ACTUAL:
-• Precio: ${info.get('price', 'N/A')}
-• Cierre anterior: ${info.get('previous_close', 'N/A')}
-• Rango del día: ${info.get('day_low', 'N/A')} - ${info.get('day_high', 'N/A')}
-
-VOLUMEN (cantidad de acciones que se compraron/vendieron hoy):
-• Volumen hoy: {_format_number(info.get('volume'))}
-• Volumen promedio: {_format_number(info.get('avg_volume'))}
-• ¿Volumen inusual?: {"SÍ ⚠️" if info.get('volume') and info.get('avg_volume') and info.get('volume') > info.get('avg_volume') * 1.5 else "Normal"}
-
-TAMAÑO DE LA EMPRESA:
-• Market Cap (valor total de la empresa): {_format_currency(info.get('market_cap'))}
-  → {_get_market_cap_category(info.get('market_cap'))}
-• Enterprise Value: {_format_currency(info.get('enterprise_value'))}
+"""
 
-RANGO DE 52 SEMANAS (último año):
-• Máximo del año: ${info.get('fifty_two_week_high', 'N/A')}
-• Mínimo del año: ${info.get('fifty_two_week_low', 'N/A')}
-• Posición actual: {_get_52w_position(info.get('price'), info.get('fifty_two_week_low'), info.get('fifty_two_week_high'))}
-• Cambio en 52 semanas: {_format_percent(info.get('fifty_two_week_change'))}
 
-═══════════════════════════════════════════════════════════════════════════════
+def _stock_fundamentals_section(info: dict) -> str:
+    """Rentabilidad, deuda y crecimiento (cambian con los reportes, no con el precio)."""
+    return f"""═══════════════════════════════════════════════════════════════════════════════
 📈 MÉTRICAS DE RENTABILIDAD
 (¿Qué tan buena es la empresa generando dinero?)
 ═══════════════════════════════════════════════════════════════════════════════
@@ -105,6 +145,91 @@ RETORNO SOBRE CAPITAL:
   → Por cada $100 en activos, genera ${_margin_to_dollars(info.get('roa'))} de ganancia
 
 ═══════════════════════════════════════════════════════════════════════════════
+💳 DEUDA Y SALUD FINANCIERA
+(¿La empresa tiene sus finanzas en orden?)
+═══════════════════════════════════════════════════════════════════════════════
+
+• Deuda Total: {_format_currency(info.get('total_debt'))}
+• Efectivo Total: {_format_currency(info.get('total_cash'))}
+• Efectivo por Acción: ${info.get('total_cash_per_share', 'N/A')}
+
+RATIOS DE DEUDA:
+• Debt/Equity (Deuda/Capital): {_format_number(info.get('debt_to_equity'))}
+  → Por cada $1 de los accionistas, la empresa debe ${_format_number(info.get('debt_to_equity'))}
+  → {_evaluate_debt_equity(info.get('debt_to_equity'))}
+
+• Current Ratio (Liquidez): {_format_number(info.get('current_ratio'))}
+  → Capacidad de pagar deudas a corto plazo. Mayor a 1 = puede pagar sus deudas
+  → {_evaluate_current_ratio(info.get('current_ratio'))}
+
+• Quick Ratio: {_format_number(info.get('quick_ratio'))}
+  → Similar pero sin contar inventario
+
+═══════════════════════════════════════════════════════════════════════════════
+📊 CRECIMIENTO
+(¿La empresa está creciendo o decreciendo?)
+═══════════════════════════════════════════════════════════════════════════════
+
+• Crecimiento de Ganancias: {_format_percent(info.get('earnings_growth'))}
+  → {_evaluate_growth(info.get('earnings_growth'), 'earnings')}
+• Crecimiento de Ingresos: {_format_percent(info.get('revenue_growth'))}
+  → {_evaluate_growth(info.get('revenue_growth'), 'revenue')}
+• Crecimiento Trimestral: {_format_percent(info.get('earnings_quarterly_growth'))}
+
+"""
+
+
+def _stock_risk_section(info: dict) -> str:
+    """Beta, short interest y tenencia."""
+    return f"""═══════════════════════════════════════════════════════════════════════════════
+📊 RIESGO
+═══════════════════════════════════════════════════════════════════════════════
+
+• Beta: {info.get('beta', 'N/A')}
+  → {_explain_beta(info.get('beta'))}
+
+• Short Interest (% de acciones apostando a la baja): {_format_percent(info.get('short_percent_of_float'))}
+  → {_evaluate_short_interest(info.get('short_percent_of_float'))}
+
+• % en manos de instituciones: {_format_percent(info.get('held_percent_institutions'))}
+• % en manos de insiders: {_format_percent(info.get('held_percent_insiders'))}
+
+"""
+
+
+def _stock_price_section(info: dict) -> str:
+    """Precio, volumen, tamaño y rango de 52 semanas."""
+    return f"""═══════════════════════════════════════════════════════════════════════════════
+💰 PRECIO Y MERCADO
+═══════════════════════════════════════════════════════════════════════════════
+
+PRECIO ACTUAL:
+• Precio: ${info.get('price', 'N/A')}
+• Cierre anterior: ${info.get('previous_close', 'N/A')}
+• Rango del día: ${info.get('day_low', 'N/A')} - ${info.get('day_high', 'N/A')}
+
+VOLUMEN (cantidad de acciones que se compraron/vendieron hoy):
+• Volumen hoy: {_format_number(info.get('volume'))}
+• Volumen promedio: {_format_number(info.get('avg_volume'))}
+• ¿Volumen inusual?: {"SÍ ⚠️" if info.get('volume') and info.get('avg_volume') and info.get('volume') > info.get('avg_volume') * 1.5 else "Normal"}
+
+TAMAÑO DE LA EMPRESA:
+• Market Cap (valor total de la empresa): {_format_currency(info.get('market_cap'))}
+  → {_get_market_cap_category(info.get('market_cap'))}
+• Enterprise Value: {_format_currency(info.get('enterprise_value'))}
+
+RANGO DE 52 SEMANAS (último año):
+• Máximo del año: ${info.get('fifty_two_week_high', 'N/A')}
+• Mínimo del año: ${info.get('fifty_two_week_low', 'N/A')}
+• Posición actual: {_get_52w_position(info.get('price'), info.get('fifty_two_week_low'), info.get('fifty_two_week_high'))}
+• Cambio en 52 semanas: {_format_percent(info.get('fifty_two_week_change'))}
+
+"""
+
+
+def _stock_valuation_section(info: dict) -> str:
+    """Ratios de valuación y dividendos (dependen del precio)."""
+    return f"""═══════════════════════════════════════════════════════════════════════════════
 🏷️ VALUACIÓN
 (¿El precio de la acción es justo, caro o barato?)
 ═══════════════════════════════════════════════════════════════════════════════
@@ -132,27 +257,6 @@ RATIOS DE PRECIO:
 • P/S (Price to Sales): {_format_number(info.get('price_to_sales'))}
   → Precio vs ventas totales
 
-═══════════════════════════════════════════════════════════════════════════════
-💳 DEUDA Y SALUD FINANCIERA
-(¿La empresa tiene sus finanzas en orden?)
-═══════════════════════════════════════════════════════════════════════════════
-
-• Deuda Total: {_format_currency(info.get('total_debt'))}
-• Efectivo Total: {_format_currency(info.get('total_cash'))}
-• Efectivo por Acción: ${info.get('total_cash_per_share', 'N/A')}
-
-RATIOS DE DEUDA:
-• Debt/Equity (Deuda/Capital): {_format_number(info.get('debt_to_equity'))}
-  → Por cada $1 de los accionistas, la empresa debe ${_format_number(info.get('debt_to_equity'))}
-  → {_evaluate_debt_equity(info.get('debt_to_equity'))}
-
-• Current Ratio (Liquidez): {_format_number(info.get('current_ratio'))}
-  → Capacidad de pagar deudas a corto plazo. Mayor a 1 = puede pagar sus deudas
-  → {_evaluate_current_ratio(info.get('current_ratio'))}
-
-• Quick Ratio: {_format_number(info.get('quick_ratio'))}
-  → Similar pero sin contar inventario
-
 ═══════════════════════════════════════════════════════════════════════════════
 💵 DIVIDENDOS
 (¿La empresa te paga por tener sus acciones?)
@@ -165,18 +269,12 @@ RATIOS DE DEUDA:
 • Payout Ratio: {_format_percent(info.get('payout_ratio'))}
   → {_evaluate_payout_ratio(info.get('payout_ratio'))}
 
-═══════════════════════════════════════════════════════════════════════════════
-📊 CRECIMIENTO
-(¿La empresa está creciendo o decreciendo?)
-═══════════════════════════════════════════════════════════════════════════════
+"""
 
-• Crecimiento de Ganancias: {_format_percent(info.get('earnings_growth'))}
-  → {_evaluate_growth(info.get('earnings_growth'), 'earnings')}
-• Crecimiento de Ingresos: {_format_percent(info.get('revenue_growth'))}
-  → {_evaluate_growth(info.get('revenue_growth'), 'revenue')}
-• Crecimiento Trimestral: {_format_percent(info.get('earnings_quarterly_growth'))}
 
-═══════════════════════════════════════════════════════════════════════════════
+def _stock_analysts_section(info: dict) -> str:
+    """Consenso y precios objetivo de analistas."""
+    return f"""═══════════════════════════════════════════════════════════════════════════════
 🎯 RECOMENDACIONES DE ANALISTAS PROFESIONALES
 ═══════════════════════════════════════════════════════════════════════════════
 
@@ -189,7 +287,21 @@ PRECIOS OBJETIVO:
 • Precio objetivo más bajo: ${info.get('target_low_price', 'N/A')}
 • Potencial de subida/bajada: {_calculate_upside(info.get('price'), info.get('target_mean_price'))}
 
-═══════════════════════════════════════════════════════════════════════════════
+"""
+
+
+def _stock_technical_section(technical: dict, price) -> str:
+    """Señales de TradingView; `price` se usa para la posición en Bollinger."""
+    tv_summary = technical.get('summary', {})
+    tv_osc = technical.get('oscillators', {})
+    tv_ma = technical.get('moving_averages', {})
+    tv_vol = technical.get('volatility', {})
+    tv_trend = technical.get('trend', {})
+    tv_pivots = technical.get('pivot_points', {}).get('classic', {})
+    osc_ind = tv_osc.get('indicators', {})
+    ma_ind = tv_ma.get('indicators', {})
+    
+    return f"""═══════════════════════════════════════════════════════════════════════════════
 📉 ANÁLISIS TÉCNICO (Señales de TradingView)
 (¿Qué dicen los gráficos sobre el momento de comprar o vender?)
 ═══════════════════════════════════════════════════════════════════════════════
@@ -262,7 +374,7 @@ BANDAS DE BOLLINGER:
 • Banda Superior: ${_format_number(tv_vol.get('bb_upper'))}
 • Banda Media: ${_format_number(tv_vol.get('bb_middle'))}
 • Banda Inferior: ${_format_number(tv_vol.get('bb_lower'))}
-• Posición del precio: {_get_bb_position(info.get('price'), tv_vol.get('bb_lower'), tv_vol.get('bb_middle'), tv_vol.get('bb_upper'))}
+• Posición del precio: {_get_bb_position(price, tv_vol.get('bb_lower'), tv_vol.get('bb_middle'), tv_vol.get('bb_upper'))}
 
 📍 NIVELES DE SOPORTE Y RESISTENCIA (Pivot Points):
 (Precios donde el movimiento podría detenerse o rebotar)
@@ -279,7 +391,15 @@ SOPORTES (pisos de precio):
 • S2: ${_format_number(tv_pivots.get('s2'))}
 • S3: ${_format_number(tv_pivots.get('s3'))}
 
-═══════════════════════════════════════════════════════════════════════════════
+"""
+
+
+def _stock_mtf_section(mtf: dict) -> str:
+    """Recomendaciones por timeframe y confluencia."""
+    mtf_data = mtf.get('timeframes', {})
+    confluence = mtf.get('confluence', {})
+    
+    return f"""═══════════════════════════════════════════════════════════════════════════════
 ⏰ ANÁLISIS MULTI-TIMEFRAME
 (¿Las señales coinciden en diferentes períodos de tiempo?)
 ═══════════════════════════════════════════════════════════════════════════════
@@ -295,7 +415,12 @@ CONFLUENCIA:
 • Tendencia general: {confluence.get('overall', 'N/A')}
 → {_explain_confluence(confluence)}
 
-═══════════════════════════════════════════════════════════════════════════════
+"""
+
+
+def _stock_options_section(options: dict) -> str:
+    """Volatilidad implícita y actividad inusual."""
+    return f"""═══════════════════════════════════════════════════════════════════════════════
 📋 OPCIONES Y VOLATILIDAD IMPLÍCITA
 (¿Qué esperan los traders profesionales?)
 ═══════════════════════════════════════════════════════════════════════════════
@@ -309,26 +434,21 @@ CONFLUENCIA:
 • Movimientos inusuales principales:
 {_format_unusual_moves(options.get('top_unusual_moves', []))}
 
-═══════════════════════════════════════════════════════════════════════════════
-📰 NOTICIAS RECIENTES
-═══════════════════════════════════════════════════════════════════════════════
+"""
 
-{news}
 
-═══════════════════════════════════════════════════════════════════════════════
-📊 RIESGO
+def _stock_news_section(news) -> str:
+    """Noticias recientes."""
+    return f"""═══════════════════════════════════════════════════════════════════════════════
+📰 NOTICIAS RECIENTES
 ═══════════════════════════════════════════════════════════════════════════════
 
-• Beta: {info.get('beta', 'N/A')}
-  → {_explain_beta(info.get('beta'))}
+{news}
 
-• Short Interest (% de acciones apostando a la baja): {_format_percent(info.get('short_percent_of_float'))}
-  → {_evaluate_short_interest(info.get('short_percent_of_float'))}
+"""
 
-• % en manos de instituciones: {_format_percent(info.get('held_percent_institutions'))}
-• % en manos de insiders: {_format_percent(info.get('held_percent_insiders'))}
 
-═══════════════════════════════════════════════════════════════════════════════
+_STOCK_INSTRUCTIONS = """═══════════════════════════════════════════════════════════════════════════════
 
 INSTRUCCIONES PARA EL ANÁLISIS:
 
@@ -576,6 +696,349 @@ Incluye que esto no es asesoría financiera profesional.
 """
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# PROMPTS COMPACTOS
+# Misma información y mismo formato de reporte, pero sin separadores decorativos,
+# sin explicaciones repetidas, sin secciones vacías (N/A) y con un presupuesto
+# de tokens por sección. Las noticias entran como resumen, no como artículos.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Peso de cada sección dentro del presupuesto total de tokens
+_COMPACT_SECTION_WEIGHTS = {
+    "company": 0.08,
+    "price": 0.08,
+    "profitability": 0.05,
+    "valuation": 0.05,
+    "debt": 0.05,
+    "dividends": 0.04,
+    "growth": 0.04,
+    "analysts": 0.05,
+    "holdings": 0.10,
+    "sectors": 0.06,
+    "technical": 0.12,
+    "mtf": 0.05,
+    "options": 0.06,
+    "news": 0.25,
+    "risk": 0.05,
+}
+
+_COMPACT_STOCK_INSTRUCTIONS = """Genera el reporte en markdown con estas secciones:
+## 📋 RESUMEN EJECUTIVO (recomendación COMPRAR 🟢 / MANTENER 🟡 / VENDER 🔴, por qué en 2-3 oraciones, riesgo BAJO/MEDIO/ALTO)
+## 💡 ¿QUÉ HACE ESTA EMPRESA? (negocio, cómo gana dinero, industria)
+## 📊 ANÁLISIS FUNDAMENTAL (### Lo bueno ✅, ### Lo preocupante ⚠️, ### Valuación: ¿Está cara o barata?)
+## 📈 ANÁLISIS TÉCNICO (### Tendencia actual, ### Señales importantes, ### Niveles clave de precio)
+## 🎯 CATALIZADORES PRÓXIMOS
+## ⚠️ RIESGOS PRINCIPALES (3 riesgos explicados de forma simple)
+## 💰 MI RECOMENDACIÓN DETALLADA (veredicto, precio objetivo y potencial, perfil de inversor, horizonte, % del portafolio)
+## 📝 NOTA IMPORTANTE (disclaimer: no es asesoría financiera profesional)"""
+
+_COMPACT_ETF_INSTRUCTIONS = """Genera el reporte en markdown con estas secciones:
+## 📋 RESUMEN EJECUTIVO (recomendación COMPRAR 🟢 / MANTENER 🟡 / VENDER 🔴, qué es este ETF, nivel de riesgo)
+## 🎯 ¿PARA QUÉ SIRVE ESTE ETF? (exposición, mercado/sector/región)
+## ✅ VENTAJAS DE ESTE ETF (puntos positivos, costos, diversificación)
+## ⚠️ DESVENTAJAS Y RIESGOS (concentración, riesgos específicos)
+## 📊 ANÁLISIS TÉCNICO RESUMIDO
+## 💰 RECOMENDACIÓN FINAL (veredicto, perfil de inversor, alternativas, horizonte)
+## 📝 DISCLAIMER (no es asesoría financiera profesional)"""
+
+
+def get_stock_analysis_prompt_compact(
+    ticker: str,
+    info: dict,
+    technical: dict,
+    mtf: dict,
+    options: dict,
+    news,
+    token_budget: int = 3000
+) -> str:
+    """
+    Variante compacta de get_stock_analysis_prompt.
+    `token_budget` limita (aproximadamente) el tamaño de los datos del prompt.
+    """
+    price = info.get('price')
+    sections = [
+        ("company", "Empresa", [
+            ("Nombre", info.get('name')),
+            ("Sector", info.get('sector')),
+            ("Industria", info.get('industry')),
+            ("País", info.get('country')),
+            ("Descripción", (info.get('description') or '')[:400]),
+        ]),
+        ("price", "Precio y mercado", [
+            ("Precio", _money(price)),
+            ("Cierre anterior", _money(info.get('previous_close'))),
+            ("Rango del día", _range(info.get('day_low'), info.get('day_high'))),
+            ("Volumen / promedio", _pair(_format_number(info.get('volume')), _format_number(info.get('avg_volume')))),
+            ("Market Cap", _with_hint(_format_currency(info.get('market_cap')), _get_market_cap_category(info.get('market_cap')))),
+            ("Rango 52 semanas", _range(info.get('fifty_two_week_low'), info.get('fifty_two_week_high'))),
+            ("Posición 52 semanas", _get_52w_position(price, info.get('fifty_two_week_low'), info.get('fifty_two_week_high'))),
+            ("Cambio 52 semanas", _format_percent(info.get('fifty_two_week_change'))),
+        ]),
+        ("profitability", "Rentabilidad", [
+            ("EPS actual / esperado", _pair(_money(info.get('eps_trailing')), _money(info.get('eps_forward')))),
+            ("Margen bruto", _format_percent(info.get('gross_margin'))),
+            ("Margen operativo", _format_percent(info.get('operating_margin'))),
+            ("Margen neto", _format_percent(info.get('profit_margin'))),
+            ("ROE", _with_hint(_format_percent(info.get('roe')), _evaluate_roe(info.get('roe')))),
+            ("ROA", _format_percent(info.get('roa'))),
+        ]),
+        ("valuation", "Valuación", [
+            ("P/E", _with_hint(_format_number(info.get('pe_trailing')), _evaluate_pe(info.get('pe_trailing')))),
+            ("P/E forward", _format_number(info.get('pe_forward'))),
+            ("PEG", _with_hint(_format_number(info.get('peg_ratio')), _evaluate_peg(info.get('peg_ratio')))),
+            ("P/B", _with_hint(_format_number(info.get('price_to_book')), _evaluate_pb(info.get('price_to_book')))),
+            ("EV/EBITDA", _with_hint(_format_number(info.get('ev_to_ebitda')), _evaluate_ev_ebitda(info.get('ev_to_ebitda')))),
+            ("P/S", _format_number(info.get('price_to_sales'))),
+        ]),
+        ("debt", "Deuda y liquidez", [
+            ("Deuda total", _format_currency(info.get('total_debt'))),
+            ("Efectivo total", _format_currency(info.get('total_cash'))),
+            ("Debt/Equity", _with_hint(_format_number(info.get('debt_to_equity')), _evaluate_debt_equity(info.get('debt_to_equity')))),
+            ("Current Ratio", _with_hint(_format_number(info.get('current_ratio')), _evaluate_current_ratio(info.get('current_ratio')))),
+            ("Quick Ratio", _format_number(info.get('quick_ratio'))),
+        ]),
+        ("dividends", "Dividendos", [
+            ("Dividend Yield", _format_percent(info.get('dividend_yield'))),
+            ("Dividendo anual", _money(info.get('dividend_rate'))),
+            ("Payout Ratio", _with_hint(_format_percent(info.get('payout_ratio')), _evaluate_payout_ratio(info.get('payout_ratio')))),
+        ]),
+        ("growth", "Crecimiento", [
+            ("Ganancias", _with_hint(_format_percent(info.get('earnings_growth')), _evaluate_growth(info.get('earnings_growth'), 'earnings'))),
+            ("Ingresos", _with_hint(_format_percent(info.get('revenue_growth')), _evaluate_growth(info.get('revenue_growth'), 'revenue'))),
+            ("Trimestral", _format_percent(info.get('earnings_quarterly_growth'))),
+        ]),
+        ("analysts", "Analistas", [
+            ("Consenso", (info.get('recommendation_key') or '').upper()),
+            ("Número de analistas", info.get('number_of_analyst_opinions')),
+            ("Objetivo promedio (bajo-alto)", _with_hint(
+                _money(info.get('target_mean_price')),
+                _range(info.get('target_low_price'), info.get('target_high_price'))
+            )),
+            ("Potencial", _calculate_upside(price, info.get('target_mean_price'))),
+        ]),
+        ("technical", "Análisis técnico (TradingView)", _compact_technical_rows(technical, price)),
+        ("mtf", "Multi-timeframe", _compact_mtf_rows(mtf)),
+        ("options", "Opciones", _compact_options_rows(options)),
+        ("news", "Noticias (resumen)", [("", _news_summary_text(news))]),
+        ("risk", "Riesgo", [
+            ("Beta", _with_hint(info.get('beta'), _explain_beta(info.get('beta')))),
+            ("Short interest", _with_hint(
+                _format_percent(info.get('short_percent_of_float')),
+                _evaluate_short_interest(info.get('short_percent_of_float'))
+            )),
+            ("Instituciones / insiders", _pair(
+                _format_percent(info.get('held_percent_institutions')),
+                _format_percent(info.get('held_percent_insiders'))
+            )),
+        ]),
+    ]
+
+    return f"""Eres un asesor financiero experto. Explica de forma clara para personas NO expertas: define cada término técnico al usarlo y sé directo sobre los riesgos. Usa emojis.
+
+Datos de **{ticker}**:
+
+{_render_compact_sections(sections, token_budget)}
+
+{_COMPACT_STOCK_INSTRUCTIONS}
+"""
+
+
+def get_etf_analysis_prompt_compact(
+    ticker: str,
+    info: dict,
+    holdings: dict,
+    sectors: dict,
+    technical: dict,
+    mtf: dict,
+    options: dict,
+    news,
+    token_budget: int = 3000
+) -> str:
+    """Variante compacta de get_etf_analysis_prompt."""
+    price = info.get('price')
+    holdings_list = holdings.get('holdings', [])
+    sectors_dict = sectors.get('sectors', {})
+    concentration = _calculate_top10_concentration(holdings_list)
+
+    sections = [
+        ("company", "ETF", [
+            ("Nombre", info.get('name')),
+            ("Categoría", info.get('category')),
+            ("Familia", info.get('fund_family')),
+            ("Descripción", (info.get('description') or '')[:400]),
+        ]),
+        ("price", "Precio y costos", [
+            ("Precio / NAV", _pair(_money(price), _money(info.get('nav_price')))),
+            ("Rango 52 semanas", _range(info.get('fifty_two_week_low'), info.get('fifty_two_week_high'))),
+            ("Expense Ratio", _with_hint(_format_percent(info.get('expense_ratio')), _evaluate_expense_ratio(info.get('expense_ratio')))),
+            ("Total Assets", _with_hint(_format_currency(info.get('total_assets')), _evaluate_etf_size(info.get('total_assets')))),
+        ]),
+        ("growth", "Rendimientos", [
+            ("YTD", _format_percent(info.get('ytd_return'))),
+            ("3 meses", _format_percent(info.get('trailing_three_month_returns'))),
+            ("3 años (anual)", _format_percent(info.get('three_year_return'))),
+            ("5 años (anual)", _format_percent(info.get('five_year_return'))),
+            ("52 semanas", _format_percent(info.get('fifty_two_week_change_percent'))),
+        ]),
+        ("dividends", "Dividendos", [
+            ("Dividend Yield", _format_percent(info.get('dividend_yield'))),
+        ]),
+        ("holdings", f"Top holdings (top 10 = {concentration:.1f}%, {_evaluate_concentration(concentration)})" if holdings_list else "Top holdings", [
+            (h.get('symbol', 'N/A'), f"{h.get('name', 'N/A')} ({h.get('weight', 0):.2f}%)")
+            for h in holdings_list[:10]
+        ]),
+        ("sectors", "Sectores", [
+            (sector, f"{weight:.2f}%")
+            for sector, weight in sorted(sectors_dict.items(), key=lambda x: x[1], reverse=True)
+        ]),
+        ("technical", "Análisis técnico (TradingView)", _compact_technical_rows(technical, price) + [
+            ("Precio vs SMA 50", _above_below(price, info.get('fifty_day_average'))),
+            ("Precio vs SMA 200", _above_below(price, info.get('two_hundred_day_average'))),
+        ]),
+        ("mtf", "Multi-timeframe", _compact_mtf_rows(mtf)),
+        ("options", "Opciones", _compact_options_rows(options)),
+        ("news", "Noticias (resumen)", [("", _news_summary_text(news))]),
+        ("risk", "Riesgo", [
+            ("Beta", _with_hint(info.get('beta'), _explain_beta(info.get('beta')))),
+        ]),
+    ]
+
+    return f"""Eres un asesor financiero experto en ETFs. Explica de forma clara para personas NO expertas. Usa emojis.
+
+Datos del ETF **{ticker}**:
+
+{_render_compact_sections(sections, token_budget)}
+
+{_COMPACT_ETF_INSTRUCTIONS}
+"""
+
+
+def _compact_technical_rows(technical: dict, price) -> list:
+    summary = technical.get('summary', {})
+    osc = technical.get('oscillators', {})
+    ma = technical.get('moving_averages', {})
+    osc_ind = osc.get('indicators', {})
+    ma_ind = ma.get('indicators', {})
+    ind = technical.get('indicators', {})
+
+    signals = None
+    if summary:
+        signals = f"{summary.get('buy_signals', 0)} compra / {summary.get('sell_signals', 0)} venta / {summary.get('neutral_signals', 0)} neutral"
+
+    return [
+        ("Resumen", summary.get('recommendation')),
+        ("Señales", signals),
+        ("Osciladores", osc.get('recommendation')),
+        ("RSI", _with_hint(_format_number(osc_ind.get('rsi')), _evaluate_rsi(osc_ind.get('rsi')))),
+        ("MACD / señal", _with_hint(
+            _pair(_format_number(osc_ind.get('macd')), _format_number(osc_ind.get('macd_signal'))),
+            _evaluate_macd(osc_ind.get('macd'), osc_ind.get('macd_signal'))
+        )),
+        ("Stochastic %K", _with_hint(_format_number(osc_ind.get('stoch_k')), _evaluate_stochastic(osc_ind.get('stoch_k')))),
+        ("ADX", _with_hint(_format_number(osc_ind.get('adx')), _evaluate_adx(osc_ind.get('adx')))),
+        ("CCI", _format_number(osc_ind.get('cci'))),
+        ("Medias móviles", ma.get('recommendation')),
+        ("EMA 20 / SMA 50 / SMA 200", _pair(
+            _money(ma_ind.get('ema_20')), _money(ma_ind.get('sma_50')), _money(ma_ind.get('sma_200'))
+        )),
+        ("ATR", _money(ind.get('atr'))),
+        ("Bollinger (inf / media / sup)", _with_hint(
+            _pair(_money(ind.get('bb_lower')), _money(ind.get('bb_middle')), _money(ind.get('bb_upper'))),
+            _get_bb_position(price, ind.get('bb_lower'), ind.get('bb_middle'), ind.get('bb_upper'))
+        )),
+        ("Soportes S1 / S2", _pair(_money(ind.get('pivot_classic_s1')), _money(ind.get('pivot_classic_s2')))),
+        ("Resistencias R1 / R2", _pair(_money(ind.get('pivot_classic_r1')), _money(ind.get('pivot_classic_r2')))),
+    ]
+
+
+def _compact_mtf_rows(mtf: dict) -> list:
+    timeframes = mtf.get('timeframes', {})
+    rows = []
+    for key, label in (('1h', '1 hora'), ('4h', '4 horas'), ('1d', '1 día'), ('1w', '1 semana')):
+        tf = timeframes.get(key, {})
+        rows.append((label, _with_hint(tf.get('recommendation'), f"RSI {_format_number(tf.get('rsi'))}" if tf.get('rsi') is not None else "")))
+    return rows
+
+
+def _compact_options_rows(options: dict) -> list:
+    moves = options.get('top_unusual_moves', [])
+    return [
+        ("IV ATM", _with_hint(options.get('atm_iv_avg'), _explain_iv(options.get('atm_iv_avg')))),
+        ("Actividad inusual", options.get('unusual_activity_count') or None),
+        ("Movimientos", "; ".join(
+            f"{m.get('type')} ${m.get('strike')} vol {m.get('volume', 0):,} ratio {m.get('ratio')}x"
+            for m in moves[:3]
+        )),
+    ]
+
+
+def _news_summary_text(news) -> str:
+    """Usa el resumen de noticias en lugar de los artículos completos."""
+    if isinstance(news, dict):
+        return news.get('summary', '') or ''
+    return news or ''
+
+
+def _is_missing(value) -> bool:
+    if value is None:
+        return True
+    text = str(value).strip()
+    return text in ("", "N/A", "$N/A", "N/A / N/A") or text.startswith("N/A (")
+
+
+def _money(value) -> str:
+    return "N/A" if value is None else f"${_format_number(value) if isinstance(value, (int, float)) else value}"
+
+
+def _range(low, high) -> str:
+    if low is None or high is None:
+        return "N/A"
+    return f"{_money(low)} - {_money(high)}"
+
+
+def _pair(*values) -> str:
+    """Une valores con ' / '; si todos faltan retorna N/A."""
+    if all(_is_missing(v) for v in values):
+        return "N/A"
+    return " / ".join(str(v) for v in values)
+
+
+def _with_hint(value, hint) -> str:
+    if _is_missing(value):
+        return "N/A"
+    return f"{value} ({hint})" if hint else str(value)
+
+
+def _above_below(price, average) -> str:
+    if not price or not average:
+        return "N/A"
+    return "Por encima ✅" if price > average else "Por debajo ⚠️"
+
+
+def _render_compact_sections(sections: list, token_budget: int) -> str:
+    """Renderiza las secciones omitiendo las vacías y recortando cada una a su presupuesto."""
+    rendered = []
+    for key, title, rows in sections:
+        lines = [
+            f"- {label}: {value}" if label else str(value)
+            for label, value in rows
+            if not _is_missing(value)
+        ]
+        if not lines:
+            continue
+
+        budget_chars = int(token_budget * _COMPACT_SECTION_WEIGHTS.get(key, 0.05)) * 4
+        body = "\n".join(lines)
+        while len(lines) > 1 and len(body) > budget_chars:
+            lines.pop()
+            body = "\n".join(lines)
+        if len(body) > budget_chars:
+            body = body[:budget_chars].rsplit(" ", 1)[0] + "…"
+
+        rendered.append(f"### {title}\n{body}")
+    return "\n\n".join(rendered)
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # FUNCIONES AUXILIARES DE FORMATEO
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -286,6 +286,22 @@ class AnalysisResponse(BaseModel):
     instrument_type: str  # "STOCK" o "ETF"
     analysis: str
     raw_data: Optional[dict] = None
+    stale: bool = False  # True si el análisis pasó el soft TTL y se está regenerando
+    analysis_age_seconds: Optional[float] = None
+    revalidating: bool = False
+
+
+class AnalysisJobResponse(BaseModel):
+    """Estado de un job de análisis asíncrono."""
+    job_id: str
+    ticker: str
+    status: str  # "queued", "running", "completed" o "failed"
+    deduplicated: bool = False  # True si el submit se unió a un job ya en curso
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[AnalysisResponse] = None
 
 # ===== TRADINGVIEW SCHEMAS =====
 
@@ -0,0 +1,259 @@
+"""
+Secciones de datos de un instrumento con TTL propio.
+Cada sección (fundamentales, precio, técnico, opciones, noticias...) guarda su
+última actualización y se refresca por separado con su método `refresh_<sección>`,
+en vez de reconstruir todo el instrumento. Solo el fetch bloqueante corre en un
+thread: los atributos y el estado pending se modifican siempre desde el event loop.
+
+En la carga inicial cada sección puede tener un deadline: las que no llegan a
+tiempo quedan `pending` con un placeholder y se completan en el mismo objeto
+(que ya está en el cache) cuando terminan.
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable, Optional
+
+from research_stocks.cadence import cadence_reasons, ttl_multiplier
+from settings.env_config import env_settings
+from utils.logger import log_fields, setup_logging
+
+_logger = setup_logging()
+
+# TTL por sección: cuánto tiempo se considera fresca antes de volver a pedirla
+SECTION_TTLS: dict[str, timedelta] = {
+    "fundamentals": timedelta(days=1),
+    "holdings": timedelta(days=1),
+    "sectors": timedelta(days=1),
+    "price": timedelta(minutes=1),
+    "technical": timedelta(minutes=15),
+    "mtf": timedelta(minutes=30),
+    "options": timedelta(minutes=30),
+    "news": timedelta(minutes=30),
+    "sentiment": timedelta(minutes=15),
+}
+
+# Deadline (segundos) de cada fetcher en la carga inicial con respuesta parcial
+SECTION_DEADLINES: dict[str, float] = {
+    "fundamentals": 8,
+    "holdings": 6,
+    "sectors": 6,
+    "price": 3,
+    "technical": 5,
+    "mtf": 6,
+    "options": 6,
+    "news": 10,
+    "sentiment": 4,
+}
+
+
+class SectionedData:
+    """
+    Base para StockData / ETFData.
+    Las subclases declaran SECTIONS, SECTION_ATTRS (sección -> atributo raw),
+    `_fallback(section, error)` y un método async `refresh_<sección>` por cada una
+    (los fetch bloqueantes van a un thread con `_refresh_from` / asyncio.to_thread).
+    """
+
+    SECTIONS: tuple[str, ...] = ()
+    SECTION_ATTRS: dict[str, str] = {}
+    SNAPSHOT_EXTRA_ATTRS: tuple[str, ...] = ()  # Otros atributos a incluir en snapshot()
+
+    def __init__(self):
+        self._updated_at: dict[str, datetime] = {}
+        self._errors: dict[str, str] = {}
+        self._section_locks: dict[str, asyncio.Lock] = {}
+        self._pending: dict[str, asyncio.Task] = {}
+
+    def _fallback(self, section: str, error: str) -> Any:
+        """Valor a usar cuando una sección no tiene datos (error o pending)."""
+        return {"ticker": self.ticker, "error": error}
+
+    def mark_updated(self, *sections: str):
+        now = datetime.now()
+        for section in sections:
+            self._updated_at[section] = now
+            self._errors.pop(section, None)
+
+    def mark_failed(self, section: str, error: str):
+        """Registra un intento fallido; el reintento queda sujeto al TTL de la sección."""
+        self._updated_at[section] = datetime.now()
+        self._errors[section] = error
+
+    async def _refresh_from(
+        self,
+        section: str,
+        fetch: Callable[[], Any],
+        is_valid: Callable[[Any], bool] = lambda data: isinstance(data, dict) and "error" not in data
+    ) -> bool:
+        """
+        Ejecuta `fetch` en un thread y, ya en el event loop, guarda el resultado en
+        el atributo de la sección si es válido. Si falla se conservan los últimos
+        datos buenos; si no hay ninguno se usa el fallback.
+        """
+        attr = self.SECTION_ATTRS[section]
+        try:
+            data = await asyncio.to_thread(fetch)
+            error = None if is_valid(data) else str((data or {}).get("error", "invalid response"))
+        except Exception as e:
+            data, error = None, str(e)
+
+        if error is None:
+            setattr(self, attr, data)
+            self.mark_updated(section)
+            return True
+
+        _logger.warning(f"⚠️ Error fetching {section} for {self.ticker}: {error}")
+        if getattr(self, attr) is None or section in self._pending:
+            setattr(self, attr, self._fallback(section, error))
+        self.mark_failed(section, error)
+        return False
+
+    def section_age(self, section: str) -> Optional[timedelta]:
+        updated_at = self._updated_at.get(section)
+        return datetime.now() - updated_at if updated_at else None
+
+    def cadence(self) -> Optional[dict]:
+        """Fase de la sesión y eventos que ajustan los TTL (None si la cadencia está desactivada)."""
+        if not env_settings.cadence_enabled:
+            return None
+        info = getattr(self, "_raw_info", None)
+        return cadence_reasons(getattr(self, "_exchange", None), info if isinstance(info, dict) else None)
+
+    def effective_ttl(self, section: str, reasons: Optional[dict] = None) -> timedelta:
+        """TTL base de la sección ajustado por la cadencia adaptativa."""
+        reasons = reasons if reasons is not None else self.cadence()
+        if reasons is None:
+            return SECTION_TTLS[section]
+        return SECTION_TTLS[section] * ttl_multiplier(section, reasons)
+
+    def is_stale(self, section: str, reasons: Optional[dict] = None) -> bool:
+        age = self.section_age(section)
+        return age is None or age > self.effective_ttl(section, reasons)
+
+    def stale_sections(self, skip: Iterable[str] = ()) -> list[str]:
+        reasons = self.cadence()
+        return [
+            s for s in self.SECTIONS
+            if s not in skip and s not in self._pending and self.is_stale(s, reasons)
+        ]
+
+    @property
+    def pending_sections(self) -> list[str]:
+        return list(self._pending)
+
+    async def refresh_section(self, section: str):
+        """Refresca una sola sección (una refresh a la vez por sección)."""
+        lock = self._section_locks.setdefault(section, asyncio.Lock())
+        if lock.locked():
+            return
+        async with lock:
+            await getattr(self, f"refresh_{section}")()
+
+    async def refresh_stale(self, skip: Iterable[str] = ()) -> list[str]:
+        """Refresca en paralelo las secciones vencidas. Retorna las que se refrescaron."""
+        stale = self.stale_sections(skip)
+        if stale:
+            _logger.debug("🔄 Stale sections for %s: %s", self.ticker, stale)
+            await asyncio.gather(*(self.refresh_section(s) for s in stale))
+        return stale
+
+    async def fetch_sections(self, sections: Iterable[str], use_deadlines: bool = False) -> list[str]:
+        """
+        Carga las secciones en paralelo.
+        Con `use_deadlines`, las que superan SECTION_DEADLINES siguen corriendo en
+        background y quedan pending; se retornan sus nombres.
+        """
+        tasks = {s: asyncio.create_task(self.refresh_section(s)) for s in sections}
+        if not use_deadlines:
+            await asyncio.gather(*tasks.values())
+            return []
+
+        async def _within_deadline(section: str, task: asyncio.Task) -> bool:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), SECTION_DEADLINES[section])
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+        results = await asyncio.gather(*(_within_deadline(s, t) for s, t in tasks.items()))
+        late = [s for s, on_time in zip(tasks, results) if not on_time]
+        for section in late:
+            self._mark_pending(section, tasks[section])
+        return late
+
+    def _mark_pending(self, section: str, task: asyncio.Task):
+        _logger.info(
+            "⏳ %s for %s missed its deadline, serving as pending", section, self.ticker,
+            extra=log_fields(sample="pending")
+        )
+        self._pending[section] = task
+        attr = self.SECTION_ATTRS.get(section)
+        if attr and getattr(self, attr) is None:
+            setattr(self, attr, self._fallback(section, "pending"))
+        task.add_done_callback(lambda _: self._on_pending_done(section))
+
+    def _on_pending_done(self, section: str):
+        self._pending.pop(section, None)
+        _logger.info("📥 Pending %s for %s completed", section, self.ticker, extra=log_fields(sample="pending"))
+
+    async def wait_pending(self, timeout: Optional[float] = None):
+        """Espera a que terminen las secciones pending (sin cancelarlas)."""
+        if self._pending:
+            await asyncio.wait(list(self._pending.values()), timeout=timeout)
+
+    def snapshot(self) -> dict:
+        """Estado serializable (datos por sección + timestamps) para compartir entre procesos."""
+        attrs = set(self.SECTION_ATTRS.values()) | set(self.SNAPSHOT_EXTRA_ATTRS)
+        return {
+            "attrs": {attr: getattr(self, attr) for attr in attrs},
+            "updated_at": dict(self._updated_at),
+            "errors": dict(self._errors),
+        }
+
+    def restore(self, snapshot: dict):
+        """Aplica un snapshot publicado por otro proceso (las secciones pending se respetan)."""
+        pending_attrs = {self.SECTION_ATTRS.get(s) for s in self._pending}
+        for attr, value in snapshot["attrs"].items():
+            if attr not in pending_attrs:
+                setattr(self, attr, value)
+        for section, updated_at in snapshot["updated_at"].items():
+            if section not in self._pending:
+                self._updated_at[section] = updated_at
+                if section in snapshot["errors"]:
+                    self._errors[section] = snapshot["errors"][section]
+                else:
+                    self._errors.pop(section, None)
+
+    @classmethod
+    def from_snapshot(cls, ticker: str, snapshot: dict) -> "SectionedData":
+        instance = cls(ticker)
+        instance.restore(snapshot)
+        return instance
+
+    def stagger_updates(self, max_fraction: float):
+        """
+        Adelanta al azar el vencimiento de cada sección (hasta `max_fraction` de su TTL)
+        para que instrumentos cargados juntos no se refresquen todos a la vez.
+        """
+        reasons = self.cadence()
+        for section, updated_at in self._updated_at.items():
+            if section in SECTION_TTLS:
+                self._updated_at[section] = updated_at - self.effective_ttl(section, reasons) * random.uniform(0, max_fraction)
+
+    def section_status(self) -> dict:
+        """Última actualización, edad, TTL (ajustado por la cadencia) y estado de cada sección."""
+        reasons = self.cadence()
+        status = {}
+        for section in self.SECTIONS:
+            age = self.section_age(section)
+            status[section] = {
+                "updated_at": self._updated_at.get(section),
+                "age_seconds": round(age.total_seconds(), 1) if age else None,
+                "ttl_seconds": self.effective_ttl(section, reasons).total_seconds(),
+                "stale": self.is_stale(section, reasons),
+                "pending": section in self._pending,
+                "error": self._errors.get(section),
+            }
+        return status
@@ -1,25 +1,39 @@
-from llama_index.tools.yahoo_finance import YahooFinanceToolSpec
+import asyncio
+
 from research_stocks.data_fetchers import (
     check_options_volatility,
     detect_exchange,
+    get_quote,
     get_stock_info, 
     get_stocktwits_data, 
     get_tradingview_analysis,
     get_tradingview_multi_timeframe 
 )
 from research_stocks.news import get_complete_news
+from research_stocks.sections import SectionedData
 from research_stocks.schemas import AnalystInfo, DebtMetrics, DividendMetrics, FinancialMetricsSchema, GrowthMetrics, MovingAveragesAnalysis, MultiTimeframeSchema, OptionsMove, OptionsVolatilitySchema, OscillatorsAnalysis, ProfitabilityMetrics, SentimentAnalysisSchema, StockDataSchema, StockInfoSchema, StockTwitsMessage, TechnicalIndicators, TimeframeAnalysis, TradingViewAnalysisSchema, TradingViewSummary, ValuationMetrics
-from utils.logger import setup_logging
+from utils.logger import log_fields, setup_logging
 
 _logger = setup_logging()
 
-yahoo_finance = YahooFinanceToolSpec()
-
-class StockData:
+class StockData(SectionedData):
     """Clase para consolidar todos los datos de una acción."""
     
+    SECTIONS = ("fundamentals", "price", "technical", "mtf", "options", "news", "sentiment")
+    SECTION_ATTRS = {
+        "fundamentals": "_raw_info",
+        "technical": "_raw_technical",
+        "mtf": "_raw_technical_mtf",
+        "options": "_raw_options",
+        "news": "_raw_news",
+        "sentiment": "_raw_sentiment",
+    }
+    SNAPSHOT_EXTRA_ATTRS = ("_exchange",)
+
     def __init__(self, ticker: str):
+        super().__init__()
         self.ticker = ticker.upper()
+        self._exchange = None
         self._raw_info = None
         self._raw_news = None
         self._raw_sentiment = None
@@ -28,88 +42,110 @@ class StockData:
         self._raw_technical_mtf = None  # Multi-timeframe analysis
     
     @classmethod
-    async def create(cls, ticker: str) -> "StockData":
-        """Factory method asíncrono para crear una instancia de StockData."""
+    async def create(cls, ticker: str, use_deadlines: bool = False) -> "StockData":
+        """
+        Factory method asíncrono para crear una instancia de StockData.
+        Con `use_deadlines` retorna apenas vencen los deadlines por fetcher;
+        las secciones que faltan quedan pending y se completan solas.
+        """
         instance = cls(ticker)
-        await instance._fetch_all_data()
+        await instance._fetch_all_data(use_deadlines)
         return instance
     
-    async def _fetch_all_data(self):
-        """Obtiene todos los datos de la acción."""
-        _logger.info(f"Fetching Stock data for {self.ticker}...")
-        
-        # 1. Info y métricas financieras
-        try:
-            self._raw_info = get_stock_info(self.ticker)
-        except Exception as e:
-            _logger.warning(f"⚠️ Error fetching stock info for {self.ticker}: {e}")
-            self._raw_info = {"ticker": self.ticker, "error": str(e)}
+    async def _fetch_all_data(self, use_deadlines: bool = False):
+        """Obtiene todos los datos de la acción (todas las secciones en paralelo)."""
+        _logger.info("Fetching Stock data", extra=log_fields(sample="fetch", ticker=self.ticker))
         
-        # 2. News (async) - AHORA CON MULTI-FUENTE
-        try:
-            self._raw_news = await get_complete_news(self.ticker)
-        except Exception as e:
-            _logger.warning(f"⚠️ Error fetching news for {self.ticker}: {e}")
-            self._raw_news = {"summary": "News data unavailable.", "articles": []}
+        # El precio viene dentro de fundamentals (info completa de yfinance)
+        await self.fetch_sections(
+            ("fundamentals", "news", "sentiment", "options", "technical", "mtf"),
+            use_deadlines
+        )
 
-        
-        # 3. Sentiment
-        try:
-            self._raw_sentiment = get_stocktwits_data(self.ticker.lower())
-        except Exception as e:
-            _logger.warning(f"⚠️ Error fetching sentiment for {self.ticker}: {e}")
-            self._raw_sentiment = {"stock_name": self.ticker, "messages": []}
-        
-        # 4. Options
-        try:
-            self._raw_options = check_options_volatility(ticker=self.ticker)
-        except Exception as e:
-            _logger.error(f"⚠️ Error fetching options for {self.ticker}: {e}")
-            self._raw_options = {
+    def _fallback(self, section: str, error: str):
+        if section == "options":
+            return {
                 "ticker": self.ticker,
                 "price": 0.0,
                 "atm_iv_avg": "N/A",
                 "unusual_activity_count": 0,
                 "top_unusual_moves": [],
-                "error": str(e)
+                "error": error
             }
+        if section == "news":
+            return {"summary": "News data unavailable.", "articles": []}
+        if section == "sentiment":
+            return {"stock_name": self.ticker, "messages": []}
+        return {"ticker": self.ticker, "error": error}
 
-        # 5. TradingView Technical Analysis (Nuevo)
-        try:
-            exchange = detect_exchange(self.ticker)
-            self._raw_technical = get_tradingview_analysis(self.ticker, exchange)
-        except Exception as e:
-            _logger.warning(f"⚠️ Error fetching TradingView analysis for {self.ticker}: {e}")
-            self._raw_technical = {"ticker": self.ticker, "error": str(e)}
-        
-        # 6. Multi-timeframe analysis (opcional, puede ser lento)
-        try:
-            exchange = detect_exchange(self.ticker)
-            self._raw_technical_mtf = get_tradingview_multi_timeframe(self.ticker, exchange)
-        except Exception as e:
-            _logger.warning(f"⚠️ Error fetching multi-timeframe analysis for {self.ticker}: {e}")
-            self._raw_technical_mtf = {"ticker": self.ticker, "error": str(e)}
+    def _get_exchange(self) -> str:
+        """Exchange para TradingView (se detecta una sola vez)."""
+        if self._exchange is None:
+            self._exchange = detect_exchange(self.ticker)
+        return self._exchange
 
+    # ===== Refresh por sección (ver research_stocks/sections.py) =====
+
+    async def refresh_fundamentals(self):
+        """Info completa de yfinance: fundamentales, analistas y también precio."""
+        if await self._refresh_from(
+            "fundamentals",
+            lambda: get_stock_info(self.ticker)
+        ):
+            self.mark_updated("price")
+
+    async def refresh_price(self):
+        """Actualiza solo los campos de precio/volumen dentro de info."""
+        quote = await asyncio.to_thread(get_quote, self.ticker)
+        if "error" in quote:
+            self.mark_failed("price", quote["error"])
+            return
+        if self._raw_info is None or "error" in self._raw_info:
+            # Sin fundamentales todavía: no hay dónde mezclar la cotización
+            return await self.refresh_fundamentals()
+        self._raw_info.update({k: v for k, v in quote.items() if v is not None})
+        self.mark_updated("price")
+
+    async def refresh_technical(self):
+        await self._refresh_from(
+            "technical",
+            lambda: get_tradingview_analysis(self.ticker, self._get_exchange())
+        )
+
+    async def refresh_mtf(self):
+        await self._refresh_from(
+            "mtf",
+            lambda: get_tradingview_multi_timeframe(self.ticker, self._get_exchange())
+        )
+
+    async def refresh_options(self):
+        await self._refresh_from(
+            "options",
+            lambda: check_options_volatility(ticker=self.ticker)
+        )
 
     async def refresh_news(self):
         """Actualiza solo las noticias."""
-        _logger.info(f"🔄 Refreshing news for {self.ticker}...")
+        _logger.info("🔄 Refreshing news for %s", self.ticker, extra=log_fields(sample="refresh"))
         try:
             new_news = await get_complete_news(self.ticker)
             if new_news:
                 self._raw_news = new_news
+            self.mark_updated("news")
         except Exception as e:
             _logger.error(f"⚠️ Error refreshing news for {self.ticker}: {e}")
+            if self._raw_news is None or "news" in self._pending:
+                self._raw_news = self._fallback("news", str(e))
+            self.mark_failed("news", str(e))
 
-    def refresh_sentiment(self):
+    async def refresh_sentiment(self):
         """Actualiza solo el sentimiento."""
-        _logger.info(f"🔄 Refreshing sentiment for {self.ticker}...")
-        try:
-            new_sentiment = get_stocktwits_data(self.ticker.lower())
-            if isinstance(new_sentiment, dict) and 'messages' in new_sentiment:
-                self._raw_sentiment = new_sentiment
-        except Exception as e:
-            _logger.error(f"⚠️ Error refreshing sentiment for {self.ticker}: {e}")
+        _logger.info("🔄 Refreshing sentiment for %s", self.ticker, extra=log_fields(sample="refresh"))
+        await self._refresh_from(
+            "sentiment",
+            lambda: get_stocktwits_data(self.ticker.lower()),
+            is_valid=lambda data: isinstance(data, dict) and 'messages' in data
+        )
 
     def get_news(self):
         """Retorna las noticias raw."""
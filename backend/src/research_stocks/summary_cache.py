@@ -0,0 +1,90 @@
+"""
+Cache de resúmenes LLM direccionado por contenido.
+La clave es ticker + fingerprints ordenados de los artículos + versión del prompt,
+así que solo se vuelve a llamar al LLM cuando cambia el set de noticias.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Optional
+
+from utils.logger import setup_logging
+
+_logger = setup_logging()
+
+
+class SummaryCache:
+    """LRU en memoria con un segundo nivel en disco (un JSON por clave)."""
+
+    def __init__(self, max_entries: int = 256, base_dir: Optional[str] = "data/news_summaries"):
+        self.max_entries = max_entries
+        self.base_dir = base_dir
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(ticker: str, fingerprints: Iterable[str], prompt_version: str) -> str:
+        payload = "|".join([ticker.upper(), prompt_version, *sorted(fingerprints)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.base_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        summary = self._read_disk(key)
+        if summary is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._remember(key, summary)
+        return summary
+
+    def set(self, key: str, summary: str, **metadata):
+        self._remember(key, summary)
+        self._write_disk(key, {"summary": summary, "created_at": datetime.now().isoformat(), **metadata})
+
+    def _remember(self, key: str, summary: str):
+        with self._lock:
+            self._memory[key] = summary
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        if not self.base_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f).get("summary")
+        except (OSError, ValueError) as e:
+            _logger.warning(f"⚠️ Unreadable summary cache entry {key[:12]}: {e}")
+            return None
+
+    def _write_disk(self, key: str, data: dict):
+        if not self.base_dir:
+            return
+        try:
+            os.makedirs(self.base_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.base_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            _logger.error(f"❌ Error writing summary cache entry {key[:12]}: {e}")
@@ -0,0 +1,277 @@
+"""
+Cola asíncrona de jobs de análisis.
+POST devuelve un job_id al instante; un pool acotado de workers arma el análisis
+con el StockManager y los clientes consultan (o se suscriben) al estado del job.
+
+El registro de jobs vive en el store compartido (SQLite): con varios workers de
+uvicorn cualquiera responde por un job_id y la deduplicación por ticker vale
+entre procesos. El job corre en el worker que lo aceptó; los demás siguen su
+estado consultando el store.
+"""
+
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Optional
+
+from research_stocks.analysis import ANALYSIS_ERROR_PREFIX
+from services.shared_store import shared_store
+from services.stock_manager import stock_manager
+from settings.env_config import env_settings
+from utils.logger import setup_logging
+
+_logger = setup_logging()
+
+# Cada cuánto se consulta el store al esperar un job de otro worker
+_REMOTE_POLL_SECONDS = 1.0
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """La cola de jobs alcanzó su largo máximo."""
+
+
+class JobGoneError(Exception):
+    """El job de otro worker desapareció del store (se podó o se perdió el registro)."""
+
+
+@dataclass
+class AnalysisJob:
+    id: str
+    ticker: str
+    status: JobStatus = JobStatus.QUEUED
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    instrument_type: Optional[str] = None
+    analysis: Optional[str] = None
+    error: Optional[str] = None
+    # Datos del instrumento (para armar raw_data al consultar el resultado)
+    data: object = field(default=None, repr=False)
+    # True si el job corre en otro worker (su estado se lee del store)
+    remote: bool = False
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @classmethod
+    def from_row(cls, row: dict, remote: bool = True) -> "AnalysisJob":
+        return cls(
+            id=row["id"],
+            ticker=row["ticker"],
+            status=JobStatus(row["status"]),
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            instrument_type=row["instrument_type"],
+            analysis=row["analysis"],
+            error=row["error"],
+            remote=remote,
+        )
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def _set_status(self, status: JobStatus):
+        """Cambia el estado y despierta a los suscriptores."""
+        self.status = status
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, timeout: Optional[float] = None) -> bool:
+        """Espera el próximo cambio de estado; False si vence el timeout."""
+        if self.finished:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class AnalysisJobQueue:
+    """Cola acotada de jobs con workers fijos y deduplicación por ticker (entre workers)."""
+
+    def __init__(self, max_workers: int, max_queue: int, retention_minutes: int, timeout_minutes: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retention = timedelta(minutes=retention_minutes)
+        self.timeout = timedelta(minutes=timeout_minutes)
+        self.jobs: dict[str, AnalysisJob] = {}  # Jobs que corren en este worker
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._counters = {"submitted": 0, "deduplicated": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    def start(self):
+        """Levanta los workers (requiere un event loop corriendo)."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"analysis-job-worker-{i}")
+            for i in range(self.max_workers)
+        ]
+        _logger.info(f"🧵 Analysis job queue started ({self.max_workers} workers)")
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, ticker: str) -> tuple[AnalysisJob, bool]:
+        """
+        Encola un análisis. Si ya hay un job en curso para el ticker (en cualquier
+        worker) se retorna ese. Retorna (job, deduplicated).
+        Lanza QueueFullError si hay `max_queue` jobs en espera entre todos los workers.
+        """
+        self.start()
+        await self._prune()
+        ticker = ticker.upper()
+
+        job_id = uuid.uuid4().hex
+        row, created = await asyncio.to_thread(
+            shared_store.create_job, job_id, ticker, self.timeout.total_seconds(), self.max_queue
+        )
+        if row is None:
+            self._counters["rejected"] += 1
+            raise QueueFullError(f"Analysis queue is full ({self.max_queue} jobs)")
+        if not created:
+            self._counters["deduplicated"] += 1
+            return self.jobs.get(row["id"]) or AnalysisJob.from_row(row), True
+
+        job = AnalysisJob.from_row(row, remote=False)
+        self.jobs[job.id] = job
+        self._queue.put_nowait(job)
+        self._counters["submitted"] += 1
+        return job, False
+
+    async def get(self, job_id: str) -> Optional[AnalysisJob]:
+        """Job local, o el estado publicado en el store si corre en otro worker."""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        row = await asyncio.to_thread(shared_store.load_job, job_id)
+        if row is None:
+            return None
+
+        job = AnalysisJob.from_row(row)
+        if not job.finished and datetime.now() - row["updated_at"] > self.timeout:
+            # El worker que lo corría no volvió a actualizarlo (probablemente se cayó)
+            job.status, job.error = JobStatus.FAILED, "abandoned"
+        if job.status == JobStatus.COMPLETED and await stock_manager.adopt_shared(job.ticker):
+            job.data = stock_manager.instruments[job.ticker]["data"]
+        return job
+
+    async def wait_for_change(self, job: AnalysisJob, timeout: Optional[float] = None) -> AnalysisJob:
+        """
+        Espera un cambio de estado (o el timeout) y retorna el job actualizado.
+        Lanza JobGoneError si el job de otro worker ya no está en el store.
+        """
+        if not job.remote:
+            await job.wait_for_change(timeout)
+            return job
+
+        loop = asyncio.get_running_loop()
+        end = None if timeout is None else loop.time() + timeout
+        while end is None or loop.time() < end:
+            await asyncio.sleep(_REMOTE_POLL_SECONDS)
+            current = await self.get(job.id)
+            if current is None:
+                raise JobGoneError(f"Job {job.id} no longer exists")
+            if current.status != job.status:
+                return current
+        return job
+
+    async def wait_finished(self, job: AnalysisJob, timeout: Optional[float] = None) -> AnalysisJob:
+        """Espera hasta que el job termine o venza el timeout (long-polling)."""
+        loop = asyncio.get_running_loop()
+        end = None if timeout is None else loop.time() + timeout
+        while not job.finished:
+            remaining = None if end is None else end - loop.time()
+            if remaining is not None and remaining <= 0:
+                break
+            job = await self.wait_for_change(job, remaining)
+        return job
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _persist(self, job: AnalysisJob, **fields):
+        try:
+            await asyncio.to_thread(shared_store.update_job, job.id, status=job.status.value, **fields)
+        except Exception as e:
+            _logger.error(f"❌ Error persisting job {job.id[:8]}: {e}")
+
+    async def _run(self, job: AnalysisJob):
+        job.started_at = datetime.now()
+        job._set_status(JobStatus.RUNNING)
+        await self._persist(job, started_at=job.started_at)
+        _logger.info(f"⚙️ Job {job.id[:8]} started for {job.ticker}")
+        try:
+            data, analysis, instrument_type = await stock_manager.get_or_create_instrument(job.ticker)
+            if not analysis or analysis.startswith(ANALYSIS_ERROR_PREFIX):
+                raise RuntimeError(analysis or "Empty analysis")
+            job.data, job.analysis, job.instrument_type = data, analysis, instrument_type
+            status = JobStatus.COMPLETED
+        except Exception as e:
+            _logger.error(f"❌ Job {job.id[:8]} failed for {job.ticker}: {e}")
+            job.error = str(e)
+            status = JobStatus.FAILED
+
+        job.finished_at = datetime.now()
+        self._counters[status.value] += 1
+        job.status = status
+        await self._persist(
+            job,
+            finished_at=job.finished_at,
+            instrument_type=job.instrument_type,
+            analysis=job.analysis,
+            error=job.error,
+        )
+        job._set_status(status)
+
+    async def _prune(self):
+        """Olvida los jobs terminados hace más de `retention` (locales y del store)."""
+        cutoff = datetime.now() - self.retention
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+        try:
+            await asyncio.to_thread(shared_store.prune_jobs, cutoff)
+        except Exception as e:
+            _logger.error(f"❌ Error pruning jobs: {e}")
+
+    def metrics(self) -> dict:
+        running = sum(1 for job in self.jobs.values() if job.status == JobStatus.RUNNING)
+        return {
+            "workers": len(self._workers),
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "running": running,
+            "tracked_jobs": len(self.jobs),
+            **self._counters
+        }
+
+
+analysis_jobs = AnalysisJobQueue(
+    max_workers=env_settings.analysis_job_workers,
+    max_queue=env_settings.analysis_job_max_queue,
+    retention_minutes=env_settings.analysis_job_retention_minutes,
+    timeout_minutes=env_settings.analysis_job_timeout_minutes
+)
@@ -0,0 +1,107 @@
+"""
+Elección de líder entre procesos de la misma máquina (workers de uvicorn)
+mediante un lease en el store SQLite compartido.
+
+Cada proceso intenta tomar/renovar el lease cada `renew_seconds`; el lease
+vence a los `lease_seconds`, así que si el líder muere otro lo reemplaza en
+pocos segundos.
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from services.shared_store import SharedStore, shared_store
+from settings.env_config import env_settings
+from utils.logger import setup_logging
+
+_logger = setup_logging()
+
+Callback = Callable[[], Optional[Awaitable[None]]]
+
+
+class LeaderElector:
+    """Mantiene el lease `name` y avisa al ganar o perder el liderazgo."""
+
+    def __init__(
+        self,
+        name: str,
+        store: SharedStore,
+        lease_seconds: float,
+        renew_seconds: float,
+        on_elected: Optional[Callback] = None,
+        on_demoted: Optional[Callback] = None
+    ):
+        self.name = name
+        self.store = store
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Deja de competir y libera el lease para que otro tome el relevo de inmediato."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            await asyncio.to_thread(self.store.release_lease, self.name, self.holder_id)
+            await self._set_leader(False)
+
+    async def _run(self):
+        while True:
+            try:
+                acquired = await asyncio.to_thread(
+                    self.store.try_acquire_lease, self.name, self.holder_id, self.lease_seconds
+                )
+            except Exception as e:
+                # Sin poder renovar no hay garantía de exclusividad
+                _logger.error(f"❌ Lease check failed for {self.name}: {e}")
+                acquired = False
+            if acquired != self.is_leader:
+                await self._set_leader(acquired)
+            await asyncio.sleep(self.renew_seconds)
+
+    async def _set_leader(self, leader: bool):
+        self.is_leader = leader
+        if leader:
+            _logger.info(f"👑 {self.holder_id} is now leader for {self.name}")
+        else:
+            _logger.info(f"🪑 {self.holder_id} is no longer leader for {self.name}")
+        callback = self.on_elected if leader else self.on_demoted
+        if callback is not None:
+            try:
+                result = callback()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                _logger.error(f"❌ Leader callback failed for {self.name}: {e}")
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "holder_id": self.holder_id,
+            "is_leader": self.is_leader,
+            "current": self.store.lease_holder(self.name),
+        }
+
+
+def create_scheduler_elector(on_elected: Callback, on_demoted: Callback) -> LeaderElector:
+    return LeaderElector(
+        name="scheduler",
+        store=shared_store,
+        lease_seconds=env_settings.leader_lease_seconds,
+        renew_seconds=env_settings.leader_renew_seconds,
+        on_elected=on_elected,
+        on_demoted=on_demoted
+    )
@@ -0,0 +1,69 @@
+"""
+Popularidad de tickers (frecuencia + recencia de accesos de usuarios).
+
+Cada acceso suma 1 a un score que decae exponencialmente con la vida media
+configurada. Los accesos se acumulan en memoria y se vuelcan cada pocos
+segundos al store compartido, así el scheduler (que puede correr en otro
+proceso) ve la popularidad de todos los workers.
+"""
+
+import asyncio
+import threading
+import time
+from collections import Counter
+
+from services.shared_store import SharedStore, shared_store
+from settings.env_config import env_settings
+from utils.logger import setup_logging
+
+_logger = setup_logging()
+
+
+class PopularityTracker:
+    """Registra accesos por ticker y expone los scores decaídos."""
+
+    def __init__(self, store: SharedStore, half_life_minutes: float, flush_seconds: float = 5):
+        self.store = store
+        self.half_life_s = half_life_minutes * 60
+        self.flush_seconds = flush_seconds
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._flush_scheduled = False
+
+    def record(self, ticker: str):
+        """Cuenta un acceso de usuario (no usar para prewarm ni jobs internos)."""
+        with self._lock:
+            self._pending[ticker.upper()] += 1
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        try:
+            loop = asyncio.get_running_loop()
+            loop.call_later(self.flush_seconds, loop.run_in_executor, None, self.flush)
+        except RuntimeError:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counts, self._pending = dict(self._pending), Counter()
+            self._flush_scheduled = False
+        if not counts:
+            return
+        try:
+            self.store.record_accesses(counts, self.half_life_s)
+        except Exception as e:
+            _logger.error(f"❌ Error flushing popularity: {e}")
+            with self._lock:
+                self._pending.update(counts)
+
+    def scores(self) -> dict[str, dict]:
+        """ticker -> {'score', 'idle_seconds'} incluyendo lo que aún no se volcó."""
+        self.flush()
+        now = time.time()
+        return {
+            ticker: {"score": stats["score"], "idle_seconds": now - stats["last_access"]}
+            for ticker, stats in self.store.popularity(self.half_life_s).items()
+        }
+
+
+popularity = PopularityTracker(shared_store, env_settings.popularity_half_life_minutes)
@@ -0,0 +1,138 @@
+"""
+Precalentamiento del cache al arrancar: carga (datos + análisis) los tickers
+de la watchlist antes de que llegue el primer usuario.
+
+- Concurrencia y ritmo de arranque acotados por settings.
+- Entre workers se coordina con un lease por ticker: uno lo carga y el resto
+  lo toma del store compartido.
+- Los timestamps de las secciones se desfasan al azar para que los refresh
+  no venzan todos en el mismo minuto.
+"""
+
+import asyncio
+import math
+import os
+import random
+from datetime import datetime
+from typing import Optional
+
+from services.shared_store import shared_store
+from services.stock_manager import stock_manager
+from services.watchlist import load_watchlist
+from settings.env_config import env_settings
+from utils.llm_dispatcher import Priority, llm_priority
+from utils.logger import setup_logging
+
+_logger = setup_logging()
+
+
+class Prewarmer:
+    """Carga la watchlist al arranque y expone el progreso."""
+
+    def __init__(self):
+        self.tickers: list[str] = []
+        self.warmed: list[str] = []
+        self.failed: dict[str, str] = {}
+        self.in_progress: set[str] = set()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._holder = f"prewarm:{os.getpid()}:{random.getrandbits(24):06x}"
+
+    @property
+    def ready(self) -> bool:
+        """
+        True cuando terminó el precalentamiento y quedó caliente al menos
+        `prewarm_ready_fraction` de la watchlist (o no hay nada que precalentar).
+        """
+        if not env_settings.prewarm_enabled:
+            return True
+        if self.finished_at is None:
+            return False
+        total = len(self.tickers)
+        return total == 0 or len(self.warmed) >= total * env_settings.prewarm_ready_fraction
+
+    def start(self):
+        if self._task is None and env_settings.prewarm_enabled:
+            self.tickers = load_watchlist()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        self.started_at = datetime.now()
+        if self.tickers:
+            _logger.info(f"🔥 Prewarming {len(self.tickers)} watchlist tickers...")
+
+        semaphore = asyncio.Semaphore(env_settings.prewarm_concurrency)
+        interval = 60 / env_settings.prewarm_rate_per_minute if env_settings.prewarm_rate_per_minute > 0 else 0
+        tasks = []
+        for i, ticker in enumerate(self.tickers):
+            if i and interval:
+                await asyncio.sleep(interval)
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(self._warm_with_retries(ticker, semaphore)))
+        await asyncio.gather(*tasks)
+
+        self.finished_at = datetime.now()
+        elapsed = (self.finished_at - self.started_at).total_seconds()
+        _logger.info(
+            f"✅ Prewarm finished in {elapsed:.1f}s: {len(self.warmed)} warm, {len(self.failed)} failed"
+        )
+
+    async def _warm_with_retries(self, ticker: str, semaphore: asyncio.Semaphore):
+        self.in_progress.add(ticker)
+        try:
+            for attempt in range(env_settings.prewarm_retries + 1):
+                try:
+                    await self._warm(ticker)
+                    self.warmed.append(ticker)
+                    self.failed.pop(ticker, None)
+                    return
+                except Exception as e:
+                    _logger.warning(f"⚠️ Prewarm of {ticker} failed (attempt {attempt + 1}): {e}")
+                    self.failed[ticker] = str(e)
+        finally:
+            self.in_progress.discard(ticker)
+            semaphore.release()
+
+    async def _warm(self, ticker: str):
+        """Toma el ticker del store si otro worker ya lo cargó; si no, lo carga con lease."""
+        while True:
+            if await stock_manager.adopt_shared(ticker):
+                return
+            claimed = await asyncio.to_thread(
+                shared_store.try_acquire_lease, f"prewarm:{ticker}", self._holder, 120
+            )
+            if claimed:
+                try:
+                    with llm_priority(Priority.BACKGROUND):
+                        await stock_manager.get_or_create_instrument(ticker)
+                    await stock_manager.stagger_sections(ticker, env_settings.prewarm_stagger_fraction)
+                finally:
+                    await asyncio.to_thread(shared_store.release_lease, f"prewarm:{ticker}", self._holder)
+                return
+            # Otro worker lo está cargando: esperar a que lo publique
+            await asyncio.sleep(2)
+
+    def progress(self) -> dict:
+        total = len(self.tickers)
+        return {
+            "enabled": env_settings.prewarm_enabled,
+            "ready": self.ready,
+            "finished": self.finished_at is not None,
+            "required": math.ceil(total * env_settings.prewarm_ready_fraction),
+            "total": total,
+            "warmed": len(self.warmed),
+            "failed": self.failed,
+            "in_progress": sorted(self.in_progress),
+            "percent": round(100 * len(self.warmed) / total, 1) if total else 100.0,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+prewarmer = Prewarmer()
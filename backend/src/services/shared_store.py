@@ -0,0 +1,325 @@
+"""
+Store local (SQLite) compartido entre procesos de la misma máquina.
+
+- `leases`: leases con vencimiento para elegir un líder entre workers.
+- `instruments`: último snapshot publicado de cada instrumento (datos por
+  sección + análisis) con un número de versión, para que cualquier worker
+  recoja lo que refrescó el líder sin volver a pedirlo upstream.
+- `refresh_requests`: tickers cuyo análisis la API pidió regenerar al
+  servicio de ingesta (modo `external`).
+- `popularity`: score de accesos por ticker con decaimiento exponencial.
+- `analysis_jobs`: estado de los jobs de análisis asíncronos, para que
+  cualquier worker responda por un job_id y la deduplicación por ticker
+  valga entre procesos.
+"""
+
+import math
+import os
+import pickle
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime
+from typing import Optional
+
+from settings.env_config import env_settings
+from utils.logger import setup_logging
+
+_logger = setup_logging()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refresh_requests (
+    ticker TEXT PRIMARY KEY,
+    requested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS popularity (
+    ticker TEXT PRIMARY KEY,
+    score REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS instruments (
+    ticker TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    analysis TEXT,
+    analysis_time REAL,
+    data BLOB NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+    id TEXT PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    instrument_type TEXT,
+    analysis TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analysis_jobs_ticker ON analysis_jobs (ticker, status);
+"""
+
+_JOB_COLUMNS = (
+    "id", "ticker", "status", "created_at", "started_at", "finished_at",
+    "instrument_type", "analysis", "error", "updated_at",
+)
+_ACTIVE_JOB_STATUSES = ("queued", "running")
+
+
+class SharedStore:
+    """Acceso a la base SQLite compartida (una conexión corta por operación)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    # ----- leases -----
+
+    def try_acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """Toma o renueva el lease si está libre, vencido o ya es de `holder`."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row is None or row[0] == holder or row[1] < now:
+                conn.execute(
+                    "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at",
+                    (name, holder, now + ttl_seconds)
+                )
+                conn.execute("COMMIT")
+                return True
+            conn.execute("COMMIT")
+            return False
+
+    def release_lease(self, name: str, holder: str):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+    def lease_holder(self, name: str) -> Optional[dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return {"holder": row[0], "expires_at": datetime.fromtimestamp(row[1])}
+
+    # ----- instrumentos -----
+
+    def publish(
+        self,
+        ticker: str,
+        instrument_type: str,
+        snapshot: dict,
+        analysis: Optional[str] = None,
+        analysis_time: Optional[datetime] = None
+    ) -> int:
+        """
+        Guarda el snapshot (y el análisis si viene) y retorna la nueva versión.
+        Las versiones crecen con el reloj, así un ticker desalojado y vuelto a
+        publicar nunca queda con una versión menor a la que ya vieron los workers.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "INSERT INTO instruments (ticker, type, analysis, analysis_time, data, version, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(ticker) DO UPDATE SET "
+                "type = excluded.type, data = excluded.data, updated_at = excluded.updated_at, "
+                "analysis = COALESCE(excluded.analysis, instruments.analysis), "
+                "analysis_time = COALESCE(excluded.analysis_time, instruments.analysis_time), "
+                "version = MAX(instruments.version + 1, excluded.version) "
+                "RETURNING version",
+                (
+                    ticker,
+                    instrument_type,
+                    analysis,
+                    analysis_time.timestamp() if analysis_time else None,
+                    pickle.dumps(snapshot),
+                    int(now * 1_000_000),
+                    now,
+                )
+            ).fetchone()
+        return row[0]
+
+    def load(self, ticker: str) -> Optional[dict]:
+        """Último snapshot publicado del ticker, o None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT type, analysis, analysis_time, data, version FROM instruments WHERE ticker = ?",
+                (ticker,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            snapshot = pickle.loads(row[3])
+        except Exception as e:
+            _logger.warning(f"⚠️ Corrupted shared snapshot for {ticker}: {e}")
+            return None
+        return {
+            "type": row[0],
+            "analysis": row[1],
+            "analysis_time": datetime.fromtimestamp(row[2]) if row[2] else None,
+            "snapshot": snapshot,
+            "version": row[4],
+        }
+
+    # ----- pedidos de regeneración -----
+
+    def request_refresh(self, ticker: str):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO refresh_requests (ticker, requested_at) VALUES (?, ?)",
+                (ticker, time.time())
+            )
+
+    def pop_refresh_requests(self) -> list[str]:
+        """Retorna y borra los pedidos pendientes."""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            tickers = [row[0] for row in conn.execute("SELECT ticker FROM refresh_requests")]
+            conn.execute("DELETE FROM refresh_requests")
+            conn.execute("COMMIT")
+        return tickers
+
+    # ----- popularidad -----
+
+    @staticmethod
+    def _decayed(score: float, since: float, now: float, half_life_s: float) -> float:
+        return score * math.pow(0.5, max(0.0, now - since) / half_life_s)
+
+    def record_accesses(self, counts: dict[str, int], half_life_s: float):
+        """Suma accesos al score de cada ticker (decayendo primero el score previo)."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for ticker, count in counts.items():
+                row = conn.execute(
+                    "SELECT score, last_access FROM popularity WHERE ticker = ?", (ticker,)
+                ).fetchone()
+                score = self._decayed(row[0], row[1], now, half_life_s) if row else 0.0
+                conn.execute(
+                    "INSERT OR REPLACE INTO popularity (ticker, score, last_access) VALUES (?, ?, ?)",
+                    (ticker, score + count, now)
+                )
+            conn.execute("COMMIT")
+
+    def popularity(self, half_life_s: float) -> dict[str, dict]:
+        """ticker -> {'score' (decaído a ahora), 'last_access'}."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT ticker, score, last_access FROM popularity").fetchall()
+        return {
+            ticker: {"score": self._decayed(score, last_access, now, half_life_s), "last_access": last_access}
+            for ticker, score, last_access in rows
+        }
+
+    # ----- jobs de análisis -----
+
+    @staticmethod
+    def _job_row(row) -> dict:
+        job = dict(zip(_JOB_COLUMNS, row))
+        for key in ("created_at", "started_at", "finished_at", "updated_at"):
+            job[key] = datetime.fromtimestamp(job[key]) if job[key] else None
+        return job
+
+    def create_job(
+        self, job_id: str, ticker: str, stale_after_s: float, max_queued: Optional[int] = None
+    ) -> tuple[Optional[dict], bool]:
+        """
+        Registra un job queued para `ticker` salvo que ya haya uno activo (en
+        cualquier worker). Retorna (job, created). Un job activo sin cambios hace
+        más de `stale_after_s` se da por abandonado (su worker se cayó).
+        Con `max_queued`, si ya hay tantos jobs en espera entre todos los workers
+        no se crea nada y retorna (None, False).
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE analysis_jobs SET status = 'failed', error = 'abandoned', finished_at = ?, updated_at = ? "
+                "WHERE status IN (?, ?) AND updated_at < ?",
+                (now, now, *_ACTIVE_JOB_STATUSES, now - stale_after_s)
+            )
+            row = conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM analysis_jobs "
+                "WHERE ticker = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (ticker, *_ACTIVE_JOB_STATUSES)
+            ).fetchone()
+            if row is not None:
+                conn.execute("COMMIT")
+                return self._job_row(row), False
+            if max_queued is not None:
+                (queued,) = conn.execute(
+                    "SELECT COUNT(*) FROM analysis_jobs WHERE status = 'queued'"
+                ).fetchone()
+                if queued >= max_queued:
+                    conn.execute("COMMIT")
+                    return None, False
+            conn.execute(
+                "INSERT INTO analysis_jobs (id, ticker, status, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, ticker, now, now)
+            )
+            conn.execute("COMMIT")
+        return self.load_job(job_id), True
+
+    def update_job(self, job_id: str, **fields):
+        """Actualiza columnas del job (los datetime se guardan como timestamp)."""
+        values = {
+            key: value.timestamp() if isinstance(value, datetime) else value
+            for key, value in fields.items()
+        }
+        values["updated_at"] = time.time()
+        assignments = ", ".join(f"{key} = ?" for key in values)
+        with closing(self._connect()) as conn:
+            conn.execute(f"UPDATE analysis_jobs SET {assignments} WHERE id = ?", (*values.values(), job_id))
+
+    def load_job(self, job_id: str) -> Optional[dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM analysis_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._job_row(row) if row else None
+
+    def prune_jobs(self, finished_before: datetime):
+        """Borra los jobs terminados antes de `finished_before`."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "DELETE FROM analysis_jobs WHERE status NOT IN (?, ?) AND finished_at < ?",
+                (*_ACTIVE_JOB_STATUSES, finished_before.timestamp())
+            )
+
+    def evict(self, ticker: str):
+        """Borra el instrumento publicado y su popularidad."""
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM instruments WHERE ticker = ?", (ticker,))
+            conn.execute("DELETE FROM popularity WHERE ticker = ?", (ticker,))
+
+    def version(self, ticker: str) -> Optional[int]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT version FROM instruments WHERE ticker = ?", (ticker,)).fetchone()
+        return row[0] if row else None
+
+    def versions(self) -> dict[str, int]:
+        """ticker -> versión de todo lo publicado."""
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT ticker, version FROM instruments").fetchall())
+
+
+shared_store = SharedStore(env_settings.shared_store_path)
@@ -1,13 +1,31 @@
+import asyncio
+import time
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from datetime import datetime, timedelta
 from research_stocks.stock_data import StockData
 from research_stocks.etf_data import ETFData
 from research_stocks.etf_fetchers import is_etf
 from research_stocks.analysis import analyze_stock, analyze_etf
-from utils.logger import setup_logging
+from research_stocks.news import diff_news, news_fingerprints
+from services.leader import create_scheduler_elector
+from services.popularity import popularity
+from services.shared_store import shared_store
+from services.watchlist import load_watchlist, pinned_tickers
+from settings.env_config import env_settings
+from utils.cancellation import shared_work
+from utils.llm_dispatcher import Priority, llm_priority
+from utils.logger import log_fields, setup_logging
 
 _logger = setup_logging()
 
+# Cada cuánto cada worker revisa su cache local buscando tickers inactivos
+_LOCAL_EVICTION_INTERVAL_S = 600
+
+
+class AnalysisUnavailable(Exception):
+    """El análisis cacheado pasó el hard TTL y no se pudo regenerar."""
+
+
 class StockManager:
     _instance = None
     
@@ -16,143 +34,600 @@ class StockManager:
             cls._instance = super(StockManager, cls).__new__(cls)
             cls._instance.instruments = {}  # Cache unificado para stocks y ETFs
             cls._instance.scheduler = AsyncIOScheduler()
+            cls._instance._revalidations = {}  # ticker -> asyncio.Task de regeneración en curso
+            cls._instance._unanalyzed = {}  # ticker -> datos cargados sin análisis (p. ej. desde /data)
+            cls._instance._elector = None
+            cls._instance._refresh_credits = {}  # ticker -> refresh acumulados sin gastar
+            cls._instance._refresh_plan = {}  # Último reparto del presupuesto (para métricas)
+            cls._instance._publish_locks = {}  # ticker -> asyncio.Lock (publicaciones en orden)
+            cls._instance._last_access = {}  # ticker -> último acceso en este worker (time.time())
+            cls._instance._local_eviction_task = None
         return cls._instance
 
     def start(self):
-        """Inicia el scheduler."""
+        """
+        Inicia el scheduler en pausa y compite por el liderazgo: solo el worker
+        líder ejecuta los refresh; el resto lee lo que publica en el store compartido.
+        """
         if not self.scheduler.running:
-            self.scheduler.start()
-            _logger.info("🚀 StockManager Scheduler started.")
+            self.scheduler.start(paused=True)
+            self.scheduler.add_job(
+                self._sync_from_store,
+                'interval',
+                seconds=env_settings.shared_sync_seconds,
+                id="shared_store_sync",
+                replace_existing=True
+            )
+            self.scheduler.add_job(
+                self._refresh_sweep,
+                'interval',
+                minutes=1,
+                id="refresh_sweep",
+                replace_existing=True
+            )
+            self._elector = create_scheduler_elector(self._on_elected, self._on_demoted)
+            self._elector.start()
+            _logger.info("🚀 StockManager Scheduler started (waiting for leadership).")
+        self.start_local_eviction()
+
+    def start_local_eviction(self):
+        """
+        Desalojo periódico del cache local en este worker. Lo necesitan también
+        los workers que nunca son líderes (p. ej. la API con INGESTION_MODE=external).
+        """
+        if self._local_eviction_task is None or self._local_eviction_task.done():
+            self._local_eviction_task = asyncio.create_task(self._local_eviction_loop())
+
+    async def stop(self):
+        """Libera el liderazgo (failover inmediato) y detiene el scheduler."""
+        if self._local_eviction_task is not None:
+            self._local_eviction_task.cancel()
+            await asyncio.gather(self._local_eviction_task, return_exceptions=True)
+            self._local_eviction_task = None
+        if self._elector is not None:
+            await self._elector.stop()
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+
+    @property
+    def is_leader(self) -> bool:
+        return self._elector is not None and self._elector.is_leader
+
+    async def _on_elected(self):
+        await self._sync_from_store()
+        self.scheduler.resume()
+        _logger.info("▶️ Refresh jobs running in this worker")
+
+    def _on_demoted(self):
+        self.scheduler.pause()
+        _logger.info("⏸️ Refresh jobs paused in this worker")
+
+    def leadership(self) -> dict:
+        if self._elector is None:
+            return {"is_leader": False, "started": False}
+        return {**self._elector.status(), "started": True}
+
+    # ----- cache compartido entre workers -----
+
+    async def _publish(self, ticker: str, with_analysis: bool = True):
+        """
+        Publica los datos (y el análisis) del ticker en el store compartido.
+        El snapshot se toma en el loop; el pickle y la escritura en SQLite corren
+        en un thread (con varios procesos escribiendo, el lock puede tardar).
+        """
+        async with self._publish_locks.setdefault(ticker, asyncio.Lock()):
+            entry = self.instruments.get(ticker)
+            try:
+                if entry is not None:
+                    entry["version"] = await asyncio.to_thread(
+                        shared_store.publish,
+                        ticker,
+                        entry["type"],
+                        entry["data"].snapshot(),
+                        analysis=entry["analysis"] if with_analysis else None,
+                        analysis_time=entry["analysis_time"] if with_analysis else None
+                    )
+                elif ticker in self._unanalyzed:
+                    instrument_data, instrument_type = self._unanalyzed[ticker]
+                    await asyncio.to_thread(
+                        shared_store.publish, ticker, instrument_type, instrument_data.snapshot()
+                    )
+            except Exception as e:
+                _logger.error(f"❌ Error publishing {ticker} to shared store: {e}")
+
+    def _adopt(self, ticker: str, shared: dict):
+        """Crea o actualiza la entrada local a partir de lo publicado por otro worker."""
+        entry = self.instruments.get(ticker)
+        if entry is not None:
+            entry["data"].restore(shared["snapshot"])
+            entry["analysis"] = shared["analysis"]
+            entry["analysis_time"] = shared["analysis_time"]
+            entry["news_fingerprints"] = self._get_news_fingerprints(entry["data"])
+            entry["version"] = shared["version"]
+            return
+
+        data_cls = ETFData if shared["type"] == "ETF" else StockData
+        instrument_data = data_cls.from_snapshot(ticker, shared["snapshot"])
+        self._unanalyzed.pop(ticker, None)
+        self.instruments[ticker] = {
+            "data": instrument_data,
+            "analysis": shared["analysis"],
+            "analysis_time": shared["analysis_time"],
+            "type": shared["type"],
+            "news_fingerprints": self._get_news_fingerprints(instrument_data),
+            "version": shared["version"]
+        }
+
+    async def _sync_ticker(self, ticker: str) -> bool:
+        """Trae la versión publicada si es más nueva que la local. True si hay entrada analizada."""
+        entry = self.instruments.get(ticker)
+        try:
+            version = await asyncio.to_thread(shared_store.version, ticker)
+            if version is None and entry is not None:
+                # El líder lo desalojó por inactividad y se volvió a consultar: re-publicar
+                await self._publish(ticker)
+                return True
+            if version is None or (entry is not None and version <= entry.get("version", 0)):
+                return entry is not None
+            shared = await asyncio.to_thread(shared_store.load, ticker)
+        except Exception as e:
+            _logger.error(f"❌ Error reading {ticker} from shared store: {e}")
+            return entry is not None
+        
+        if shared is None or shared["analysis"] is None:
+            return entry is not None
+        # Mientras se leía el store pudo publicarse algo más nuevo desde este worker
+        entry = self.instruments.get(ticker)
+        if entry is not None and shared["version"] <= entry.get("version", 0):
+            return True
+        self._adopt(ticker, shared)
+        return True
+
+    async def adopt_shared(self, ticker: str) -> bool:
+        """Trae del store compartido el ticker si otro worker ya lo analizó. True si quedó en cache."""
+        return await self._sync_ticker(ticker.upper())
 
-    def _get_news_hash(self, instrument_data) -> str:
-        """Genera un hash basado en las noticias actuales."""
+    async def stagger_sections(self, ticker: str, max_fraction: float):
+        """Desfasa los vencimientos de las secciones del ticker y publica el resultado."""
+        ticker = ticker.upper()
+        entry = self.instruments.get(ticker)
+        if entry is not None and max_fraction > 0:
+            entry["data"].stagger_updates(max_fraction)
+            await self._publish(ticker, with_analysis=False)
+
+    async def _sync_from_store(self):
+        """(Líder) recoge tickers publicados por otros workers para refrescarlos."""
         try:
-            news = instrument_data.news
-            if news and isinstance(news, str):
-                return str(hash(news[:500]))
-            return str(hash(""))
+            versions = await asyncio.to_thread(shared_store.versions)
+        except Exception as e:
+            _logger.error(f"❌ Error listing shared store: {e}")
+            return
+        for ticker, version in versions.items():
+            entry = self.instruments.get(ticker)
+            if entry is None or version > entry.get("version", 0):
+                await self._sync_ticker(ticker)
+        
+        # Regeneraciones pedidas por la API (modo external)
+        try:
+            requested = await asyncio.to_thread(shared_store.pop_refresh_requests)
+        except Exception as e:
+            _logger.error(f"❌ Error reading refresh requests: {e}")
+            return
+        soft_ttl = timedelta(minutes=env_settings.analysis_soft_ttl_minutes)
+        for ticker in requested:
+            entry = self.instruments.get(ticker)
+            if entry is not None and datetime.now() - entry["analysis_time"] > soft_ttl:
+                self._revalidate(ticker)
+
+    def _get_news_fingerprints(self, instrument_data) -> frozenset[str]:
+        """Set estable de fingerprints (sha1) de los artículos actuales."""
+        try:
+            return news_fingerprints(instrument_data.news)
         except Exception:
-            return str(hash(""))
+            return frozenset()
 
-    async def _regenerate_analysis(self, ticker: str):
-        """Regenera el análisis para un ticker."""
+    async def _regenerate_analysis(
+        self, 
+        ticker: str, 
+        news_delta: dict = None, 
+        priority: Priority = Priority.BACKGROUND,
+        raise_errors: bool = False
+    ):
+        """
+        Regenera el análisis para un ticker.
+        Si viene `news_delta`, los artículos nuevos se destacan en el prompt.
+        Por defecto corre con prioridad BACKGROUND en el dispatcher LLM.
+        Los errores solo se loguean, salvo con `raise_errors=True`.
+        """
         if ticker not in self.instruments:
             return
             
         entry = self.instruments[ticker]
-        _logger.info(f"🤖 Regenerating analysis for {ticker}...")
+        _logger.info("🤖 Regenerating analysis for %s", ticker, extra=log_fields(sample="regen"))
         
         try:
-            if entry["type"] == "ETF":
-                new_analysis = await analyze_etf(entry["data"])
-            else:
-                new_analysis = await analyze_stock(entry["data"])
+            with llm_priority(priority):
+                if entry["type"] == "ETF":
+                    new_analysis = await analyze_etf(entry["data"], news_delta=news_delta)
+                else:
+                    new_analysis = await analyze_stock(entry["data"], news_delta=news_delta)
             
             entry["analysis"] = new_analysis
             entry["analysis_time"] = datetime.now()
-            _logger.info(f"✅ Analysis regenerated for {ticker}")
+            await self._publish(ticker)
+            _logger.info("✅ Analysis regenerated for %s", ticker, extra=log_fields(sample="regen"))
         except Exception as e:
+            # Se conserva el análisis anterior (y su analysis_time) para reintentar luego
             _logger.error(f"❌ Error regenerating analysis for {ticker}: {e}")
+            if raise_errors:
+                raise
 
     async def get_or_create_instrument(self, ticker: str):
         """
         Obtiene datos del cache o crea nueva instancia.
         Detecta automáticamente si es Stock o ETF.
+        
+        Stale-while-revalidate: un análisis más viejo que el soft TTL se retorna
+        igual y se regenera en background (una sola vez por ticker); solo pasado
+        el hard TTL la request espera la regeneración, y si falla se lanza
+        AnalysisUnavailable (no se sirve un análisis más viejo que el hard TTL).
         """
         ticker = ticker.upper()
+        self._last_access[ticker] = time.time()
         
-        # 1. Si ya existe en caché
-        if ticker in self.instruments:
+        # 1. Si ya existe en caché (propio o publicado por otro worker)
+        if await self._sync_ticker(ticker):
             entry = self.instruments[ticker]
+            age = datetime.now() - entry["analysis_time"]
             
-            # Regenerar si es muy viejo
-            if datetime.now() - entry["analysis_time"] > timedelta(hours=1):
-                _logger.info(f"🔄 Regenerating stale analysis for {ticker}...")
-                await self._regenerate_analysis(ticker)
+            if age > timedelta(minutes=env_settings.analysis_hard_ttl_minutes):
+                _logger.info("🔄 Analysis for %s past hard TTL, regenerating inline", ticker, extra=log_fields(sample="swr"))
+                try:
+                    # shield: si el cliente se desconecta, la regeneración sigue para el resto
+                    await asyncio.shield(self._revalidate(ticker, priority=Priority.INTERACTIVE))
+                except Exception as e:
+                    raise AnalysisUnavailable(f"Analysis for {ticker} expired and could not be regenerated: {e}") from e
+            elif age > timedelta(minutes=env_settings.analysis_soft_ttl_minutes):
+                _logger.info("♻️ Serving stale analysis for %s while revalidating", ticker, extra=log_fields(sample="swr"))
+                await self._request_revalidation(ticker)
             
             return entry["data"], entry["analysis"], entry["type"]
 
-        # 2. Detectar tipo de instrumento
-        instrument_type = "ETF" if is_etf(ticker) else "STOCK"
-        _logger.info(f"✨ Initializing monitoring for {ticker} (Type: {instrument_type})...")
+        # 2. Cold miss: una sola carga + análisis por ticker, compartida entre requests.
+        # Si todas las requests que la esperan se cancelan, se cancela también.
+        return await shared_work.run(f"analyze:{ticker}", lambda: self._create_instrument(ticker))
+
+    async def _create_instrument(self, ticker: str):
+        """Descarga los datos, genera el análisis y lo guarda en el cache."""
+        # 1. Obtener datos (Stock o ETF)
+        instrument_data, instrument_type = await self.fetch_instrument_data(ticker)
         
-        # 3. Crear instancia según tipo
+        # 2. Generar análisis según tipo
         if instrument_type == "ETF":
-            instrument_data = await ETFData.create(ticker)
             analysis = await analyze_etf(instrument_data)
         else:
-            instrument_data = await StockData.create(ticker)
             analysis = await analyze_stock(instrument_data)
         
-        # 4. Guardar en caché
+        # 3. Guardar en caché y programar actualizaciones
+        await self.store_instrument(ticker, instrument_data, instrument_type, analysis)
+        
+        return instrument_data, analysis, instrument_type
+
+    def _revalidate(self, ticker: str, priority: Priority = Priority.BACKGROUND) -> asyncio.Task:
+        """
+        Lanza la regeneración del análisis si no hay otra en curso para el ticker.
+        Retorna la task (nueva o existente) para quien necesite esperarla: si la
+        regeneración falla, la task termina con el error.
+        """
+        task = self._revalidations.get(ticker)
+        if task is None or task.done():
+            task = asyncio.create_task(
+                self._regenerate_analysis(ticker, priority=priority, raise_errors=True)
+            )
+            self._revalidations[ticker] = task
+            task.add_done_callback(lambda t: self._revalidation_done(ticker, t))
+        return task
+
+    def _revalidation_done(self, ticker: str, task: asyncio.Task):
+        self._revalidations.pop(ticker, None)
+        # Marca el error como leído: en background nadie espera la task (ya se logueó)
+        if not task.cancelled():
+            task.exception()
+
+    async def _request_revalidation(self, ticker: str):
+        """
+        Regenera en background: en este proceso si corre el scheduler, o pidiéndoselo
+        al servicio de ingesta (que publica el resultado en el store compartido).
+        """
+        if self.scheduler.running:
+            self._revalidate(ticker)
+            return
+        try:
+            await asyncio.to_thread(shared_store.request_refresh, ticker)
+        except Exception as e:
+            _logger.error(f"❌ Error requesting refresh for {ticker}: {e}")
+
+    def analysis_freshness(self, ticker: str) -> dict:
+        """Edad del análisis cacheado y si se está sirviendo stale."""
+        ticker = ticker.upper()
+        entry = self.instruments.get(ticker)
+        if entry is None:
+            return {"stale": False, "analysis_age_seconds": None, "revalidating": False}
+        
+        age = datetime.now() - entry["analysis_time"]
+        return {
+            "stale": age > timedelta(minutes=env_settings.analysis_soft_ttl_minutes),
+            "analysis_age_seconds": round(age.total_seconds(), 1),
+            "revalidating": ticker in self._revalidations
+        }
+
+    async def fetch_instrument_data(self, ticker: str, partial: bool = False):
+        """
+        Obtiene los datos de un instrumento sin generar el análisis.
+        Usa el cache si existe; si no, detecta el tipo y descarga todo.
+        
+        Con `partial=True` se respetan los deadlines por fetcher: las secciones
+        lentas quedan pending y se completan en el objeto cacheado. Sin `partial`
+        se esperan todas (el análisis necesita los datos completos).
+        """
+        ticker = ticker.upper()
+        self._last_access[ticker] = time.time()
+        if await self._sync_ticker(ticker):
+            entry = self.instruments[ticker]
+            return entry["data"], entry["type"]
+        
+        if ticker in self._unanalyzed:
+            instrument_data, instrument_type = self._unanalyzed[ticker]
+            if not partial:
+                await instrument_data.wait_pending()
+            elif instrument_data.stale_sections():
+                asyncio.create_task(instrument_data.refresh_stale())
+            return instrument_data, instrument_type
+        
+        instrument_data, instrument_type = await shared_work.run(
+            f"data:{ticker}", lambda: self._load_instrument_data(ticker, partial)
+        )
+        if not partial:
+            await instrument_data.wait_pending()
+        return instrument_data, instrument_type
+
+    async def _load_instrument_data(self, ticker: str, partial: bool):
+        """Detecta el tipo y descarga todas las secciones del instrumento."""
+        shared = await asyncio.to_thread(shared_store.load, ticker)
+        if shared is not None:
+            # Otro worker ya cargó los datos (sin análisis): se reutilizan
+            data_cls = ETFData if shared["type"] == "ETF" else StockData
+            instrument_data = data_cls.from_snapshot(ticker, shared["snapshot"])
+            self._unanalyzed[ticker] = (instrument_data, shared["type"])
+            if instrument_data.stale_sections():
+                if partial:
+                    asyncio.create_task(instrument_data.refresh_stale())
+                else:
+                    await instrument_data.refresh_stale()
+            return instrument_data, shared["type"]
+        
+        instrument_type = "ETF" if await asyncio.to_thread(is_etf, ticker) else "STOCK"
+        _logger.info(f"✨ Initializing monitoring for {ticker} (Type: {instrument_type})...")
+        
+        if instrument_type == "ETF":
+            instrument_data = await ETFData.create(ticker, use_deadlines=partial)
+        else:
+            instrument_data = await StockData.create(ticker, use_deadlines=partial)
+        
+        self._unanalyzed[ticker] = (instrument_data, instrument_type)
+        await self._publish(ticker)
+        return instrument_data, instrument_type
+
+    def is_cached(self, ticker: str) -> bool:
+        """True si ya hay datos cargados (con o sin análisis) para el ticker."""
+        ticker = ticker.upper()
+        return ticker in self.instruments or ticker in self._unanalyzed
+
+    def get_fresh_analysis(self, ticker: str):
+        """Retorna el análisis cacheado si existe y no pasó el soft TTL, si no None."""
+        entry = self.instruments.get(ticker.upper())
+        if entry and datetime.now() - entry["analysis_time"] <= timedelta(minutes=env_settings.analysis_soft_ttl_minutes):
+            return entry["analysis"]
+        return None
+
+    async def store_instrument(self, ticker: str, instrument_data, instrument_type: str, analysis: str):
+        """Guarda (o actualiza) datos + análisis en el cache; los refresh los reparte `_refresh_sweep`."""
+        ticker = ticker.upper()
+        self._unanalyzed.pop(ticker, None)
+        
         self.instruments[ticker] = {
             "data": instrument_data,
             "analysis": analysis,
             "analysis_time": datetime.now(),
             "type": instrument_type,
-            "last_news_hash": self._get_news_hash(instrument_data)
+            "news_fingerprints": self._get_news_fingerprints(instrument_data)
         }
+        await self._publish(ticker)
+
+    # ----- refresh por popularidad -----
+
+    def _allocate_refresh_budget(self, scores: dict[str, dict]) -> dict[str, float]:
+        """
+        Reparte el presupuesto por minuto: primero el mínimo de cada ticker de la
+        watchlist y el resto en proporción al score de popularidad. Si los mínimos
+        no entran en el presupuesto se achican por igual hasta ocuparlo entero.
+        """
+        pinned = pinned_tickers()
+        budget = env_settings.refresh_budget_per_minute
+        pinned_count = sum(1 for ticker in self.instruments if ticker in pinned)
+        floor = env_settings.refresh_pinned_floor
+        if pinned_count and floor * pinned_count > budget:
+            floor = budget / pinned_count
+        allocation = {
+            ticker: floor if ticker in pinned else 0.0
+            for ticker in self.instruments
+        }
+        remaining = max(0.0, budget - sum(allocation.values()))
         
-        # 5. Programar actualizaciones
-        self._schedule_updates(ticker)
-        
-        return instrument_data, analysis, instrument_type
+        weights = {ticker: scores.get(ticker, {}).get("score", 0.0) for ticker in allocation}
+        total = sum(weights.values())
+        if total > 0:
+            for ticker, weight in weights.items():
+                allocation[ticker] += remaining * weight / total
+        return allocation
+
+    async def _evict_idle(self, scores: dict[str, dict]) -> list[str]:
+        """Saca del cache (local y compartido) los tickers sin accesos hace mucho."""
+        pinned = pinned_tickers()
+        max_idle = env_settings.refresh_evict_idle_hours * 3600
+        evicted = []
+        for ticker in list(self.instruments):
+            # Sin registro de popularidad se cuenta desde el último análisis
+            idle = scores.get(ticker, {}).get("idle_seconds")
+            if idle is None:
+                idle = (datetime.now() - self.instruments[ticker]["analysis_time"]).total_seconds()
+            if ticker in pinned or idle < max_idle or ticker in self._revalidations:
+                continue
+            self._forget(ticker)
+            try:
+                await asyncio.to_thread(shared_store.evict, ticker)
+            except Exception as e:
+                _logger.error(f"❌ Error evicting {ticker} from shared store: {e}")
+            evicted.append(ticker)
+        if evicted:
+            _logger.info(f"🧹 Evicted idle tickers: {', '.join(evicted)}")
+        return evicted
 
-    def _schedule_updates(self, ticker: str):
-        """Configura los jobs de actualización automática."""
+    def _forget(self, ticker: str):
+        """Saca el ticker del cache local de este worker."""
+        self.instruments.pop(ticker, None)
+        self._unanalyzed.pop(ticker, None)
+        self._refresh_credits.pop(ticker, None)
+        self._last_access.pop(ticker, None)
+        self._publish_locks.pop(ticker, None)
+
+    def _evict_local_idle(self, include_analyzed: bool = True) -> list[str]:
+        """
+        Saca del cache local los tickers que este worker no sirve hace más de
+        `refresh_evict_idle_hours`. El store compartido no se toca (lo administra
+        el líder): si se vuelven a pedir, se adoptan de ahí.
+        """
+        pinned = pinned_tickers()
+        max_idle = env_settings.refresh_evict_idle_hours * 3600
+        now = time.time()
+        evicted = []
+        candidates = set(self._unanalyzed) | (set(self.instruments) if include_analyzed else set())
+        for ticker in candidates:
+            # Entradas nunca servidas aquí (adoptadas, prewarm): se cuenta desde ahora
+            last_access = self._last_access.setdefault(ticker, now)
+            if ticker in pinned or ticker in self._revalidations or now - last_access < max_idle:
+                continue
+            self._forget(ticker)
+            evicted.append(ticker)
+        if evicted:
+            _logger.info(f"🧹 Evicted idle tickers from local cache: {', '.join(evicted)}")
+        return evicted
+
+    async def _local_eviction_loop(self):
+        while True:
+            await asyncio.sleep(_LOCAL_EVICTION_INTERVAL_S)
+            # Los analizados del líder se desalojan en _refresh_sweep (local + store)
+            try:
+                self._evict_local_idle(include_analyzed=not self.is_leader)
+            except Exception as e:
+                _logger.error(f"❌ Error evicting local cache: {e}")
+
+    async def _refresh_sweep(self):
+        """
+        Job por minuto (solo en el líder): cada ticker acumula refresh según su parte
+        del presupuesto y los gasta en sus secciones vencidas, empezando por la más atrasada.
+        Los tickers poco consultados acumulan lento y se refrescan con menos frecuencia.
+        """
+        try:
+            scores = await asyncio.to_thread(popularity.scores)
+        except Exception as e:
+            _logger.error(f"❌ Error reading popularity: {e}")
+            scores = {}
         
-        self.scheduler.add_job(
-            self._update_news, 
-            'interval', 
-            minutes=30, 
-            args=[ticker], 
-            id=f"{ticker}_news",
-            replace_existing=True
-        )
+        await self._evict_idle(scores)
+        allocation = self._allocate_refresh_budget(scores)
         
-        self.scheduler.add_job(
-            self._update_sentiment, 
-            'interval', 
-            minutes=15, 
-            args=[ticker], 
-            id=f"{ticker}_sentiment",
-            replace_existing=True
-        )
+        plan = {}
+        tasks = []
+        for ticker, share in allocation.items():
+            data = self.instruments[ticker]["data"]
+            # Tope: no acumular más de un refresh completo del instrumento
+            credits = min(self._refresh_credits.get(ticker, 0.0) + share, float(len(data.SECTIONS)))
+            reasons = data.cadence()
+            stale = sorted(
+                data.stale_sections(),
+                key=lambda s: (data.section_age(s) or timedelta.max) / data.effective_ttl(s, reasons),
+                reverse=True
+            )
+            sections = stale[:int(credits)]
+            self._refresh_credits[ticker] = credits - len(sections)
+            plan[ticker] = {
+                "score": round(scores.get(ticker, {}).get("score", 0.0), 3),
+                "share_per_minute": round(share, 3),
+                "credits": round(self._refresh_credits[ticker], 3),
+                "refreshing": sections,
+                "cadence": reasons,
+            }
+            if sections:
+                tasks.append(self._refresh_ticker_sections(ticker, sections))
         
-        _logger.info(f"⏰ Scheduled updates for {ticker}")
+        self._refresh_plan = plan
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _refresh_ticker_sections(self, ticker: str, sections: list[str]):
+        """Refresca las secciones indicadas (noticias pasan por el diff que decide si regenerar)."""
+        if ticker not in self.instruments:
+            return
+        data = self.instruments[ticker]["data"]
+        others = [s for s in sections if s != "news"]
+        try:
+            if others:
+                await asyncio.gather(*(data.refresh_section(s) for s in others))
+                await self._publish(ticker, with_analysis=False)
+            if "news" in sections:
+                await self._update_news(ticker)
+        except Exception as e:
+            _logger.error(f"❌ Error refreshing {ticker} ({', '.join(sections)}): {e}")
 
-    def _update_news(self, ticker: str):
-        """Actualiza noticias y regenera análisis si hay cambios."""
+    def refresh_metrics(self) -> dict:
+        """Último reparto del presupuesto de refresh por ticker."""
+        return {
+            "budget_per_minute": env_settings.refresh_budget_per_minute,
+            "watchlist": load_watchlist(),
+            "tickers": self._refresh_plan,
+        }
+
+    async def _update_news(self, ticker: str):
+        """Actualiza noticias y regenera análisis solo si llegan artículos nuevos."""
         if ticker not in self.instruments:
             return
         
         entry = self.instruments[ticker]
-        old_hash = entry.get("last_news_hash", "")
         
-        _logger.debug(f"📰 Auto-refreshing NEWS for {ticker}")
-        entry["data"].refresh_news()
+        _logger.debug("📰 Auto-refreshing NEWS for %s", ticker)
+        with llm_priority(Priority.BACKGROUND):
+            await entry["data"].refresh_news()
+        
+        delta = diff_news(entry.get("news_fingerprints"), entry["data"].news)
+        entry["news_fingerprints"] = delta["fingerprints"]
+        await self._publish(ticker, with_analysis=False)
         
-        new_hash = self._get_news_hash(entry["data"])
+        if delta["removed"]:
+            _logger.debug("🗑️ %d articles dropped out of the window for %s", len(delta["removed"]), ticker)
         
-        if new_hash != old_hash:
-            _logger.info(f"🆕 New news detected for {ticker}!")
-            entry["last_news_hash"] = new_hash
+        if len(delta["added"]) >= env_settings.news_regen_min_new_articles:
+            _logger.info("🆕 %d new articles detected for %s", len(delta["added"]), ticker, extra=log_fields(sample="regen"))
             
             self.scheduler.add_job(
                 self._regenerate_analysis,
                 'date',
                 run_date=datetime.now(),
-                args=[ticker],
+                args=[ticker, delta],
                 id=f"{ticker}_regen_{datetime.now().timestamp()}",
                 replace_existing=False
             )
 
-    def _update_sentiment(self, ticker: str):
-        """Actualiza sentimiento."""
-        if ticker in self.instruments:
-            _logger.debug(f"🧠 Auto-refreshing SENTIMENT for {ticker}")
-            self.instruments[ticker]["data"].refresh_sentiment()
-
     # Mantener compatibilidad con código existente
     async def get_or_create_stock(self, ticker: str):
         """Wrapper para compatibilidad."""
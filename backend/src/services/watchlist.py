@@ -0,0 +1,30 @@
+"""
+Watchlist: tickers fijados (`watchlist` más los de `watchlist_file`).
+Se precalientan al arrancar, tienen un mínimo de refresh y nunca se desalojan.
+"""
+
+from settings.env_config import env_settings
+from utils.logger import setup_logging
+
+_logger = setup_logging()
+
+
+def load_watchlist() -> list[str]:
+    """Tickers de `watchlist` más los de `watchlist_file` (uno por línea, # comenta), sin duplicados."""
+    tickers = [t.strip().upper() for t in env_settings.watchlist if t.strip()]
+    path = env_settings.watchlist_file
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    ticker = line.split("#", 1)[0].strip().upper()
+                    if ticker:
+                        tickers.append(ticker)
+        except OSError as e:
+            _logger.error(f"❌ Error reading watchlist file {path}: {e}")
+    return list(dict.fromkeys(tickers))
+
+
+def pinned_tickers() -> set[str]:
+    """Set de tickers fijados (se relee el archivo: puede cambiar sin reiniciar)."""
+    return set(load_watchlist())
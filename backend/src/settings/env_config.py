@@ -21,7 +21,9 @@ class Settings(BaseSettings):
     
     # Logging
     log_level: str = "INFO"
-    
+    log_format: str = "text"  # "text" (formato clásico + campos key=value) o "kv" (toda la línea en key=value)
+    log_sample_every: int = 20  # Logs de alta frecuencia (fetches): se emite 1 de cada N; 1 = todos
+
     # API Keys
     google_api_key: Optional[str] = None
     tavily_api_key: Optional[str] = None
@@ -33,6 +35,81 @@ class Settings(BaseSettings):
     cors_origins: list = ["http://localhost:8100",
                           "http://localhost:5173"]
     
+    # Noticias
+    news_fetch_workers: int = 8  # Hilos para proveedores bloqueantes (Yahoo, Google News)
+    news_dedup_threshold: float = 0.6  # Similitud (Jaccard estimado) para considerar duplicado
+    news_dedup_window_hours: int = 72  # Ventana del índice móvil de deduplicación por ticker
+    news_store_dir: str = "data/news"  # Store persistente de artículos por ticker
+    news_store_retention_days: int = 7
+    news_cursor_overlap_minutes: int = 10  # Solapamiento al pedir artículos posteriores al cursor
+    news_regen_min_new_articles: int = 1  # Artículos nuevos necesarios para regenerar el análisis
+    news_summary_cache_size: int = 256  # Entradas del LRU en memoria de resúmenes LLM
+    news_summary_cache_dir: str = "data/news_summaries"  # Segundo nivel en disco
+    news_summary_incremental: bool = True  # Actualizar el resumen solo con artículos nuevos
+    news_summary_full_rebuild_hours: int = 6  # Antigüedad máxima antes de reconstruir completo
+    news_summary_max_incremental_updates: int = 5  # Actualizaciones incrementales antes de reconstruir
+    news_summary_max_articles: int = 100  # Artículos considerados en el resumen
+    news_summary_batch_size: int = 10  # Artículos por lote en el resumen map-reduce
+    news_summary_llm_concurrency: int = 4  # Llamadas LLM simultáneas para resúmenes
+
+    # LLM dispatcher
+    llm_max_concurrency: int = 6  # Llamadas LLM simultáneas en total (por proceso)
+    llm_background_max_concurrency: int = 3  # Slots máximos para trabajo del scheduler
+    llm_interactive_queue_timeout: float = 30  # Segundos máximos en cola (requests de usuarios)
+    llm_background_queue_timeout: float = 600  # Segundos máximos en cola (scheduler)
+
+    # Prompts de análisis
+    analysis_prompt_compact: bool = False  # Usa la variante compacta (sin N/A, noticias resumidas)
+    analysis_prompt_token_budget: int = 3000  # Presupuesto aproximado de tokens para los datos del prompt compacto
+
+    # Frescura del análisis (stale-while-revalidate)
+    analysis_soft_ttl_minutes: int = 60  # Pasado este tiempo se sirve el análisis marcado stale y se regenera en background
+    analysis_hard_ttl_minutes: int = 360  # Pasado este tiempo la request espera la regeneración
+
+    # Jobs de análisis asíncronos
+    analysis_job_workers: int = 4  # Workers que procesan jobs en paralelo (por proceso)
+    analysis_job_max_queue: int = 100  # Jobs en espera (entre todos los workers) antes de rechazar con 429
+    analysis_job_retention_minutes: int = 30  # Tiempo que se conserva un job terminado para consultarlo
+    analysis_job_timeout_minutes: int = 15  # Un job activo sin cambios por más tiempo se da por abandonado (worker caído)
+
+    # Hedged requests a upstreams lentos
+    hedging_enabled: bool = True
+    hedge_sources: list[str] = ["yahoo_info", "yahoo_options", "tradingview"]  # Fuentes con hedging habilitado
+    hedge_budget_ratio: float = 0.05  # Requests extra permitidas por cada request primaria (5%)
+    hedge_budget_burst: float = 10  # Máximo de hedges acumulables
+    hedge_min_delay_ms: int = 200  # Espera mínima antes de lanzar el duplicado
+    hedge_min_samples: int = 20  # Muestras de latencia necesarias para calcular el p90
+    hedge_max_workers: int = 16  # Threads para llamadas con hedging
+
+    # Coordinación entre workers (scheduler con líder + cache compartido)
+    ingestion_mode: str = "embedded"  # "embedded": los workers de la API refrescan; "external": lo hace ingestion/entrypoint.py
+    shared_store_path: str = "data/shared_cache.sqlite3"  # SQLite compartido por los procesos de la máquina
+    leader_lease_seconds: float = 6  # Vencimiento del lease: tiempo máximo de failover si el líder muere
+    leader_renew_seconds: float = 2  # Cada cuánto se renueva/intenta tomar el lease
+    shared_sync_seconds: int = 15  # Cada cuánto el líder recoge los tickers publicados por otros workers
+
+    # Refresh por popularidad
+    watchlist: list[str] = []  # Tickers fijados: nunca se desalojan y tienen un mínimo de refresh
+    watchlist_file: Optional[str] = None  # Archivo opcional con más tickers (uno por línea)
+    refresh_budget_per_minute: float = 60  # Refresh de secciones (llamadas upstream) por minuto entre todos los tickers
+    refresh_pinned_floor: float = 1  # Mínimo de refresh por minuto para cada ticker de la watchlist
+    popularity_half_life_minutes: float = 360  # Vida media del score de accesos
+    refresh_evict_idle_hours: float = 48  # Tickers sin accesos por este tiempo salen del cache (salvo watchlist)
+
+    # Cadencia adaptativa (sesión del mercado + eventos)
+    cadence_enabled: bool = True  # Si es False se usan los TTL base de cada sección
+    cadence_earnings_window_hours: float = 24  # Ventana antes/después de earnings con refresh acelerado
+    cadence_volatility_threshold_pct: float = 4  # Variación diaria (%) considerada un pico de volatilidad
+    cadence_event_factor: float = 0.5  # Multiplicador del TTL durante eventos
+
+    # Precalentamiento de la watchlist al arrancar
+    prewarm_enabled: bool = True
+    prewarm_concurrency: int = 3  # Tickers cargándose a la vez
+    prewarm_rate_per_minute: float = 20  # Ritmo máximo de arranque de cargas
+    prewarm_stagger_fraction: float = 0.5  # Desfase aleatorio máximo (fracción del TTL) de los refresh
+    prewarm_retries: int = 1  # Reintentos por ticker antes de darlo por fallido
+    prewarm_ready_fraction: float = 1.0  # Fracción de la watchlist que debe quedar caliente para responder /ready
+
     # Paths
     google_application_credentials: str = '/home/rolalquiaga/credentials/ntg-ambiental-c0dcbb853294.json'    
 
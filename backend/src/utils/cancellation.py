@@ -0,0 +1,219 @@
+"""
+Cancelación con alcance de request.
+
+`shared_work` coalesce trabajo async por clave (single-flight) y cuenta cuántas
+requests lo están esperando: si todas se van (p. ej. el cliente cerró la
+pestaña), el trabajo se cancela; si queda alguna, sigue corriendo.
+
+`shared_streams` hace lo mismo con generadores async: un solo productor por
+clave y cada suscriptor recibe todos los fragmentos desde el principio.
+
+`cancel_on_disconnect` corre una corrutina de un endpoint y la cancela cuando
+el cliente se desconecta.
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from fastapi import Request
+
+from utils.logger import setup_logging
+
+_logger = setup_logging()
+
+
+class ClientDisconnected(Exception):
+    """El cliente cerró la conexión antes de recibir la respuesta."""
+
+
+class _SharedTask:
+    def __init__(self, key: str, task: asyncio.Task):
+        self.key = key
+        self.task = task
+        self.waiters = 0
+        self.started_at = time.monotonic()
+
+
+class SharedWork:
+    """Registro de trabajo en curso compartido entre requests."""
+
+    def __init__(self):
+        self._inflight: dict[str, _SharedTask] = {}
+        self._stats = {
+            "started": 0,
+            "coalesced": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "detached_waiters": 0,  # Requests que se fueron mientras otras seguían esperando
+            "client_disconnects": 0,
+        }
+        self._wasted_seconds = 0.0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta `factory()` una sola vez por clave y espera su resultado.
+        Si esta request se cancela y era la última esperando, el trabajo se cancela.
+        """
+        work = self._inflight.get(key)
+        if work is None:
+            work = _SharedTask(key, asyncio.create_task(factory()))
+            self._inflight[key] = work
+            self._stats["started"] += 1
+            work.task.add_done_callback(lambda _: self._on_done(work))
+        else:
+            self._stats["coalesced"] += 1
+
+        work.waiters += 1
+        try:
+            return await asyncio.shield(work.task)
+        finally:
+            work.waiters -= 1
+            if not work.task.done():
+                if work.waiters == 0:
+                    _logger.info(f"🛑 Nobody waiting for {key}, cancelling")
+                    work.task.cancel()
+                else:
+                    self._stats["detached_waiters"] += 1
+
+    def in_flight(self, key: str) -> bool:
+        """True si hay trabajo en curso para la clave."""
+        return key in self._inflight
+
+    def _on_done(self, work: _SharedTask):
+        if self._inflight.get(work.key) is work:
+            del self._inflight[work.key]
+
+        if work.task.cancelled():
+            self._stats["cancelled"] += 1
+            self._wasted_seconds += time.monotonic() - work.started_at
+        elif work.task.exception() is not None:
+            self._stats["failed"] += 1
+        else:
+            self._stats["completed"] += 1
+
+    def record_disconnect(self):
+        self._stats["client_disconnects"] += 1
+
+    def metrics(self) -> dict:
+        return {
+            **self._stats,
+            "in_flight": {key: work.waiters for key, work in self._inflight.items()},
+            "wasted_seconds": round(self._wasted_seconds, 2),
+        }
+
+
+shared_work = SharedWork()
+
+
+class _SharedStream:
+    def __init__(self, key: str):
+        self.key = key
+        self.items: list = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class SharedStreams:
+    """Single-flight para generadores async (p. ej. el análisis token a token)."""
+
+    def __init__(self):
+        self._inflight: dict[str, _SharedStream] = {}
+        self._stats = {"started": 0, "coalesced": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    async def subscribe(self, key: str, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Itera el stream de `factory()` (uno solo por clave). Si el último
+        suscriptor se va antes de que termine, el productor se cancela.
+        """
+        stream = self._inflight.get(key)
+        if stream is None:
+            stream = _SharedStream(key)
+            stream.task = asyncio.create_task(self._produce(stream, factory))
+            self._inflight[key] = stream
+            self._stats["started"] += 1
+        else:
+            self._stats["coalesced"] += 1
+
+        stream.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(stream.items):
+                    yield stream.items[index]
+                    index += 1
+                if stream.finished:
+                    if stream.error is not None:
+                        raise stream.error
+                    return
+                await stream._changed.wait()
+        finally:
+            stream.subscribers -= 1
+            if stream.subscribers == 0 and not stream.finished:
+                _logger.info(f"🛑 Nobody reading {key}, cancelling")
+                # Fuera del registro ya: una suscripción nueva arranca otro productor
+                if self._inflight.get(key) is stream:
+                    del self._inflight[key]
+                stream.task.cancel()
+
+    async def _produce(self, stream: _SharedStream, factory: Callable[[], AsyncIterator[Any]]):
+        try:
+            async for item in factory():
+                stream.items.append(item)
+                stream.notify()
+            self._stats["completed"] += 1
+        except asyncio.CancelledError:
+            self._stats["cancelled"] += 1
+            raise
+        except Exception as e:
+            stream.error = e
+            self._stats["failed"] += 1
+        finally:
+            stream.finished = True
+            stream.notify()
+            if self._inflight.get(stream.key) is stream:
+                del self._inflight[stream.key]
+
+    def metrics(self) -> dict:
+        return {
+            **self._stats,
+            "in_flight": {key: stream.subscribers for key, stream in self._inflight.items()},
+        }
+
+
+shared_streams = SharedStreams()
+
+
+async def cancel_on_disconnect(
+    request: Request,
+    awaitable: Awaitable[Any],
+    poll_interval: Optional[float] = 0.5
+) -> Any:
+    """
+    Espera `awaitable` revisando cada `poll_interval` si el cliente sigue conectado.
+    Si se desconecta cancela el trabajo y lanza ClientDisconnected.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                _logger.info(f"🔌 Client disconnected from {request.url.path}, cancelling request work")
+                shared_work.record_disconnect()
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise ClientDisconnected(request.url.path)
+    finally:
+        # Si el propio handler se cancela (shutdown), no dejar el trabajo huérfano
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,162 @@
+"""
+Hedged requests para upstreams con colas de latencia largas (Yahoo info,
+cadenas de opciones, TradingView).
+
+Si una llamada no respondió dentro del p90 móvil de su fuente se lanza un
+duplicado; gana la primera respuesta exitosa y la otra se cancela (si todavía
+no empezó) o se descarta. Un presupuesto global limita la tasa de requests extra.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Optional, TypeVar
+
+from settings.env_config import env_settings
+from utils.llm_usage import percentile
+
+T = TypeVar("T")
+
+
+class HedgedCaller:
+    """Ejecuta llamadas bloqueantes con hedging por fuente y presupuesto global."""
+
+    def __init__(
+        self,
+        sources: Iterable[str],
+        budget_ratio: float,
+        budget_burst: float,
+        min_delay_s: float,
+        min_samples: int,
+        max_workers: int,
+        enabled: bool = True
+    ):
+        self.sources = set(sources)
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self.min_delay_s = min_delay_s
+        self.min_samples = min_samples
+        self.enabled = enabled
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._tokens = budget_burst
+        self._latencies: dict[str, deque] = {}
+        self._stats: dict[str, dict] = {}
+
+    # ----- presupuesto -----
+
+    def _earn_token(self):
+        """Cada llamada primaria suma `budget_ratio` tokens (hasta `budget_burst`)."""
+        with self._lock:
+            self._tokens = min(self.budget_burst, self._tokens + self.budget_ratio)
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    # ----- latencias -----
+
+    def _count(self, source: str, key: str):
+        """Incrementa un contador de la fuente (se llama desde varios threads)."""
+        with self._lock:
+            stat = self._stats.setdefault(
+                source, {"calls": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0, "errors": 0}
+            )
+            stat[key] += 1
+
+    def _record(self, source: str, latency_s: float):
+        with self._lock:
+            self._latencies.setdefault(source, deque(maxlen=200)).append(latency_s)
+
+    def _hedge_delay(self, source: str) -> Optional[float]:
+        """p90 móvil de la fuente; None si todavía no hay muestras suficientes."""
+        with self._lock:
+            samples = list(self._latencies.get(source, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return max(self.min_delay_s, percentile(samples, 90))
+
+    def _timed(self, source: str, func: Callable[[], T], running: Optional[threading.Event] = None) -> T:
+        if running is not None:
+            running.set()
+        started = time.monotonic()
+        result = func()
+        self._record(source, time.monotonic() - started)
+        return result
+
+    # ----- API -----
+
+    def call(self, source: str, func: Callable[[], T]) -> T:
+        """Ejecuta `func()`; si `source` tiene hedging habilitado puede duplicarla."""
+        self._count(source, "calls")
+
+        if not self.enabled or source not in self.sources:
+            return self._timed(source, func)
+
+        self._earn_token()
+        delay = self._hedge_delay(source)
+        running = threading.Event()
+        primary = self._executor.submit(self._timed, source, func, running)
+        futures: list[Future] = [primary]
+
+        if delay is not None:
+            # El delay corre desde que la primaria arranca: la espera en la cola
+            # del pool no es lentitud del upstream y no debe disparar hedges
+            running.wait()
+            done, _ = wait(futures, timeout=delay)
+            if not done:
+                if self._take_token():
+                    self._count(source, "hedged")
+                    futures.append(self._executor.submit(self._timed, source, func))
+                else:
+                    self._count(source, "budget_denied")
+
+        error = None
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                futures.remove(future)
+                if future.exception() is None:
+                    for loser in futures:
+                        loser.cancel()
+                    if future is not primary:
+                        self._count(source, "hedge_wins")
+                    return future.result()
+                error = future.exception()
+
+        self._count(source, "errors")
+        raise error
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latencies = {source: list(values) for source, values in self._latencies.items()}
+            stats = {source: dict(stat) for source, stat in self._stats.items()}
+            tokens = round(self._tokens, 2)
+        return {
+            "enabled": self.enabled,
+            "hedged_sources": sorted(self.sources),
+            "budget_tokens": tokens,
+            "sources": {
+                source: {
+                    **stat,
+                    "p50_s": percentile(latencies.get(source, []), 50),
+                    "p90_s": percentile(latencies.get(source, []), 90),
+                }
+                for source, stat in stats.items()
+            }
+        }
+
+
+hedger = HedgedCaller(
+    sources=env_settings.hedge_sources,
+    budget_ratio=env_settings.hedge_budget_ratio,
+    budget_burst=env_settings.hedge_budget_burst,
+    min_delay_s=env_settings.hedge_min_delay_ms / 1000,
+    min_samples=env_settings.hedge_min_samples,
+    max_workers=env_settings.hedge_max_workers,
+    enabled=env_settings.hedging_enabled
+)
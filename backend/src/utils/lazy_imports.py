@@ -0,0 +1,28 @@
+"""
+Imports diferidos para librerías pesadas (yfinance, pandas, tradingview_ta...).
+
+`lazy_import("yfinance")` retorna el módulo sin ejecutarlo; el import real
+ocurre en el primer acceso a un atributo (`yf.Ticker(...)`), así importar la
+API no paga el costo de librerías que solo usan los fetchers.
+"""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Módulo `name` que se carga recién cuando se usa (importlib.util.LazyLoader)."""
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
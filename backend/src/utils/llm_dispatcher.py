@@ -0,0 +1,287 @@
+"""
+Dispatcher central de llamadas al LLM.
+
+Todas las llamadas a Settings.llm pasan por aquí para aplicar:
+- un límite global de concurrencia,
+- clases de prioridad con colas separadas (interactivo antes que background),
+- un tope de slots para background, para que siempre quede lugar para el usuario,
+- deadlines de espera en cola,
+- métricas de profundidad de cola y tiempo de espera,
+- contabilidad de tokens y latencia por llamada (ver utils/llm_usage).
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import AsyncIterator, Optional
+
+from settings.env_config import env_settings
+from utils.llm_usage import llm_usage, percentile, usage_from_response
+from utils.logger import setup_logging
+from utils.models import aget_llm, tokenizer
+
+_logger = setup_logging()
+
+
+class Priority(IntEnum):
+    """Clases de prioridad (menor valor = más prioritario)."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """La llamada no obtuvo un slot antes de su deadline."""
+
+
+# Prioridad del contexto actual. Las requests HTTP usan el default (INTERACTIVE);
+# los jobs del scheduler la bajan con llm_priority(Priority.BACKGROUND).
+_current_priority: ContextVar[Priority] = ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: Priority):
+    """Fija la prioridad de las llamadas LLM hechas dentro del bloque."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class LLMDispatcher:
+    """Planificador de llamadas LLM con prioridades y concurrencia acotada."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        class_limits: dict[Priority, int],
+        queue_timeouts: dict[Priority, float]
+    ):
+        self.max_concurrency = max_concurrency
+        self.class_limits = class_limits
+        self.queue_timeouts = queue_timeouts
+        self._queues: dict[Priority, deque] = {p: deque() for p in Priority}
+        self._active: dict[Priority, int] = {p: 0 for p in Priority}
+        self._wait_times: dict[Priority, deque] = {p: deque(maxlen=500) for p in Priority}
+        self._counters: dict[Priority, dict] = {
+            p: {"submitted": 0, "completed": 0, "failed": 0, "expired": 0} for p in Priority
+        }
+
+    # ----- slots -----
+
+    def _total_active(self) -> int:
+        return sum(self._active.values())
+
+    def _has_capacity(self, priority: Priority) -> bool:
+        return (
+            self._total_active() < self.max_concurrency
+            and self._active[priority] < self.class_limits.get(priority, self.max_concurrency)
+        )
+
+    def _grant_next(self):
+        """Entrega slots libres a los waiters, empezando por la clase más prioritaria."""
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue and self._has_capacity(priority):
+                waiter = queue.popleft()
+                if waiter.done():
+                    continue
+                self._active[priority] += 1
+                waiter.set_result(None)
+
+    async def _acquire(self, priority: Priority, deadline: Optional[float]):
+        started = time.monotonic()
+        self._counters[priority]["submitted"] += 1
+
+        higher_waiting = any(
+            not w.done() for p in Priority if p <= priority for w in self._queues[p]
+        )
+        if not higher_waiting and self._has_capacity(priority):
+            self._active[priority] += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._queues[priority].append(waiter)
+            self._grant_next()
+            timeout = deadline if deadline is not None else self.queue_timeouts.get(priority)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            except asyncio.TimeoutError:
+                self._abandon(priority, waiter)
+                self._counters[priority]["expired"] += 1
+                raise LLMDeadlineExceeded(
+                    f"LLM call ({priority.name}) waited more than {timeout}s for a slot"
+                )
+            except asyncio.CancelledError:
+                self._abandon(priority, waiter)
+                raise
+
+        self._wait_times[priority].append(time.monotonic() - started)
+
+    def _abandon(self, priority: Priority, waiter: asyncio.Future):
+        """Saca de la cola a un waiter que venció o fue cancelado."""
+        if waiter.done() and not waiter.cancelled():
+            # El slot llegó justo al vencer el deadline: devolverlo
+            self._release(priority)
+            return
+        waiter.cancel()
+        try:
+            self._queues[priority].remove(waiter)
+        except ValueError:
+            pass
+
+    def _release(self, priority: Priority):
+        self._active[priority] -= 1
+        self._grant_next()
+
+    # ----- API -----
+
+    async def acomplete(
+        self,
+        prompt: str,
+        priority: Optional[Priority] = None,
+        deadline: Optional[float] = None,
+        ticker: Optional[str] = None,
+        call_type: str = "other"
+    ):
+        """
+        Equivalente a Settings.llm.acomplete pasando por el planificador.
+        `deadline` es el tiempo máximo (segundos) de espera por un slot;
+        `ticker` y `call_type` se usan para la contabilidad de tokens.
+        """
+        priority = _current_priority.get() if priority is None else priority
+        await self._acquire(priority, deadline)
+        started = time.monotonic()
+        response = None
+        try:
+            response = await (await aget_llm()).acomplete(prompt)
+            self._counters[priority]["completed"] += 1
+            return response
+        except Exception:
+            self._counters[priority]["failed"] += 1
+            raise
+        finally:
+            self._release(priority)
+            prompt_tokens, completion_tokens = usage_from_response(response)
+            self._record_usage(
+                ticker, call_type, priority, prompt, response.text if response is not None else "",
+                time.monotonic() - started, response is not None, prompt_tokens, completion_tokens
+            )
+
+    async def astream_complete(
+        self,
+        prompt: str,
+        priority: Optional[Priority] = None,
+        deadline: Optional[float] = None,
+        ticker: Optional[str] = None,
+        call_type: str = "other"
+    ) -> AsyncIterator:
+        """Equivalente a Settings.llm.astream_complete; el slot se mantiene durante todo el stream."""
+        priority = _current_priority.get() if priority is None else priority
+        await self._acquire(priority, deadline)
+        started = time.monotonic()
+        completion = []
+        ok = False
+        try:
+            stream = await (await aget_llm()).astream_complete(prompt)
+            async for chunk in stream:
+                if chunk.delta:
+                    completion.append(chunk.delta)
+                yield chunk
+            self._counters[priority]["completed"] += 1
+            ok = True
+        except Exception:
+            self._counters[priority]["failed"] += 1
+            raise
+        finally:
+            self._release(priority)
+            self._record_usage(
+                ticker, call_type, priority, prompt, "".join(completion),
+                time.monotonic() - started, ok
+            )
+
+    def _record_usage(
+        self,
+        ticker: Optional[str],
+        call_type: str,
+        priority: Priority,
+        prompt: str,
+        completion: str,
+        latency_s: float,
+        ok: bool,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None
+    ):
+        """
+        Registra la llamada. Si el proveedor no informa tokens se cuentan con el
+        tokenizer en un thread (un prompt largo no bloquea el loop). Nunca lanza:
+        se llama desde `finally` y no debe tapar el error original.
+        """
+        args = (ticker, call_type, priority, prompt, completion, latency_s, ok, prompt_tokens, completion_tokens)
+        try:
+            if prompt_tokens is not None and completion_tokens is not None:
+                self._count_and_record(*args)
+            else:
+                asyncio.get_running_loop().run_in_executor(None, self._count_and_record, *args)
+        except Exception as e:
+            _logger.error(f"❌ Error recording LLM usage: {e}")
+
+    @staticmethod
+    def _count_and_record(
+        ticker: Optional[str],
+        call_type: str,
+        priority: Priority,
+        prompt: str,
+        completion: str,
+        latency_s: float,
+        ok: bool,
+        prompt_tokens: Optional[int],
+        completion_tokens: Optional[int]
+    ):
+        try:
+            llm_usage.record(
+                ticker=ticker,
+                call_type=call_type,
+                trigger="scheduler" if priority == Priority.BACKGROUND else "user",
+                prompt_tokens=prompt_tokens if prompt_tokens is not None else len(tokenizer(prompt)),
+                completion_tokens=completion_tokens if completion_tokens is not None else len(tokenizer(completion)),
+                latency_s=latency_s,
+                ok=ok
+            )
+        except Exception as e:
+            _logger.error(f"❌ Error recording LLM usage: {e}")
+
+    def metrics(self) -> dict:
+        """Profundidad de cola, slots activos y tiempos de espera por clase."""
+        classes = {}
+        for priority in Priority:
+            waits = self._wait_times[priority]
+            classes[priority.name.lower()] = {
+                "queue_depth": sum(1 for w in self._queues[priority] if not w.done()),
+                "active": self._active[priority],
+                "limit": self.class_limits.get(priority, self.max_concurrency),
+                "wait_p50_s": percentile(waits, 50),
+                "wait_p95_s": percentile(waits, 95),
+                "wait_max_s": round(max(waits), 4) if waits else None,
+                **self._counters[priority]
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._total_active(),
+            "classes": classes
+        }
+
+
+llm_dispatcher = LLMDispatcher(
+    max_concurrency=env_settings.llm_max_concurrency,
+    class_limits={
+        Priority.INTERACTIVE: env_settings.llm_max_concurrency,
+        Priority.BACKGROUND: env_settings.llm_background_max_concurrency,
+    },
+    queue_timeouts={
+        Priority.INTERACTIVE: env_settings.llm_interactive_queue_timeout,
+        Priority.BACKGROUND: env_settings.llm_background_queue_timeout,
+    }
+)
@@ -0,0 +1,108 @@
+"""
+Contabilidad de uso del LLM por llamada.
+Cada llamada registra tokens de prompt/completion y latencia, atribuidos a
+ticker, tipo de llamada y origen (user / scheduler), y se agregan en ventanas móviles.
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Optional
+
+# Ventanas expuestas en el endpoint de métricas (nombre -> segundos)
+USAGE_WINDOWS = {"5m": 300, "1h": 3600, "24h": 86400}
+
+
+def percentile(values: list[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+def usage_from_response(response) -> tuple[Optional[int], Optional[int]]:
+    """
+    Extrae (prompt_tokens, completion_tokens) del raw de la respuesta de Gemini
+    si el proveedor los informa; si no, retorna (None, None).
+    """
+    raw = getattr(response, "raw", None)
+    if not isinstance(raw, dict):
+        return None, None
+    usage = raw.get("usage_metadata") or {}
+    return usage.get("prompt_token_count"), usage.get("candidates_token_count")
+
+
+class LLMUsageTracker:
+    """Registro en memoria de llamadas LLM con agregación por ventanas."""
+
+    def __init__(self, retention_seconds: int = max(USAGE_WINDOWS.values())):
+        self.retention_seconds = retention_seconds
+        self._events: deque[dict] = deque()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        ticker: Optional[str],
+        call_type: str,
+        trigger: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency_s: float,
+        ok: bool = True
+    ):
+        now = time.time()
+        with self._lock:
+            self._events.append({
+                "ts": now,
+                "ticker": (ticker or "N/A").upper(),
+                "call_type": call_type,
+                "trigger": trigger,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "latency_s": latency_s,
+                "ok": ok,
+            })
+            cutoff = now - self.retention_seconds
+            while self._events and self._events[0]["ts"] < cutoff:
+                self._events.popleft()
+
+    @staticmethod
+    def _aggregate(events: list[dict]) -> dict:
+        latencies = [e["latency_s"] for e in events]
+        return {
+            "calls": len(events),
+            "errors": sum(1 for e in events if not e["ok"]),
+            "prompt_tokens": sum(e["prompt_tokens"] for e in events),
+            "completion_tokens": sum(e["completion_tokens"] for e in events),
+            "latency_avg_s": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "latency_p95_s": percentile(latencies, 95),
+        }
+
+    def summary(self, window_seconds: int) -> dict:
+        """Totales y desgloses por ticker, tipo de llamada y origen dentro de la ventana."""
+        cutoff = time.time() - window_seconds
+        with self._lock:
+            events = [e for e in self._events if e["ts"] >= cutoff]
+
+        breakdowns = {}
+        for dimension in ("ticker", "call_type", "trigger"):
+            groups = defaultdict(list)
+            for event in events:
+                groups[event[dimension]].append(event)
+            breakdowns[f"by_{dimension}"] = {
+                key: self._aggregate(group)
+                for key, group in sorted(
+                    groups.items(),
+                    key=lambda kv: sum(e["prompt_tokens"] + e["completion_tokens"] for e in kv[1]),
+                    reverse=True
+                )
+            }
+
+        return {"total": self._aggregate(events), **breakdowns}
+
+    def snapshot(self) -> dict:
+        return {name: self.summary(seconds) for name, seconds in USAGE_WINDOWS.items()}
+
+
+llm_usage = LLMUsageTracker()
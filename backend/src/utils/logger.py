@@ -1,48 +1,171 @@
+"""
+Logging del proceso, configurado una sola vez.
+
+Los módulos llaman `setup_logging()` como siempre, pero los handlers se arman
+en la primera llamada: el logger compartido solo tiene un QueueHandler y un
+QueueListener en un thread aparte escribe a consola y archivo, así el event
+loop no hace I/O de archivo en cada log.
+
+- `setup_logging(log_level="DEBUG")` retorna un logger hijo (por módulo) con ese
+  nivel, sin cambiar el del resto. El archivo es uno solo por proceso: pedir
+  otro `file_path` después de la primera llamada deja un warning.
+
+- Campos estructurados: `_logger.info("Fetched info", extra=log_fields(ticker=t, source="yahoo"))`
+  se agregan como `key=value` (o toda la línea en key=value con LOG_FORMAT=kv).
+- Muestreo: `extra=log_fields(sample="fetch", ...)` emite 1 de cada
+  `log_sample_every` logs de esa clave (WARNING y superiores nunca se muestrean).
+"""
+
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import sys
+import threading
+from collections import defaultdict
+from typing import Optional
+
 from settings.env_config import env_settings
 
-def setup_logging(file_path='logs/logs.log', log_level: str = None):
-    # Get logger
-    logger = logging.getLogger(__name__)
-    
-    # Clear any existing handlers to prevent duplication
-    if logger.hasHandlers():
-        logger.handlers.clear()
-        
-    # Check if log file exists, create directory if needed
-    log_dir = os.path.dirname(os.path.abspath(file_path))
-    if log_dir and not os.path.exists(log_dir):
-        os.makedirs(log_dir, exist_ok=True)
-
-    # Create the file if it doesn't exist
-    if not os.path.exists(file_path):
-        with open(file_path, 'w') as f:
-            pass  # Create empty file
-
-    # Configurar nivel según ambiente
-    log_level = getattr(logging, env_settings.log_level.upper() if log_level is None else log_level.upper())
-    
-    # Create handlers
-    c_handler = logging.StreamHandler()
-    f_handler = logging.FileHandler(file_path)
-    c_handler.setLevel(log_level)
-    f_handler.setLevel(log_level)
-    
-    # Create formatters and add to handlers
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_file_path: Optional[str] = None
+
+
+def log_fields(sample: Optional[str] = None, **fields) -> dict:
+    """`extra=` para un log con campos key=value; `sample` agrupa logs de alta frecuencia a muestrear."""
+    extra = {"fields": fields}
+    if sample:
+        extra["sample_key"] = sample
+    return extra
+
+
+def _format_value(value) -> str:
+    text = str(value)
+    if not text or any(c in text for c in ' ="'):
+        return '"' + text.replace('"', '\\"') + '"'
+    return text
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Agrega los campos de `log_fields` al final; con `structured=True` toda la línea es key=value."""
+
+    def __init__(self, fmt: str, structured: bool = False):
+        super().__init__(fmt)
+        self.structured = structured
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = dict(getattr(record, "fields", None) or {})
+        if getattr(record, "sampled_every", 1) > 1:
+            fields["sample"] = f"1/{record.sampled_every}"
+
+        if not self.structured:
+            line = super().format(record)
+            if fields:
+                line += " " + " ".join(f"{k}={_format_value(v)}" for k, v in fields.items())
+            return line
+
+        # QueueHandler ya incorporó el traceback al mensaje: va en líneas aparte
+        record.message, _, trailer = record.getMessage().partition("\n")
+        base = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": f"{record.funcName}:{record.lineno}",
+            "msg": record.message,
+        }
+        line = " ".join(f"{k}={_format_value(v)}" for k, v in {**base, **fields}.items())
+        if record.exc_info and not trailer:
+            trailer = self.formatException(record.exc_info)
+        return line + "\n" + trailer if trailer else line
+
+
+class SamplingFilter(logging.Filter):
+    """Deja pasar 1 de cada `every` logs por `sample_key` (solo por debajo de WARNING)."""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        if key is None or self.every == 1 or record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            count = self._counts[key]
+            self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        record.sampled_every = self.every
+        return True
+
+
+def _level(log_level: Optional[str]) -> int:
+    return getattr(logging, (env_settings.log_level if log_level is None else log_level).upper())
+
+
+def _build(logger: logging.Logger, file_path: str, log_level: int):
+    global _listener, _file_path
+
+    log_dir = os.path.dirname(file_path)
+    os.makedirs(log_dir, exist_ok=True)
+
     if env_settings.environment == "development":
         format_str = '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
     else:
         format_str = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        
-    c_format = logging.Formatter(format_str)
-    f_format = logging.Formatter(format_str)
-    c_handler.setFormatter(c_format)
-    f_handler.setFormatter(f_format)
-    
-    # Add handlers to the logger
-    logger.setLevel(logging.DEBUG)
-    logger.addHandler(c_handler)
-    logger.addHandler(f_handler)
-    
-    return logger
\ No newline at end of file
+    formatter = KeyValueFormatter(format_str, structured=env_settings.log_format == "kv")
+
+    # Sin nivel en los handlers: filtra el nivel de cada logger (el compartido o uno hijo)
+    c_handler = logging.StreamHandler()
+    f_handler = logging.FileHandler(file_path)
+    for handler in (c_handler, f_handler):
+        handler.setFormatter(formatter)
+
+    # El logger solo encola; el listener escribe desde su propio thread
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    q_handler = logging.handlers.QueueHandler(log_queue)
+    q_handler.addFilter(SamplingFilter(env_settings.log_sample_every))
+
+    logger.handlers.clear()
+    logger.setLevel(log_level)
+    logger.propagate = False
+    logger.addHandler(q_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, c_handler, f_handler, respect_handler_level=True)
+    _listener.start()
+    _file_path = file_path
+    atexit.register(shutdown_logging)
+
+
+def setup_logging(file_path='logs/logs.log', log_level: str = None):
+    """
+    Logger compartido del proceso; los handlers se crean solo en la primera llamada.
+    Con `log_level` retorna un logger hijo para el módulo que llama, con ese nivel.
+    """
+    logger = logging.getLogger(__name__)
+    file_path = os.path.abspath(file_path)
+    with _lock:
+        if _listener is None:
+            _build(logger, file_path, _level(None))
+        elif file_path != _file_path:
+            logger.warning("⚠️ Logging already writes to %s; ignoring file_path=%s", _file_path, file_path)
+
+    if log_level is None:
+        return logger
+    # Hijo del compartido: usa sus handlers (propaga) pero filtra con su propio nivel
+    child = logger.getChild(sys._getframe(1).f_globals.get("__name__", "main"))
+    child.setLevel(_level(log_level))
+    return child
+
+
+def shutdown_logging():
+    """Vacía la cola y detiene el listener (se llama también en atexit)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
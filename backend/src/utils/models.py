@@ -1,34 +1,122 @@
-from llama_index.llms.google_genai import GoogleGenAI
-import tiktoken
+"""
+Clientes pesados (LLM, embeddings, tokenizer, tracing de mlflow) creados en el
+primer uso. Importar este módulo no carga llama_index, Google GenAI, Vertex
+ni mlflow, ni lee el archivo de credenciales.
+
+Desde el event loop usar `aget_llm()`: la primera inicialización (imports
+pesados, descarga del BPE de tiktoken) corre en un thread. La API además
+los precalienta en el lifespan con `warm_up()`.
+"""
+
+import asyncio
+import functools
+import threading
+
 from settings.env_config import env_settings
-from llama_index.core import Settings
-from google.oauth2 import service_account
-from llama_index.embeddings.vertex import VertexTextEmbedding
-from llama_index.core.callbacks import CallbackManager, TokenCountingHandler
+from utils.logger import setup_logging
+
+_logger = setup_logging()
+
+
+def _once(func):
+    """Como lru_cache para funciones sin argumentos, pero la inicialización corre una sola vez entre threads."""
+    lock = threading.Lock()
+    result = []
+
+    @functools.wraps(func)
+    def wrapper():
+        if not result:
+            with lock:
+                if not result:
+                    result.append(func())
+        return result[0]
+
+    wrapper.ready = lambda: bool(result)
+    return wrapper
+
+
+@_once
+def setup_tracing():
+    """Activa mlflow autolog para llama_index (una vez por proceso)."""
+    import mlflow
+
+    mlflow.set_tracking_uri(uri=env_settings.mlflow_tracking_uri)
+    mlflow.llama_index.autolog()
+
+
+@_once
+def get_tokenizer():
+    import tiktoken
+
+    return tiktoken.encoding_for_model("gpt-4o").encode
+
+
+def tokenizer(text: str) -> list[int]:
+    """Tokeniza `text` (el encoder se carga en la primera llamada)."""
+    return get_tokenizer()(text)
+
+
+@_once
+def get_llama_settings():
+    """
+    Settings global de llama_index con el chunk size configurado.
+    Los tokens se contabilizan en utils.llm_usage (sin callbacks de llama_index).
+    """
+    from llama_index.core import Settings
+
+    Settings.chunk_size = 512
+    return Settings
+
+
+@_once
+def get_llm():
+    """Cliente Gemini (también queda en Settings.llm)."""
+    try:
+        setup_tracing()
+    except Exception as e:
+        _logger.error(f"❌ Error enabling mlflow tracing: {e}")
+    from llama_index.llms.google_genai import GoogleGenAI
+
+    llm = GoogleGenAI(
+        model="gemini-2.5-flash",
+        api_key=env_settings.google_api_key,
+        max_tokens=8192,
+        temperature=0.3,
+    )
+    get_llama_settings().llm = llm
+    return llm
+
+
+@_once
+def get_credentials():
+    from google.oauth2 import service_account
+
+    return service_account.Credentials.from_service_account_file(env_settings.google_application_credentials)
 
-credentials: service_account.Credentials = (
-    service_account.Credentials.from_service_account_file(env_settings.google_application_credentials)
-)
 
-Settings.llm = GoogleGenAI(
-            model="gemini-2.5-flash",
-            api_key=env_settings.google_api_key,
-            max_tokens=8192,
-            temperature=0.3,
-        )
+@_once
+def get_embed_model():
+    """Embeddings de Vertex (también quedan en Settings.embed_model)."""
+    from llama_index.embeddings.vertex import VertexTextEmbedding
 
-Settings.embed_model = VertexTextEmbedding(
-                            model_name="text-multilingual-embedding-002",
-                            credentials=credentials,
-                            embed_batch_size=1
-                        )
+    embed_model = VertexTextEmbedding(
+        model_name="text-multilingual-embedding-002",
+        credentials=get_credentials(),
+        embed_batch_size=1
+    )
+    get_llama_settings().embed_model = embed_model
+    return embed_model
 
-token_counter = TokenCountingHandler(
-    tokenizer=tiktoken.encoding_for_model("gpt-4o").encode
-)
 
-callback_manager = CallbackManager([token_counter])
+async def aget_llm():
+    """get_llm sin bloquear el loop: si aún no se creó, se crea en un thread."""
+    return get_llm() if get_llm.ready() else await asyncio.to_thread(get_llm)
 
-Settings.chunk_size = 512
 
-Settings.callback_manager = callback_manager
+async def warm_up():
+    """Inicializa tokenizer y LLM fuera del loop (los errores solo se loguean)."""
+    for init in (get_tokenizer, get_llm):
+        try:
+            await asyncio.to_thread(init)
+        except Exception as e:
+            _logger.error(f"❌ Error warming up {init.__name__}: {e}")
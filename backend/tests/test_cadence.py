@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from research_stocks import cadence
+from research_stocks.cadence import cadence_reasons, ttl_multiplier
+from settings.env_config import env_settings
+
+
+@pytest.fixture(autouse=True)
+def _cadence_settings(monkeypatch):
+    monkeypatch.setattr(env_settings, "cadence_event_factor", 0.5)
+    monkeypatch.setattr(env_settings, "cadence_earnings_window_hours", 24)
+    monkeypatch.setattr(env_settings, "cadence_volatility_threshold_pct", 4)
+
+
+def _reasons(phase, earnings=False, spike=False):
+    return {"phase": phase, "earnings_window": earnings, "volatility_spike": spike}
+
+
+@pytest.mark.parametrize("section, phase, expected", [
+    ("price", "regular", 1),
+    ("price", "pre", 5),
+    ("price", "closed", 120),
+    ("news", "post", 1),
+    ("news", "closed", 4),
+    ("fundamentals", "closed", 1),
+])
+def test_phase_multipliers(section, phase, expected):
+    assert ttl_multiplier(section, _reasons(phase)) == expected
+
+
+def test_events_shorten_the_ttl_during_the_session():
+    assert ttl_multiplier("price", _reasons("regular", earnings=True)) == 0.5
+    assert ttl_multiplier("sentiment", _reasons("regular", spike=True)) == 0.5
+    # Las secciones que no dependen de eventos no cambian
+    assert ttl_multiplier("fundamentals", _reasons("regular", earnings=True)) == 1
+    assert ttl_multiplier("mtf", _reasons("regular", spike=True)) == 1
+
+
+def test_events_with_market_closed_shorten_the_backoff_but_not_below_base_ttl():
+    assert ttl_multiplier("price", _reasons("closed", earnings=True)) == 60
+    assert ttl_multiplier("news", _reasons("closed", spike=True)) == 2
+
+
+def test_event_detection(monkeypatch):
+    monkeypatch.setattr(cadence, "session_phase", lambda exchange: cadence.SessionPhase.REGULAR)
+    now = datetime(2025, 3, 12, 12, 0)
+    soon = (now + timedelta(hours=20)).timestamp()
+    later = (now + timedelta(days=3)).timestamp()
+
+    assert cadence_reasons("NYSE", {"earnings_timestamp": soon}, now)["earnings_window"] is True
+    assert cadence_reasons("NYSE", {"earnings_timestamp": later}, now)["earnings_window"] is False
+    assert cadence_reasons("NYSE", {"earnings_timestamp": "n/a"}, now)["earnings_window"] is False
+    assert cadence_reasons("NYSE", {"price": 104, "previous_close": 100}, now)["volatility_spike"] is True
+    assert cadence_reasons("NYSE", {"price": 103, "previous_close": 100}, now)["volatility_spike"] is False
+    assert cadence_reasons("NYSE", {"price": 103, "previous_close": 0}, now)["volatility_spike"] is False
+    assert cadence_reasons("NYSE", None, now) == _reasons("regular")
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from utils.hedging import HedgedCaller
+
+
+def _caller(**overrides):
+    options = dict(
+        sources=["slow"],
+        budget_ratio=1,
+        budget_burst=10,
+        min_delay_s=0.01,
+        min_samples=3,
+        max_workers=4,
+    )
+    options.update(overrides)
+    return HedgedCaller(**options)
+
+
+def _warm_up(caller, source="slow", latency=0.0, samples=3):
+    for _ in range(samples):
+        caller._record(source, latency)
+
+
+def test_no_hedge_until_enough_latency_samples():
+    caller = _caller()
+    calls = []
+    assert caller.call("slow", lambda: calls.append(1) or "ok") == "ok"
+    assert calls == [1]
+    assert caller.metrics()["sources"]["slow"]["hedged"] == 0
+
+
+def test_sources_without_hedging_run_inline():
+    caller = _caller()
+    thread = []
+    caller.call("other", lambda: thread.append(threading.current_thread()))
+    assert thread == [threading.current_thread()]
+
+
+def test_slow_primary_is_hedged_and_the_duplicate_wins():
+    caller = _caller()
+    _warm_up(caller)
+    attempts = []
+    release = threading.Event()
+
+    def func():
+        attempts.append(1)
+        if len(attempts) == 1:
+            release.wait(2)
+            return "primary"
+        return "hedge"
+
+    try:
+        assert caller.call("slow", func) == "hedge"
+    finally:
+        release.set()
+    stats = caller.metrics()["sources"]["slow"]
+    assert (stats["calls"], stats["hedged"], stats["hedge_wins"]) == (1, 1, 1)
+
+
+def test_hedge_is_denied_without_budget():
+    caller = _caller(budget_ratio=0, budget_burst=0)
+    _warm_up(caller)
+
+    assert caller.call("slow", lambda: time.sleep(0.05) or "primary") == "primary"
+    stats = caller.metrics()["sources"]["slow"]
+    assert (stats["hedged"], stats["budget_denied"]) == (0, 1)
+
+
+def test_budget_tokens_are_capped_by_burst():
+    caller = _caller(budget_ratio=0.5, budget_burst=1)
+    caller._tokens = 0
+    for _ in range(5):
+        caller._earn_token()
+    assert caller._take_token()
+    assert not caller._take_token()
+
+
+def test_error_is_raised_when_every_attempt_fails():
+    caller = _caller()
+    _warm_up(caller)
+
+    def func():
+        time.sleep(0.05)
+        raise ValueError("upstream down")
+
+    with pytest.raises(ValueError, match="upstream down"):
+        caller.call("slow", func)
+    assert caller.metrics()["sources"]["slow"]["errors"] == 1
+
+
+def test_hedge_delay_starts_when_the_primary_runs():
+    # Un solo thread ocupado: la primaria espera en la cola del pool y eso no cuenta como lentitud
+    caller = _caller(max_workers=1)
+    _warm_up(caller, latency=0.05)
+    blocker = caller._executor.submit(time.sleep, 0.2)
+
+    assert caller.call("slow", lambda: "primary") == "primary"
+    blocker.result()
+    assert caller.metrics()["sources"]["slow"]["hedged"] == 0
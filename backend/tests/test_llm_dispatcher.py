@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from utils import llm_dispatcher as dispatcher_module
+from utils.llm_dispatcher import LLMDeadlineExceeded, LLMDispatcher, Priority
+
+
+def _dispatcher(max_concurrency=1, background_limit=1, timeout=5):
+    return LLMDispatcher(
+        max_concurrency=max_concurrency,
+        class_limits={Priority.INTERACTIVE: max_concurrency, Priority.BACKGROUND: background_limit},
+        queue_timeouts={Priority.INTERACTIVE: timeout, Priority.BACKGROUND: timeout},
+    )
+
+
+def test_interactive_waiters_are_served_before_background():
+    async def scenario():
+        dispatcher = _dispatcher()
+        order = []
+
+        async def call(name, priority):
+            await dispatcher._acquire(priority, None)
+            order.append(name)
+            await asyncio.sleep(0)
+            dispatcher._release(priority)
+
+        await dispatcher._acquire(Priority.INTERACTIVE, None)
+        tasks = [
+            asyncio.create_task(call("background-1", Priority.BACKGROUND)),
+            asyncio.create_task(call("background-2", Priority.BACKGROUND)),
+            asyncio.create_task(call("interactive", Priority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0.01)
+        dispatcher._release(Priority.INTERACTIVE)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "background-1", "background-2"]
+
+
+def test_background_limit_leaves_slots_for_interactive():
+    async def scenario():
+        dispatcher = _dispatcher(max_concurrency=2, background_limit=1)
+        await dispatcher._acquire(Priority.BACKGROUND, None)
+        with pytest.raises(LLMDeadlineExceeded):
+            await dispatcher._acquire(Priority.BACKGROUND, 0.05)
+        await asyncio.wait_for(dispatcher._acquire(Priority.INTERACTIVE, None), 0.05)
+        return dispatcher.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["active"] == 2
+    assert metrics["classes"]["background"]["expired"] == 1
+    assert metrics["classes"]["background"]["queue_depth"] == 0
+
+
+def test_expired_waiter_does_not_leak_a_slot():
+    async def scenario():
+        dispatcher = _dispatcher()
+        await dispatcher._acquire(Priority.INTERACTIVE, None)
+        with pytest.raises(LLMDeadlineExceeded):
+            await dispatcher._acquire(Priority.INTERACTIVE, 0.01)
+        dispatcher._release(Priority.INTERACTIVE)
+        await asyncio.wait_for(dispatcher._acquire(Priority.INTERACTIVE, None), 0.05)
+        return dispatcher._total_active()
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        dispatcher = _dispatcher()
+        await dispatcher._acquire(Priority.INTERACTIVE, None)
+        waiter = asyncio.create_task(dispatcher._acquire(Priority.BACKGROUND, None))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        dispatcher._release(Priority.INTERACTIVE)
+        return dispatcher._total_active(), len(dispatcher._queues[Priority.BACKGROUND])
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+def test_llm_priority_sets_the_default_for_the_block(monkeypatch):
+    class FakeLLM:
+        async def acomplete(self, prompt):
+            return type("Response", (), {"text": "ok", "raw": None})()
+
+    async def fake_llm():
+        return FakeLLM()
+
+    monkeypatch.setattr(dispatcher_module, "aget_llm", fake_llm)
+    monkeypatch.setattr(dispatcher_module, "tokenizer", str.split)
+
+    async def scenario():
+        dispatcher = _dispatcher()
+        with dispatcher_module.llm_priority(Priority.BACKGROUND):
+            await dispatcher.acomplete("prompt")
+        await dispatcher.acomplete("prompt")
+        return dispatcher.metrics()["classes"]
+
+    classes = asyncio.run(scenario())
+    assert classes["background"]["completed"] == 1
+    assert classes["interactive"]["completed"] == 1
+
+
+def test_llm_errors_release_the_slot_and_propagate(monkeypatch):
+    class FailingLLM:
+        async def acomplete(self, prompt):
+            raise RuntimeError("quota exceeded")
+
+    async def fake_llm():
+        return FailingLLM()
+
+    monkeypatch.setattr(dispatcher_module, "aget_llm", fake_llm)
+    monkeypatch.setattr(dispatcher_module, "tokenizer", str.split)
+
+    async def scenario():
+        dispatcher = _dispatcher()
+        with pytest.raises(RuntimeError, match="quota exceeded"):
+            await dispatcher.acomplete("prompt")
+        return dispatcher._total_active(), dispatcher.metrics()["classes"]["interactive"]["failed"]
+
+    assert asyncio.run(scenario()) == (0, 1)
@@ -0,0 +1,98 @@
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from research_stocks.market_calendar import (
+    SessionPhase,
+    is_trading_day,
+    market_session,
+    next_regular_open,
+    session_phase,
+    us_early_closes,
+    us_holidays,
+)
+
+NY = ZoneInfo("America/New_York")
+
+
+@pytest.mark.parametrize("year, expected", [
+    (2024, {"01-01", "01-15", "02-19", "03-29", "05-27", "06-19", "07-04", "09-02", "11-28", "12-25"}),
+    (2025, {"01-01", "01-20", "02-17", "04-18", "05-26", "06-19", "07-04", "09-01", "11-27", "12-25"}),
+    # 4 de julio en sábado: se observa el viernes 3
+    (2026, {"01-01", "01-19", "02-16", "04-03", "05-25", "06-19", "07-03", "09-07", "11-26", "12-25"}),
+    # Juneteenth y Navidad en sábado, 4 de julio en domingo
+    (2027, {"01-01", "01-18", "02-15", "03-26", "05-31", "06-18", "07-05", "09-06", "11-25", "12-24"}),
+])
+def test_us_holidays(year, expected):
+    assert us_holidays(year) == {date.fromisoformat(f"{year}-{day}") for day in expected}
+
+
+def test_juneteenth_only_from_2022_and_observed_on_monday():
+    assert date(2021, 6, 18) not in us_holidays(2021)
+    assert date(2021, 6, 19) not in us_holidays(2021)
+    assert date(2022, 6, 20) in us_holidays(2022)
+
+
+def test_new_year_on_saturday_is_not_observed_on_the_previous_friday():
+    assert date(2021, 12, 31) not in us_holidays(2021)
+    assert date(2021, 12, 31) not in us_holidays(2022)
+    assert is_trading_day(date(2021, 12, 31))
+    assert is_trading_day(date(2027, 12, 31))
+
+
+def test_new_year_on_sunday_is_observed_on_monday():
+    assert date(2023, 1, 2) in us_holidays(2023)
+
+
+@pytest.mark.parametrize("year, expected", [
+    (2024, {date(2024, 7, 3), date(2024, 11, 29), date(2024, 12, 24)}),
+    (2025, {date(2025, 7, 3), date(2025, 11, 28), date(2025, 12, 24)}),
+    # 3 de julio es el feriado observado; 24 de diciembre cae jueves
+    (2026, {date(2026, 11, 27), date(2026, 12, 24)}),
+    # 3 de julio sábado y 24 de diciembre feriado observado
+    (2027, {date(2027, 11, 26)}),
+])
+def test_us_early_closes(year, expected):
+    assert us_early_closes(year) == expected
+
+
+@pytest.mark.parametrize("local, phase", [
+    (datetime(2025, 3, 12, 3, 59), SessionPhase.CLOSED),
+    (datetime(2025, 3, 12, 4, 0), SessionPhase.PRE),
+    (datetime(2025, 3, 12, 9, 29), SessionPhase.PRE),
+    (datetime(2025, 3, 12, 9, 30), SessionPhase.REGULAR),
+    (datetime(2025, 3, 12, 15, 59), SessionPhase.REGULAR),
+    (datetime(2025, 3, 12, 16, 0), SessionPhase.POST),
+    (datetime(2025, 3, 12, 20, 0), SessionPhase.CLOSED),
+    (datetime(2025, 3, 15, 12, 0), SessionPhase.CLOSED),  # sábado
+    (datetime(2025, 4, 18, 12, 0), SessionPhase.CLOSED),  # Good Friday
+    (datetime(2025, 11, 28, 12, 59), SessionPhase.REGULAR),  # cierre anticipado
+    (datetime(2025, 11, 28, 13, 0), SessionPhase.POST),
+])
+def test_session_phase(local, phase):
+    assert session_phase("NYSE", local.replace(tzinfo=NY)) == phase
+
+
+def test_session_phase_converts_to_exchange_time():
+    # 14:00 UTC en horario de verano = 10:00 en Nueva York
+    assert session_phase("NASDAQ", datetime(2025, 7, 1, 14, 0, tzinfo=timezone.utc)) == SessionPhase.REGULAR
+    # 14:00 UTC en horario de invierno = 09:00 en Nueva York
+    assert session_phase("NASDAQ", datetime(2025, 1, 7, 14, 0, tzinfo=timezone.utc)) == SessionPhase.PRE
+
+
+def test_next_regular_open_skips_weekends_and_holidays():
+    # Jueves antes de Good Friday, después de la apertura: el lunes siguiente
+    assert next_regular_open("NYSE", datetime(2025, 4, 17, 10, 0, tzinfo=NY)) == datetime(2025, 4, 21, 9, 30, tzinfo=NY)
+    # Antes de la apertura de un día hábil: ese mismo día
+    assert next_regular_open("NYSE", datetime(2025, 4, 17, 8, 0, tzinfo=NY)) == datetime(2025, 4, 17, 9, 30, tzinfo=NY)
+
+
+def test_market_session_reports_the_calendar_used():
+    now = datetime(2025, 12, 24, 14, 0, tzinfo=NY)
+    session = market_session("lse", now)
+    assert session["exchange"] == "NASDAQ"
+    assert session["phase"] == "post"
+    assert session["early_close"] is True
+    assert session["holiday"] is False
+    assert market_session("amex", now)["exchange"] == "AMEX"
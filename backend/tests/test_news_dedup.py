@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+
+from research_stocks import news_dedup
+from research_stocks.news_dedup import MinHasher, NewsDeduplicator, _lsh_bands, _shingles
+
+STORY = (
+    "Apple reported record quarterly revenue on Thursday, beating analyst estimates "
+    "as iPhone sales in China rebounded and services revenue grew at a double digit pace."
+)
+
+
+def _article(title, url="", content=STORY):
+    return SimpleNamespace(title=title, url=url, content=content, summary="")
+
+
+def test_shingles_normalize_case_and_short_texts():
+    assert _shingles("Apple Beats", 2) == {"apple beats"}
+    assert _shingles("One", 3) == {"one"}
+    assert _shingles("", 2) == set()
+    assert _shingles("A b C d", 2) == {"a b", "b c", "c d"}
+
+
+def test_minhash_signature_is_deterministic():
+    shingles = _shingles(STORY, 3)
+    assert MinHasher(64).signature(shingles) == MinHasher(64).signature(shingles)
+    assert MinHasher.similarity(MinHasher(64).signature(shingles), MinHasher(64).signature(shingles)) == 1.0
+    assert MinHasher(64).signature(set()) == ()
+    assert MinHasher.similarity((), (1, 2)) == 0.0
+
+
+@pytest.mark.parametrize("num_perm, threshold", [(64, 0.6), (64, 0.8), (128, 0.5), (32, 0.3)])
+def test_lsh_bands_threshold_does_not_exceed_similarity_threshold(num_perm, threshold):
+    bands, rows = _lsh_bands(num_perm, threshold)
+    assert bands * rows == num_perm
+    assert (1 / bands) ** (1 / rows) <= threshold
+
+
+def test_syndicated_copy_with_small_edits_is_dropped():
+    dedup = NewsDeduplicator(threshold=0.6)
+    original = _article("Apple beats estimates as iPhone sales rebound in China", "https://a.com/1")
+    syndicated = _article(
+        "Apple beats estimates as iPhone sales rebound in China - Reuters",
+        "https://b.com/2",
+        STORY.replace("Thursday", "Thursday afternoon"),
+    )
+    unrelated = _article(
+        "Microsoft cuts cloud prices for enterprise customers",
+        "https://c.com/3",
+        "Microsoft announced lower Azure prices for large customers signing multi year contracts.",
+    )
+
+    assert dedup.deduplicate("aapl", [original, syndicated, unrelated]) == [original, unrelated]
+
+
+def test_exact_repeats_in_one_batch_keep_the_first():
+    dedup = NewsDeduplicator()
+    first = _article("Apple beats estimates", "https://a.com/1")
+    assert dedup.deduplicate("AAPL", [first, _article("Apple beats estimates", "https://a.com/1")]) == [first]
+
+
+def test_same_url_on_a_later_refresh_is_not_a_duplicate_of_itself():
+    dedup = NewsDeduplicator()
+    article = _article("Apple beats estimates as iPhone sales rebound", "https://a.com/1")
+    assert dedup.deduplicate("AAPL", [article]) == [article]
+    assert dedup.deduplicate("AAPL", [article]) == [article]
+
+
+def test_index_is_per_ticker():
+    dedup = NewsDeduplicator()
+    article = _article("Apple beats estimates as iPhone sales rebound", "https://a.com/1")
+    copy = _article("Apple beats estimates as iPhone sales rebound", "https://b.com/2")
+    assert dedup.deduplicate("AAPL", [article]) == [article]
+    assert dedup.deduplicate("MSFT", [copy]) == [copy]
+    assert dedup.deduplicate("aapl", [copy]) == []
+
+
+def test_entries_expire_after_the_window(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(news_dedup.time, "time", lambda: now[0])
+    dedup = NewsDeduplicator(window_hours=1)
+    article = _article("Apple beats estimates as iPhone sales rebound", "https://a.com/1")
+    copy = _article("Apple beats estimates as iPhone sales rebound", "https://b.com/2")
+
+    dedup.deduplicate("AAPL", [article])
+    now[0] += 1800
+    assert dedup.deduplicate("AAPL", [copy]) == []
+    now[0] += 3601
+    assert dedup.deduplicate("AAPL", [copy]) == [copy]
+
+
+def test_reset_clears_the_ticker_index():
+    dedup = NewsDeduplicator()
+    article = _article("Apple beats estimates as iPhone sales rebound", "https://a.com/1")
+    copy = _article("Apple beats estimates as iPhone sales rebound", "https://b.com/2")
+    dedup.deduplicate("AAPL", [article])
+    dedup.reset("aapl")
+    assert dedup.deduplicate("AAPL", [copy]) == [copy]
@@ -0,0 +1,41 @@
+from research_stocks.news import article_fingerprint, diff_news, news_fingerprints
+
+
+def _news(*articles):
+    return {"summary": "", "articles": [{"title": title, "url": url} for title, url in articles]}
+
+
+def test_fingerprint_prefers_url_and_normalizes_titles():
+    assert article_fingerprint("https://a.com/1", "X") == article_fingerprint(" https://a.com/1 ", "Y")
+    assert article_fingerprint("", "Apple  Beats") == article_fingerprint("", "apple beats")
+    assert article_fingerprint("", "Apple beats") != article_fingerprint("", "Apple misses")
+
+
+def test_news_fingerprints_ignores_malformed_results():
+    assert news_fingerprints(None) == frozenset()
+    assert news_fingerprints({"articles": ["not a dict"]}) == frozenset()
+    assert news_fingerprints({"articles": [{"fingerprint": "abc", "url": "https://a.com/1"}]}) == {"abc"}
+
+
+def test_diff_news_reports_added_and_removed():
+    old = news_fingerprints(_news(("A", "https://a.com/1"), ("B", "https://a.com/2")))
+    new = _news(("B", "https://a.com/2"), ("C", "https://a.com/3"))
+
+    delta = diff_news(old, new)
+
+    assert [article["title"] for article in delta["added"]] == ["C"]
+    assert delta["removed"] == [article_fingerprint("https://a.com/1", "A")]
+    assert delta["fingerprints"] == news_fingerprints(new)
+
+
+def test_diff_news_without_previous_state_adds_everything():
+    new = _news(("A", "https://a.com/1"), ("B", ""))
+    delta = diff_news(None, new)
+    assert [article["title"] for article in delta["added"]] == ["A", "B"]
+    assert delta["removed"] == []
+
+
+def test_diff_news_unchanged():
+    news = _news(("A", "https://a.com/1"))
+    delta = diff_news(news_fingerprints(news), news)
+    assert delta["added"] == [] and delta["removed"] == []
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+
+from services import shared_store as shared_store_module
+from services.shared_store import SharedStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(shared_store_module.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SharedStore(str(tmp_path / "shared.sqlite3"))
+
+
+def test_lease_is_exclusive_until_it_expires(store, clock):
+    assert store.try_acquire_lease("scheduler", "a", 6)
+    assert not store.try_acquire_lease("scheduler", "b", 6)
+    assert store.lease_holder("scheduler")["holder"] == "a"
+
+    clock[0] += 6.5
+    assert store.lease_holder("scheduler") is None
+    assert store.try_acquire_lease("scheduler", "b", 6)
+    assert not store.try_acquire_lease("scheduler", "a", 6)
+
+
+def test_holder_renews_its_lease(store, clock):
+    assert store.try_acquire_lease("scheduler", "a", 6)
+    clock[0] += 5
+    assert store.try_acquire_lease("scheduler", "a", 6)
+    clock[0] += 5
+    assert not store.try_acquire_lease("scheduler", "b", 6)
+
+
+def test_release_only_by_the_holder(store, clock):
+    store.try_acquire_lease("scheduler", "a", 6)
+    store.release_lease("scheduler", "b")
+    assert store.lease_holder("scheduler")["holder"] == "a"
+    store.release_lease("scheduler", "a")
+    assert store.try_acquire_lease("scheduler", "b", 6)
+
+
+def test_jobs_are_deduplicated_per_ticker(store, clock):
+    job, created = store.create_job("1", "AAPL", stale_after_s=60)
+    assert created and job["status"] == "queued"
+
+    same, created = store.create_job("2", "AAPL", stale_after_s=60)
+    assert not created and same["id"] == "1"
+    assert store.create_job("3", "MSFT", stale_after_s=60)[1]
+
+    store.update_job("1", status="completed", finished_at=clock[0])
+    assert store.create_job("4", "AAPL", stale_after_s=60)[1]
+
+
+def test_stale_active_job_is_abandoned(store, clock):
+    store.create_job("1", "AAPL", stale_after_s=60)
+    clock[0] += 61
+
+    job, created = store.create_job("2", "AAPL", stale_after_s=60)
+    assert created and job["id"] == "2"
+    abandoned = store.load_job("1")
+    assert (abandoned["status"], abandoned["error"]) == ("failed", "abandoned")
+
+
+def test_max_queued_counts_queued_jobs_from_every_worker(store, clock):
+    store.create_job("1", "AAPL", stale_after_s=60, max_queued=2)
+    store.create_job("2", "MSFT", stale_after_s=60, max_queued=2)
+    assert store.create_job("3", "NVDA", stale_after_s=60, max_queued=2) == (None, False)
+    # Un ticker que ya tiene job se deduplica aunque la cola esté llena
+    assert store.create_job("4", "AAPL", stale_after_s=60, max_queued=2)[0]["id"] == "1"
+
+    store.update_job("1", status="running")
+    assert store.create_job("5", "NVDA", stale_after_s=60, max_queued=2)[1]
+
+
+def test_prune_only_removes_finished_jobs(store, clock):
+    store.create_job("1", "AAPL", stale_after_s=600)
+    store.create_job("2", "MSFT", stale_after_s=600)
+    store.update_job("2", status="completed", finished_at=clock[0])
+    clock[0] += 10
+
+    store.prune_jobs(datetime.fromtimestamp(clock[0]))
+    assert store.load_job("1") is not None
+    assert store.load_job("2") is None
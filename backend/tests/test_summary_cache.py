@@ -0,0 +1,44 @@
+from research_stocks.summary_cache import SummaryCache
+
+
+def test_key_ignores_fingerprint_order_but_not_ticker_or_prompt_version():
+    key = SummaryCache.make_key("aapl", ["b", "a"], "v1")
+    assert key == SummaryCache.make_key("AAPL", ["a", "b"], "v1")
+    assert key != SummaryCache.make_key("AAPL", ["a", "b"], "v2")
+    assert key != SummaryCache.make_key("MSFT", ["a", "b"], "v1")
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = SummaryCache(max_entries=2, base_dir=None)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_disk_tier_serves_entries_evicted_from_memory(tmp_path):
+    cache = SummaryCache(max_entries=1, base_dir=str(tmp_path))
+    cache.set("a", "A", ticker="AAPL")
+    cache.set("b", "B")
+
+    assert "a" not in cache._memory
+    assert cache.get("a") == "A"
+    assert list(cache._memory) == ["a"]
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    SummaryCache(base_dir=str(tmp_path)).set("a", "A")
+    assert SummaryCache(base_dir=str(tmp_path)).get("a") == "A"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_unreadable_disk_entry_is_a_miss(tmp_path):
+    (tmp_path / "a.json").write_text("{not json", encoding="utf-8")
+    cache = SummaryCache(base_dir=str(tmp_path))
+    assert cache.get("a") is None
+    assert cache.misses == 1